@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Benchmark do índice de busca: indexação e consultas em um arquivo grande de comprovantes.
+
+Indexa ``--comprovantes`` comprovantes do corpus sintético (uma página cada,
+com os campos extraídos pelos extratores e datas espalhadas por vários
+anos) e mede, para cada tipo de consulta, o tempo médio e o pior tempo entre
+as repetições.
+
+Uso:
+    python benchmarks/bench_busca.py
+    python benchmarks/bench_busca.py --comprovantes 300000 --json busca.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from busca import IndiceBusca  # noqa: E402
+from corpus_sintetico import gerar_textos  # noqa: E402
+from extratores import extrair_beneficiario, extrair_documento, extrair_valor, preparar_texto  # noqa: E402
+
+# Textos distintos analisados; os demais comprovantes repetem estes com outra data
+TEXTOS_DISTINTOS = 5000
+
+
+def registros_sinteticos(quantidade, semente=2024):
+    """Gera ``(registro, texto)`` como os da divisão, com datas de cinco anos"""
+    rnd = random.Random(semente)
+    analisados = []
+    for texto in gerar_textos(min(quantidade, TEXTOS_DISTINTOS)):
+        pagina = preparar_texto(texto)
+        nome = extrair_beneficiario(pagina)
+        # Os modelos do corpus não trazem o CNPJ junto do nome; sem ele, um CNPJ fictício por texto
+        documento = extrair_documento(pagina, nome) or f"{rnd.randrange(10 ** 14):014d}"
+        analisados.append((texto, nome, extrair_valor(pagina), documento))
+    inicio = datetime.date(2020, 1, 1)
+    for numero in range(quantidade):
+        texto, nome, valor, documento = analisados[numero % len(analisados)]
+        registro = {
+            'arquivo_origem': f"/arquivo/extrato_{numero // 100:05d}.pdf",
+            'pagina_inicial': numero % 100 + 1,
+            'pagina_final': numero % 100 + 1,
+            'layout': None,
+            'beneficiario': nome,
+            'valor': valor,
+            'arquivo_saida': f"/arquivo/comprovantes_processados/{numero:07d}.pdf",
+            'arquivo_zip': None,
+            'data': (inicio + datetime.timedelta(days=rnd.randrange(5 * 365))).isoformat(),
+            'documento': documento,
+            'autenticacao': "",
+        }
+        yield registro, texto
+
+
+def medir_consulta(indice, filtros, repeticoes):
+    """Tempo médio e pior tempo da consulta, em ms, e a quantidade de resultados"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultados = indice.buscar(**filtros)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {'media_ms': round(sum(tempos) / len(tempos), 2), 'pior_ms': round(max(tempos), 2),
+            'resultados': len(resultados)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comprovantes", type=int, default=100000, help="quantidade de comprovantes indexados")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--json", help="grava o resultado também neste arquivo")
+    args = parser.parse_args()
+
+    trabalho = tempfile.mkdtemp(prefix="bench_busca_")
+    try:
+        caminho = os.path.join(trabalho, "busca.sqlite3")
+        amostra = None
+        inicio = time.perf_counter()
+        with IndiceBusca(caminho) as indice:
+            for registro, texto in registros_sinteticos(args.comprovantes):
+                indice.registrar(registro, texto)
+                if amostra is None:
+                    amostra = registro
+        indexacao = time.perf_counter() - inicio
+        tamanho = os.path.getsize(caminho)
+
+        consultas = {
+            'texto': {'texto': "boleto"},
+            'beneficiario': {'beneficiario': amostra['beneficiario'].split()[0]},
+            'documento': {'documento': amostra['documento']},
+            'faixa_de_valor': {'valor_minimo': 1000, 'valor_maximo': 1010},
+            'beneficiario_mes_e_valor': {'beneficiario': amostra['beneficiario'].split()[0],
+                                         'data_inicial': "2023-03-01", 'data_final': "2023-03-31",
+                                         'valor_minimo': 100},
+        }
+        with IndiceBusca(caminho) as indice:
+            resultados = {nome: medir_consulta(indice, filtros, args.repeticoes)
+                          for nome, filtros in consultas.items()}
+    finally:
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    for nome, resultado in resultados.items():
+        print(f"{nome:>26}: média {resultado['media_ms']} ms, pior {resultado['pior_ms']} ms, "
+              f"{resultado['resultados']} resultado(s)", file=sys.stderr)
+    relatorio = {
+        'comprovantes': args.comprovantes,
+        'indexacao_por_comprovante_us': round(indexacao / args.comprovantes * 1e6, 1),
+        'bytes_indice': tamanho,
+        'consultas': resultados,
+    }
+    texto = json.dumps(relatorio, indent=2)
+    print(texto)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
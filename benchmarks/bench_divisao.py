@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Benchmark da divisão: leitura dupla (PyMuPDF + PyPDF2) x documento único (PyMuPDF).
+
+Mede páginas/segundo e pico de memória (RSS) de cada modo, cada um em um
+processo separado para que o pico de um não contamine o outro. Com
+``--repeticoes`` cada modo roda várias vezes e fica a execução mais rápida,
+já que o tempo de uma única execução varia bastante de uma para outra.
+
+Uso:
+    python benchmarks/bench_divisao.py --paginas 2000
+    python benchmarks/bench_divisao.py --pdf extrato_grande.pdf --repeticoes 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def pico_memoria_mb():
+    """Pico de memória residente do processo atual, em MB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def gerar_pdf_sintetico(caminho, paginas):
+    """Gera um PDF com um comprovante simples por página"""
+    import fitz
+
+    doc = fitz.open()
+    for n in range(paginas):
+        page = doc.new_page()
+        texto = (
+            "COMPROVANTE DE PAGAMENTO\n"
+            f"FAVORECIDO: EMPRESA EXEMPLO {n % 50} LTDA\n"
+            f"CNPJ: 12.345.678/0001-{n % 100:02d}\n"
+            f"VALOR: R$ {1000 + n},{n % 100:02d}\n"
+        )
+        page.insert_text((72, 72), texto, fontsize=11)
+    doc.save(caminho, garbage=3, deflate=True)
+    doc.close()
+
+
+def dividir_leitura_dupla(pdf_path, output_dir):
+    """Reproduz a divisão anterior: texto pelo PyMuPDF e escrita por PdfReader/PdfWriter"""
+    import fitz
+    from PyPDF2 import PdfReader, PdfWriter
+    from processador import agrupar_comprovantes, nome_arquivo_saida, ProcessadorComprovantes
+
+    doc = fitz.open(pdf_path)
+    reader = PdfReader(pdf_path)
+    paginas = ProcessadorComprovantes(log=lambda m: None)._analisar_paginas(doc, 0, len(doc))
+    for contador, (inicio, fim, nome, valor) in enumerate(agrupar_comprovantes(paginas), start=1):
+        writer = PdfWriter()
+        for i in range(inicio, fim):
+            writer.add_page(reader.pages[i])
+        with open(os.path.join(output_dir, nome_arquivo_saida(nome, valor, contador)), "wb") as f:
+            writer.write(f)
+    doc.close()
+    return len(paginas)
+
+
+def dividir_documento_unico(pdf_path, output_dir):
+    """Divisão atual do motor, com um único documento aberto"""
+    import fitz
+    from processador import ProcessadorComprovantes
+
+    processador = ProcessadorComprovantes(log=lambda m: None, gerar_zip=False, pasta_destino=output_dir)
+    processador.process_single_pdf(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+MODOS = {
+    'leitura_dupla': dividir_leitura_dupla,
+    'documento_unico': dividir_documento_unico,
+}
+
+
+def executar_modo(modo, pdf_path):
+    """Executa um modo neste processo e imprime o resultado em JSON"""
+    output_dir = tempfile.mkdtemp(prefix=f"bench_{modo}_")
+    try:
+        inicio = time.perf_counter()
+        paginas = MODOS[modo](pdf_path, output_dir)
+        duracao = time.perf_counter() - inicio
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    print(json.dumps({
+        'modo': modo,
+        'paginas': paginas,
+        'segundos': round(duracao, 3),
+        'paginas_por_segundo': round(paginas / duracao, 1) if duracao else None,
+        'pico_rss_mb': round(pico_memoria_mb() or 0, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", help="PDF a ser dividido (padrão: gera um sintético)")
+    parser.add_argument("--paginas", type=int, default=2000, help="páginas do PDF sintético")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada modo (fica a mais rápida)")
+    parser.add_argument("--executar", choices=sorted(MODOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_modo(args.executar, args.pdf)
+        return
+
+    temporario = None
+    pdf_path = args.pdf
+    if not pdf_path:
+        temporario = tempfile.mkdtemp(prefix="bench_divisao_")
+        pdf_path = os.path.join(temporario, f"sintetico_{args.paginas}.pdf")
+        gerar_pdf_sintetico(pdf_path, args.paginas)
+
+    try:
+        resultados = []
+        for modo in MODOS:
+            execucoes = []
+            for _ in range(max(1, args.repeticoes)):
+                saida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--executar", modo, "--pdf", pdf_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                execucoes.append(json.loads(saida.strip().splitlines()[-1]))
+            melhor = min(execucoes, key=lambda r: r['segundos'])
+            # O pico de memória quase não varia; fica o maior entre as execuções
+            melhor['pico_rss_mb'] = max(r['pico_rss_mb'] for r in execucoes)
+            resultados.append(melhor)
+    finally:
+        if temporario:
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    for r in resultados:
+        print(f"{r['modo']:>16}: {r['paginas_por_segundo']} páginas/s, "
+              f"{r['segundos']} s, pico RSS {r['pico_rss_mb']} MB")
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Regressão e benchmark dos extratores de beneficiário, valor e CPFs.
+
+Gera um corpus de textos de comprovantes (exemplos fixos de cada layout,
+esses mesmos exemplos com o tamanho de uma página real e combinações
+aleatórias de rótulos, com semente fixa), confere que o motor de
+regras de ``extratores.py`` devolve exatamente o mesmo que a implementação
+anterior (``extratores_legado.py``), que cada exemplo fixo é classificado
+no layout esperado e mede o tempo por página de cada uma. O modo por
+posição é medido com palavras de coordenadas sintéticas (uma linha de texto
+por linha da página, letras de largura fixa), que devem dar o mesmo
+resultado que o texto corrido.
+
+Uso:
+    python benchmarks/bench_extratores.py
+    python benchmarks/bench_extratores.py --aleatorios 50000 --repeticoes 5
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import extratores  # noqa: E402
+import extratores_legado  # noqa: E402
+
+EXEMPLOS = [
+    # Bradesco PIX
+    "Comprovante de transação bancária\nDados de quem pagou\nNome: EMPRESA PAGADORA LTDA\n"
+    "Dados de quem recebeu\nNome: Vinicius Souza Comercio\nCPF: ***.123.456-**\nValor: R$ 1.250,00\n",
+    # BB SAC
+    "SAC BB\nBeneficiario: CONCESSIONARIA DE ENERGIA S.A.\nNome Fantasia: ENERGIA\n"
+    "Valor cobrado: 345,67\n",
+    # FGTS / DARF / CAGEPA
+    "FGTS GRF - GUIA DE RECOLHIMENTO\nValor recolhido: R$ 12.345,67\n",
+    "Comprovante de Pagamento de DARF\nValor total: 1.000,00\n",
+    "CAGEPA - Companhia de Água\nValor do documento: 98,10\n",
+    # Santander
+    "SANTANDER\nConvenio de Arrecadacao\nPM JOAO PESSOA IPTU\nR$ 2.100,00\n",
+    "SANTANDER\nDados do Beneficiário Original\n12.345.678/0001-90\nRazão Social: FORNECEDOR ABC LTDA\n"
+    "Valor do documento: 4.500,00\n",
+    "SANTANDER\nDADOS DO BENEFICIÁRIO ORIGINAL\n12.345.678/0001-90\nCNPJ\nFORNECEDOR XYZ SA\n"
+    "(=) Valor do pagamento:\n3.210,99\n",
+    # Itaú / BTG / Caixa
+    "Itaú\nDA EMPRESA\nNome:\nTRANSPORTADORA RAPIDA\nValor: R$ 800,00\n",
+    "DA EMPRESA\nNome: LOJA CENTRAL  CNPJ 11.222.333/0001-44\nValor da TED: 5.000,00\n",
+    "BTG Pactual\nCliente: EMPRESA PAGADORA\nFavorecido: PRESTADOR DE SERVICOS\nValor: 700,00\n",
+    "Cliente: A\nCliente: MERCADO DO BAIRRO\nValor total pago: 150,00\n",
+    "CAIXA\nNome social:\nMARIA DA SILVA\nValor da transação: R$ 1.234,56\n",
+    "Nome do recebedor: PADARIA PAO QUENTE\nValor: 45,90\n",
+    "Convenio 1234 - TELEFONIA\nValor atualizado: 99,99\n",
+    # Folha
+    "Pagamento de Salários\n111.222.333-44 JOSE\n222.333.444-55 ANA\n333.444.555-66 RUI\n"
+    "444.555.666-77 LIA\nValor total: 10.000,00\n",
+    "111.222.333-44\n222.333.444-55\n333.444.555-66\n444.555.666-77\n",
+    # Genéricos
+    "Pago para: ACADEMIA FORMA FISICA\nCNPJ 12.345.678/0001-90 valor 1.100,00\n",
+    "Favorecida: CLINICA SAUDE\nValor: 300,00\n",
+    "Dados do recebedor\nPara ESCRITORIO CONTABIL\nValor: 2.000,00\n",
+    "Tipo de compromisso: ALUGUEL\n(=) Valor do pagamento (R$):\n3.500,00\n",
+    "",
+    "   \n  ",
+]
+
+# Layout esperado para cada item de EXEMPLOS, na mesma ordem
+LAYOUTS_ESPERADOS = [
+    "bradesco", "bb", "fgts", "darf", "cagepa",
+    "santander", "santander", "santander",
+    "itau", "itau", "btg", "btg", "caixa", "generico", "generico",
+    "folha", "generico",
+    "generico", "generico", "generico", "generico",
+    "sem_texto", "sem_texto",
+]
+
+FRAGMENTOS = [
+    "DADOS DE QUEM RECEBEU", "Dados de quem recebeu\n", "NOME: {nome}", "Nome:\n{nome}", "NOME:", "Nome: NOME",
+    "BENEFICIARIO: {nome}", "Beneficiário: {nome}", "BENEFICIARIO:\n", "NOME FANTASIA: {nome}", "Nome Fantasia:\n",
+    "FGTS GRF", "CONVENIO DE ARRECADACAO", "PM {nome}", "PM   ", "Convenio {nome}", "DA EMPRESA",
+    "PAGAMENTO DE DARF", "CAGEPA", "SALÁRIO", "salarios", "CLIENTE: {nome}", "Cliente:", "FAVORECIDO: {nome}",
+    "Favorecido\nNome: {nome}", "FAVORECIDA: {nome}", "NOME SOCIAL:", "NOME DO RECEBEDOR: {nome}",
+    "SANTANDER", "DADOS DO BENEFICIÁRIO ORIGINAL", "RAZÃO SOCIAL: {nome} {cnpj}", "{cnpj}", "CNPJ {cnpj} {valor}",
+    "PAGO PARA: {nome}", "CREDITADA: NOME: {nome}", "TIPO DE COMPROMISSO: {nome}", "DADOS DO RECEBEDOR\nPARA {nome}",
+    "BENEFICIÁRIO ORIGINAL", "ORIGINAL", "DO PAGADOR", "{nome} CNPJ {cnpj}",
+    "VALOR COBRADO: {valor}", "Valor cobrado\n{valor}", "VALOR COBRADO\nR$ {valor}", "VALOR: R$ {valor}",
+    "VALOR RECOLHIDO: {valor}", "R$ {valor}", "(=) VALOR DO PAGAMENTO:\n{valor}", "(=) VALOR DO PAGAMENTO (R$): {valor}",
+    "(=) Valor do pagamento (R$):\n{valor}", "VALOR DA TRANSAÇÃO: {valor}", "VALOR DO DOCUMENTO {valor}",
+    "Valor da TED {valor}", "VALOR TOTAL PAGO {valor}", "VALOR TOTAL: {valor}", "VALOR ATUALIZADO {valor}",
+    "valor {valor}", "{cpf}", "{cpf} {nome}", "", " ", "\r", "\x0c", "   {nome}   ",
+]
+
+NOMES = ["EMPRESA ABC LTDA", "joão da silva", "Fornecedor_Um", "ACME  S.A.", "NOME", "  ", "Ítalo Ção",
+         "X" * 40, "LOJA-123 / FILIAL", "FANTASIA", "ORIGINAL"]
+VALORES = ["1.234,56", "99,00", "1234,5", "12.345.678,90", ".", "0,01", "1.000"]
+
+
+PREENCHIMENTO = [
+    "Agência: 1234-5  Conta corrente: 12345-6", "Data da operação: 15/03/2024 às 10:42:13",
+    "Autenticação: 8F3A.29C1.77B0.DD41.0A9E", "Canal: Internet Banking Empresarial",
+    "Identificação no extrato: PAG FORNEC", "Documento: 000123456", "Situação: Efetivado",
+    "Em caso de dúvidas ligue para a central de atendimento", "Ouvidoria 0800 000 0000",
+]
+
+
+def gerar_paginas_realistas(semente=4321):
+    """Exemplos fixos cercados por linhas comuns de comprovante, com o tamanho de uma página real"""
+    rnd = random.Random(semente)
+    paginas = []
+    for exemplo in EXEMPLOS:
+        linhas = [rnd.choice(PREENCHIMENTO) for _ in range(40)]
+        linhas.insert(rnd.randint(0, 10), exemplo)
+        paginas.append("\n".join(linhas))
+    return paginas
+
+
+def gerar_corpus(aleatorios, semente=1234):
+    """Exemplos fixos seguidos de combinações aleatórias de fragmentos"""
+    rnd = random.Random(semente)
+    corpus = list(EXEMPLOS)
+    for _ in range(aleatorios):
+        partes = []
+        for fragmento in rnd.choices(FRAGMENTOS, k=rnd.randint(1, 12)):
+            partes.append(fragmento.format(
+                nome=rnd.choice(NOMES),
+                valor=rnd.choice(VALORES),
+                cnpj=f"{rnd.randint(10, 99)}.{rnd.randint(100, 999)}.{rnd.randint(100, 999)}/0001-{rnd.randint(10, 99)}",
+                cpf=f"{rnd.randint(100, 999)}.{rnd.randint(100, 999)}.{rnd.randint(100, 999)}-{rnd.randint(10, 99)}",
+            ))
+        corpus.append(rnd.choice(["\n", "\n", " ", "\n\n"]).join(partes))
+    return corpus
+
+
+def palavras_sinteticas(texto):
+    """Palavras no formato de ``page.get_text("words")``, com cada linha do texto numa linha da página"""
+    palavras = []
+    for numero, linha in enumerate(texto.split("\n")):
+        y0 = 40 + numero * 12
+        for n, match in enumerate(re.finditer(r"\S+", linha)):
+            x0 = 40 + match.start() * 5
+            palavras.append((x0, y0, x0 + len(match.group()) * 5, y0 + 10, match.group(), 0, numero, n))
+    return palavras
+
+
+def conferir_posicional(paginas):
+    """Lista as páginas em que a extração por posição diverge da extração pelo texto corrido"""
+    divergencias = []
+    for texto in paginas:
+        esperado = extrair(extratores, texto)
+        obtido = extrair(extratores, extratores.preparar_texto(texto, palavras_sinteticas(texto)))
+        if esperado[:2] != obtido[:2]:
+            divergencias.append({'texto': texto, 'esperado': esperado[:2], 'obtido': obtido[:2]})
+    return divergencias
+
+
+def extrair(modulo, texto):
+    mensagens = []
+    return (
+        modulo.extrair_beneficiario(texto),
+        modulo.extrair_valor(texto, mensagens.append),
+        modulo.contem_4_cpfs(texto),
+        tuple(mensagens),
+    )
+
+
+def conferir(corpus):
+    """Lista os textos em que o motor de regras diverge da implementação anterior"""
+    divergencias = []
+    for texto in corpus:
+        esperado = extrair(extratores_legado, texto)
+        # Pela página preparada, como o processador chama: os CPFs vêm da varredura do TextoPagina
+        obtido = extrair(extratores, extratores.preparar_texto(texto))
+        if esperado != obtido:
+            divergencias.append({'texto': texto, 'esperado': esperado, 'obtido': obtido})
+    return divergencias
+
+
+def conferir_layouts():
+    """Lista os exemplos fixos classificados em layout diferente do esperado"""
+    return [
+        {'texto': texto, 'esperado': esperado, 'obtido': extratores.classificar_layout(texto)}
+        for texto, esperado in zip(EXEMPLOS, LAYOUTS_ESPERADOS)
+        if extratores.classificar_layout(texto) != esperado
+    ]
+
+
+def medir(funcao, corpus, repeticoes):
+    """Melhor tempo, em microssegundos por página, entre as repetições"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for texto in corpus:
+            funcao(texto)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor / len(corpus) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--aleatorios", type=int, default=20000, help="quantidade de textos aleatórios")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = gerar_corpus(args.aleatorios)
+    realistas = gerar_paginas_realistas()
+    divergencias = conferir(corpus + realistas)
+    for d in divergencias[:10]:
+        print(f"DIVERGÊNCIA em {d['texto']!r}:\n  esperado {d['esperado']}\n  obtido   {d['obtido']}")
+    layouts_divergentes = conferir_layouts()
+    for d in layouts_divergentes:
+        print(f"LAYOUT em {d['texto']!r}: esperado {d['esperado']}, obtido {d['obtido']}")
+    posicional_divergentes = conferir_posicional(realistas)
+    for d in posicional_divergentes:
+        print(f"POSIÇÃO em {d['texto']!r}:\n  texto   {d['esperado']}\n  posição {d['obtido']}")
+
+    def legado(texto):
+        extratores_legado.extrair_beneficiario(texto)
+        extratores_legado.extrair_valor(texto)
+        extratores_legado.contem_4_cpfs(texto)
+
+    def regras(texto):
+        pagina = extratores.preparar_texto(texto)
+        extratores.extrair_beneficiario(pagina)
+        extratores.extrair_valor(pagina)
+        extratores.contem_4_cpfs(pagina)
+
+    def todos_os_campos(texto):
+        pagina = extratores.preparar_texto(texto)
+        beneficiario = extratores.extrair_beneficiario(pagina)
+        extratores.extrair_valor(pagina)
+        extratores.contem_4_cpfs(pagina)
+        extratores.extrair_data(pagina)
+        extratores.extrair_documento(pagina, beneficiario)
+        extratores.extrair_autenticacao(pagina)
+
+    def regras_com_layout(texto):
+        pagina = extratores.preparar_texto(texto)
+        extratores.extrair_beneficiario(pagina)
+        extratores.extrair_valor(pagina)
+        if pagina is not None:
+            pagina.layout
+
+    com_palavras = [(texto, palavras_sinteticas(texto)) for texto in realistas]
+
+    def regras_posicionais(texto_e_palavras):
+        pagina = extratores.preparar_texto(*texto_e_palavras)
+        extratores.extrair_beneficiario(pagina)
+        extratores.extrair_valor(pagina)
+
+    resultado = {
+        'paginas': len(corpus),
+        'divergencias': len(divergencias),
+        'layouts_divergentes': len(layouts_divergentes),
+        'legado_us_por_pagina': round(medir(legado, corpus, args.repeticoes), 2),
+        'regras_us_por_pagina': round(medir(regras, corpus, args.repeticoes), 2),
+        'paginas_realistas': len(realistas),
+        'legado_us_por_pagina_realista': round(medir(legado, realistas * 200, args.repeticoes), 2),
+        'regras_us_por_pagina_realista': round(medir(regras, realistas * 200, args.repeticoes), 2),
+        'regras_com_layout_us_por_pagina_realista': round(medir(regras_com_layout, realistas * 200,
+                                                                args.repeticoes), 2),
+        'todos_os_campos_us_por_pagina_realista': round(medir(todos_os_campos, realistas * 200,
+                                                              args.repeticoes), 2),
+        'posicional_divergentes': len(posicional_divergentes),
+        'posicional_us_por_pagina_realista': round(medir(regras_posicionais, com_palavras * 200,
+                                                         args.repeticoes), 2),
+    }
+    print(json.dumps(resultado, indent=2))
+    return 1 if divergencias or layouts_divergentes or posicional_divergentes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
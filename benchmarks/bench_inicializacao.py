@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Benchmark do tempo de inicialização da interface e da linha de comando.
+
+Cada medição é um processo Python novo, como quando o usuário abre o
+programa: importa o módulo da interface (sem abrir a janela) ou executa
+``divisor_cli.py --help``. Também lista quais módulos pesados (PyMuPDF,
+PyPDF2, pandas, numpy, openpyxl, Pillow...) já foram carregados só por
+abrir o programa; o esperado é que nenhum seja.
+
+Uso:
+    python benchmarks/bench_inicializacao.py
+    python benchmarks/bench_inicializacao.py --repeticoes 30 --json inicio.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_PESADOS = ['fitz', 'pymupdf', 'PyPDF2', 'pandas', 'numpy', 'openpyxl', 'pyarrow', 'PIL', 'pytesseract']
+
+# Código executado no processo medido; imprime os módulos pesados carregados
+_IMPORTAR = (
+    "import sys; import {modulo}; "
+    "print(','.join(m for m in {pesados!r} if m in sys.modules))"
+)
+
+CENARIOS = {
+    'interface': [sys.executable, "-c", _IMPORTAR.format(modulo="divisor_de_comprovantes", pesados=MODULOS_PESADOS)],
+    'cli_importacao': [sys.executable, "-c", _IMPORTAR.format(modulo="divisor_cli", pesados=MODULOS_PESADOS)],
+    'cli_ajuda': [sys.executable, os.path.join(RAIZ, "divisor_cli.py"), "--help"],
+}
+
+
+def medir(comando, repeticoes):
+    """Executa o comando ``repeticoes`` vezes; retorna os tempos e a saída da última execução"""
+    tempos = []
+    saida = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+        tempos.append(time.perf_counter() - inicio)
+        if resultado.returncode != 0:
+            raise RuntimeError(resultado.stderr.strip().splitlines()[-1] if resultado.stderr else "falhou")
+        saida = resultado.stdout
+    return tempos, saida
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=15)
+    parser.add_argument("--json", help="grava o resultado também neste arquivo")
+    args = parser.parse_args()
+
+    # Referência: um processo Python vazio
+    base, _ = medir([sys.executable, "-c", "pass"], args.repeticoes)
+    resultado = {'python_vazio_ms': round(statistics.median(base) * 1000, 1)}
+
+    for nome, comando in CENARIOS.items():
+        try:
+            tempos, saida = medir(comando, args.repeticoes)
+        except RuntimeError as e:
+            # Ex.: tkinterdnd2 não instalado neste ambiente
+            resultado[nome] = {'erro': str(e)}
+            continue
+        resultado[nome] = {
+            'mediana_ms': round(statistics.median(tempos) * 1000, 1),
+            'minimo_ms': round(min(tempos) * 1000, 1),
+            'acima_do_python_vazio_ms': round((statistics.median(tempos) - statistics.median(base)) * 1000, 1),
+        }
+        if nome != 'cli_ajuda':
+            carregados = saida.strip()
+            resultado[nome]['modulos_pesados'] = carregados.split(",") if carregados else []
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    return 1 if any(r.get('modulos_pesados') for r in resultado.values() if isinstance(r, dict)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Benchmark da mesclagem: motor PyMuPDF (em etapas, sem repetir recursos) contra o PdfMerger do PyPDF2.
+
+Gera ``--arquivos`` comprovantes pequenos com o texto do corpus sintético e o
+mesmo logotipo (uma imagem) em cada um, como os comprovantes de um mesmo
+banco, e mescla todos com cada motor em um processo separado. Para cada
+motor informa o tempo, o pico de memória e o tamanho do PDF gerado.
+
+Uso:
+    python benchmarks/bench_mesclagem.py
+    python benchmarks/bench_mesclagem.py --arquivos 5000 --json mesclagem.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_divisao import pico_memoria_mb  # noqa: E402
+from corpus_sintetico import gerar_textos  # noqa: E402
+from processador import MOTORES_MESCLAGEM  # noqa: E402
+
+
+def _logotipo():
+    """PNG de 300x100 com um degradê, para não ser comprimido a quase nada"""
+    import fitz
+
+    linha = b"".join(bytes((x * 255 // 299, 90, 255 - x * 255 // 299)) for x in range(300))
+    return fitz.Pixmap(fitz.csRGB, 300, 100, linha * 100, False).tobytes("png")
+
+
+def gerar_comprovantes(pasta, quantidade):
+    """Grava ``quantidade`` comprovantes de uma página com o mesmo logotipo; retorna os caminhos"""
+    import fitz
+
+    logotipo = _logotipo()
+    caminhos = []
+    for numero, texto in enumerate(gerar_textos(quantidade)):
+        caminho = os.path.join(pasta, f"comprovante_{numero:05d}.pdf")
+        doc = fitz.open()
+        try:
+            page = doc.new_page()
+            page.insert_image(fitz.Rect(50, 30, 200, 80), stream=logotipo)
+            page.insert_text((50, 100), texto, fontsize=9)
+            doc.save(caminho, garbage=3, deflate=True)
+        finally:
+            doc.close()
+        caminhos.append(caminho)
+    return caminhos
+
+
+def executar_motor(motor, lista, saida):
+    """Mescla os arquivos da lista neste processo e imprime o resultado em JSON"""
+    from processador import ProcessadorComprovantes
+
+    with open(lista, encoding="utf-8") as f:
+        arquivos = f.read().splitlines()
+    inicio = time.perf_counter()
+    mesclados = ProcessadorComprovantes(log=lambda m: None).merge_pdfs(arquivos, saida, motor)
+    duracao = time.perf_counter() - inicio
+    print(json.dumps({
+        'motor': motor,
+        'arquivos': mesclados,
+        'segundos': round(duracao, 3),
+        'pico_rss_mb': round(pico_memoria_mb() or 0, 1),
+        'bytes_saida': os.path.getsize(saida),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--arquivos", type=int, default=1000, help="quantidade de comprovantes a mesclar")
+    parser.add_argument("--motores", default=",".join(MOTORES_MESCLAGEM),
+                        help=f"motores separados por vírgula (padrão: {','.join(MOTORES_MESCLAGEM)})")
+    parser.add_argument("--json", help="grava o resultado também neste arquivo")
+    parser.add_argument("--executar", choices=MOTORES_MESCLAGEM, help=argparse.SUPPRESS)
+    parser.add_argument("--lista", help=argparse.SUPPRESS)
+    parser.add_argument("--saida", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_motor(args.executar, args.lista, args.saida)
+        return 0
+
+    trabalho = tempfile.mkdtemp(prefix="bench_mesclagem_")
+    try:
+        caminhos = gerar_comprovantes(trabalho, args.arquivos)
+        lista = os.path.join(trabalho, "arquivos.txt")
+        with open(lista, "w", encoding="utf-8") as f:
+            f.write("\n".join(caminhos))
+        entrada = sum(os.path.getsize(c) for c in caminhos)
+
+        resultados = []
+        for motor in args.motores.split(","):
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--executar", motor, "--lista", lista,
+                 "--saida", os.path.join(trabalho, f"mesclado_{motor}.pdf")],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            resultado = json.loads(saida.strip().splitlines()[-1])
+            resultados.append(resultado)
+            print(f"{motor:>8}: {resultado['segundos']} s, pico RSS {resultado['pico_rss_mb']} MB, "
+                  f"{resultado['bytes_saida']} bytes", file=sys.stderr)
+    finally:
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    relatorio = {'arquivos': args.arquivos, 'bytes_entrada': entrada, 'resultados': resultados}
+    texto = json.dumps(relatorio, indent=2)
+    print(texto)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
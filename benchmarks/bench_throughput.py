@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Suíte de desempenho: divisão, renomeação e mesclagem sobre o corpus sintético.
+
+Para cada tamanho gera um PDF com todos os layouts (``corpus_sintetico.py``)
+e mede, cada operação em um processo separado (para o pico de memória de uma
+não contaminar a outra):
+
+    dividir    ProcessadorComprovantes.process_single_pdf (com ZIP)
+    renomear   rename_pdfs sobre os comprovantes divididos
+    mesclar    merge_pdfs dos comprovantes divididos em um único PDF
+
+O resultado sai em JSON (páginas/s, tempo, pico de memória e bytes gravados),
+para comparar versões.
+
+Uso:
+    python benchmarks/bench_throughput.py
+    python benchmarks/bench_throughput.py --tamanhos 10,100,1000,10000 --json resultado.json
+    python benchmarks/bench_throughput.py --operacoes dividir --otimizar-saida maxima
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_divisao import pico_memoria_mb  # noqa: E402
+from corpus_sintetico import LAYOUTS, gerar_pdf  # noqa: E402
+from processador import OTIMIZACAO_SAIDA_PADRAO, OTIMIZACOES_SAIDA  # noqa: E402
+
+OPERACOES = ['dividir', 'renomear', 'mesclar']
+TAMANHOS_PADRAO = "10,100,1000"
+
+
+def _bytes_gravados(pasta):
+    total = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        total += sum(os.path.getsize(os.path.join(raiz, a)) for a in arquivos)
+    return total
+
+
+def dividir(pdf_path, trabalho, workers, otimizar_saida=OTIMIZACAO_SAIDA_PADRAO):
+    """Divide o PDF; a saída fica em ``trabalho/saida`` para as operações seguintes"""
+    from processador import ProcessadorComprovantes
+
+    destino = os.path.join(trabalho, "saida")
+    os.makedirs(destino, exist_ok=True)
+    processador = ProcessadorComprovantes(log=lambda m: None, pasta_destino=destino, workers=workers,
+                                          otimizar_saida=otimizar_saida)
+    registros = processador.process_single_pdf(pdf_path)
+    paginas = registros[-1]['pagina_final'] if registros else 0
+    return paginas, len(registros), _bytes_gravados(destino)
+
+
+def _comprovantes(trabalho):
+    return sorted(glob.glob(os.path.join(trabalho, "saida", "comprovantes_processados", "*.pdf")))
+
+
+def _contar_paginas(arquivos):
+    import fitz
+
+    total = 0
+    for arquivo in arquivos:
+        with fitz.open(arquivo) as doc:
+            total += len(doc)
+    return total
+
+
+def renomear(pdf_path, trabalho, workers):
+    """Renomeia uma cópia dos comprovantes divididos"""
+    from processador import ProcessadorComprovantes
+
+    copia = os.path.join(trabalho, "renomear")
+    shutil.rmtree(copia, ignore_errors=True)
+    os.makedirs(copia)
+    arquivos = []
+    for arquivo in _comprovantes(trabalho):
+        # Nomes neutros, para a renomeação ter trabalho a fazer
+        destino = os.path.join(copia, f"copia_{len(arquivos):05d}.pdf")
+        shutil.copyfile(arquivo, destino)
+        arquivos.append(destino)
+    paginas = _contar_paginas(arquivos)
+
+    inicio = time.perf_counter()
+    ProcessadorComprovantes(log=lambda m: None, workers=workers).rename_pdfs(arquivos)
+    return paginas, len(arquivos), 0, time.perf_counter() - inicio
+
+
+def mesclar(pdf_path, trabalho, workers):
+    """Mescla os comprovantes divididos em um único PDF"""
+    from processador import ProcessadorComprovantes
+
+    arquivos = _comprovantes(trabalho)
+    saida = os.path.join(trabalho, "mesclado.pdf")
+    paginas = _contar_paginas(arquivos)
+
+    inicio = time.perf_counter()
+    ProcessadorComprovantes(log=lambda m: None).merge_pdfs(arquivos, saida)
+    return paginas, len(arquivos), os.path.getsize(saida), time.perf_counter() - inicio
+
+
+def executar_operacao(operacao, pdf_path, trabalho, workers, otimizar_saida):
+    """Executa uma operação neste processo e imprime o resultado em JSON"""
+    if operacao == 'dividir':
+        inicio = time.perf_counter()
+        paginas, arquivos, bytes_saida = dividir(pdf_path, trabalho, workers, otimizar_saida)
+        duracao = time.perf_counter() - inicio
+    else:
+        # A preparação (cópias, contagem de páginas) fica fora do tempo medido
+        paginas, arquivos, bytes_saida, duracao = {'renomear': renomear, 'mesclar': mesclar}[operacao](
+            pdf_path, trabalho, workers)
+    print(json.dumps({
+        'operacao': operacao,
+        'paginas': paginas,
+        'arquivos': arquivos,
+        'segundos': round(duracao, 3),
+        'paginas_por_segundo': round(paginas / duracao, 1) if duracao else None,
+        'pico_rss_mb': round(pico_memoria_mb() or 0, 1),
+        'bytes_saida': bytes_saida,
+    }))
+
+
+def _versao():
+    """Commit atual do repositório, quando disponível"""
+    try:
+        return subprocess.run(["git", "-C", RAIZ, "describe", "--always", "--dirty"],
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", default=TAMANHOS_PADRAO,
+                        help=f"quantidades de páginas separadas por vírgula (padrão: {TAMANHOS_PADRAO})")
+    parser.add_argument("--operacoes", default=",".join(OPERACOES),
+                        help=f"operações separadas por vírgula (padrão: {','.join(OPERACOES)})")
+    parser.add_argument("--layouts", help=f"layouts do corpus (padrão: {','.join(LAYOUTS)})")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processos do motor (0 = todos os núcleos)")
+    parser.add_argument("--otimizar-saida", choices=OTIMIZACOES_SAIDA, default=OTIMIZACAO_SAIDA_PADRAO,
+                        help=f"otimização dos comprovantes divididos (padrão: {OTIMIZACAO_SAIDA_PADRAO})")
+    parser.add_argument("--json", help="grava o resultado também neste arquivo")
+    parser.add_argument("--executar", choices=OPERACOES, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    parser.add_argument("--trabalho", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        executar_operacao(args.executar, args.pdf, args.trabalho, args.workers, args.otimizar_saida)
+        return 0
+
+    operacoes = args.operacoes.split(",")
+    layouts = args.layouts.split(",") if args.layouts else None
+    resultados = []
+    for tamanho in (int(t) for t in args.tamanhos.split(",")):
+        trabalho = tempfile.mkdtemp(prefix=f"bench_throughput_{tamanho}_")
+        try:
+            pdf_path = os.path.join(trabalho, f"corpus_{tamanho}.pdf")
+            gerar_pdf(pdf_path, tamanho, layouts)
+            # Renomear e mesclar usam a saída da divisão
+            for operacao in ['dividir'] + [o for o in operacoes if o != 'dividir']:
+                saida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--executar", operacao, "--pdf", pdf_path,
+                     "--trabalho", trabalho, "--workers", str(args.workers),
+                     "--otimizar-saida", args.otimizar_saida],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                resultado = json.loads(saida.strip().splitlines()[-1])
+                if operacao not in operacoes:
+                    continue
+                resultado['tamanho'] = tamanho
+                resultados.append(resultado)
+                print(f"{tamanho:>6} págs {operacao:>9}: {resultado['paginas_por_segundo']} páginas/s, "
+                      f"{resultado['segundos']} s, pico RSS {resultado['pico_rss_mb']} MB, "
+                      f"{resultado['bytes_saida']} bytes", file=sys.stderr)
+        finally:
+            shutil.rmtree(trabalho, ignore_errors=True)
+
+    relatorio = {
+        'versao': _versao(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'workers': args.workers,
+        'otimizar_saida': args.otimizar_saida,
+        'resultados': resultados,
+    }
+    texto = json.dumps(relatorio, indent=2)
+    print(texto)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Gerador de PDFs sintéticos com vários comprovantes, um modelo por layout suportado.
+
+Cada comprovante ocupa uma página (FOLHA ocupa uma página de resumo seguida de
+páginas de continuação com CPFs), cercada por linhas comuns de comprovante
+para ter o tamanho de uma página real. Os nomes e valores variam com uma
+semente fixa, então o mesmo tamanho gera sempre o mesmo PDF.
+
+Uso:
+    python benchmarks/corpus_sintetico.py saida.pdf --paginas 1000
+    python benchmarks/corpus_sintetico.py saida.pdf --paginas 500 --layouts santander,bb
+"""
+
+import argparse
+import random
+
+MODELOS = {
+    'santander': (
+        "SANTANDER\nComprovante de pagamento de boleto\nDados do Beneficiário Original\n{cnpj}\n"
+        "Razão Social: {nome}\nValor do documento: {valor}\n"
+    ),
+    'bb': (
+        "SAC BB\nComprovante de pagamento\nBeneficiario: {nome}\nNome Fantasia: {fantasia}\n"
+        "Valor cobrado: {valor}\n"
+    ),
+    'itau': "Itaú\nComprovante de transferência\nDA EMPRESA\nNome:\n{nome}\nValor: R$ {valor}\n",
+    'btg': "BTG Pactual\nCliente: EMPRESA PAGADORA\nFavorecido: {nome}\nValor: {valor}\n",
+    'caixa': "CAIXA\nComprovante de PIX\nNome social:\n{nome}\nValor da transação: R$ {valor}\n",
+    'bradesco': (
+        "Comprovante de transação bancária\nDados de quem pagou\nNome: EMPRESA PAGADORA LTDA\n"
+        "Dados de quem recebeu\nNome: {nome}\nCPF: ***.{cpf_meio}-**\nValor: R$ {valor}\n"
+    ),
+    'fgts': "FGTS GRF - GUIA DE RECOLHIMENTO DO FGTS\nValor recolhido: R$ {valor}\n",
+    'darf': "Comprovante de Pagamento de DARF\nCódigo da receita: 0561\nValor total: {valor}\n",
+    'folha': "Pagamento de Salários\n{cpfs}\nValor total: {valor}\n",
+}
+
+LAYOUTS = list(MODELOS)
+
+NOMES = [
+    "FORNECEDOR ABC LTDA", "TRANSPORTADORA RAPIDA", "MERCADO DO BAIRRO", "CLINICA SAUDE",
+    "ESCRITORIO CONTABIL", "PADARIA PAO QUENTE", "CONCESSIONARIA ENERGIA", "LOJA CENTRAL",
+    "PRESTADOR DE SERVICOS", "ACADEMIA FORMA FISICA", "MARIA DA SILVA", "JOSE PEREIRA",
+]
+
+PREENCHIMENTO = [
+    "Agência: 1234-5  Conta corrente: 12345-6", "Data da operação: 15/03/2024 às 10:42:13",
+    "Autenticação: 8F3A.29C1.77B0.DD41.0A9E", "Canal: Internet Banking Empresarial",
+    "Identificação no extrato: PAG FORNEC", "Documento: 000123456", "Situação: Efetivado",
+    "Em caso de dúvidas ligue para a central de atendimento", "Ouvidoria 0800 000 0000",
+]
+
+LINHAS_POR_PAGINA = 40
+CPFS_POR_CONTINUACAO = 30
+
+
+def _cpf(rnd):
+    return f"{rnd.randint(100, 999)}.{rnd.randint(100, 999)}.{rnd.randint(100, 999)}-{rnd.randint(10, 99)}"
+
+
+def _valor(rnd):
+    reais = rnd.randint(1, 99999)
+    return f"{reais:,}".replace(",", ".") + f",{rnd.randint(0, 99):02d}"
+
+
+def _pagina(rnd, comprovante):
+    """Comprovante cercado por linhas de preenchimento"""
+    linhas = [rnd.choice(PREENCHIMENTO) for _ in range(LINHAS_POR_PAGINA - comprovante.count("\n"))]
+    linhas.insert(rnd.randint(0, 10), comprovante.rstrip("\n"))
+    return "\n".join(linhas)
+
+
+def gerar_textos(paginas, layouts=None, semente=2024):
+    """Textos das páginas, alternando os layouts até completar ``paginas``"""
+    rnd = random.Random(semente)
+    layouts = layouts or LAYOUTS
+    textos = []
+    comprovantes = 0
+    while len(textos) < paginas:
+        layout = layouts[comprovantes % len(layouts)]
+        comprovantes += 1
+        campos = {
+            'nome': rnd.choice(NOMES),
+            'fantasia': rnd.choice(NOMES).split()[0],
+            'valor': _valor(rnd),
+            'cnpj': (f"{rnd.randint(10, 99)}.{rnd.randint(100, 999)}.{rnd.randint(100, 999)}"
+                     f"/0001-{rnd.randint(10, 99)}"),
+            'cpf_meio': f"{rnd.randint(100, 999)}.{rnd.randint(100, 999)}",
+            'cpfs': "\n".join(f"{_cpf(rnd)} {rnd.choice(NOMES)}" for _ in range(4)),
+        }
+        textos.append(_pagina(rnd, MODELOS[layout].format(**campos)))
+        if layout == 'folha':
+            for _ in range(min(rnd.randint(1, 3), paginas - len(textos))):
+                textos.append("\n".join(f"{_cpf(rnd)} {rnd.choice(NOMES)}" for _ in range(CPFS_POR_CONTINUACAO)))
+    return textos[:paginas]
+
+
+def gerar_pdf(caminho, paginas, layouts=None, semente=2024):
+    """Grava o PDF sintético e retorna a quantidade de páginas"""
+    import fitz
+
+    doc = fitz.open()
+    try:
+        for texto in gerar_textos(paginas, layouts, semente):
+            page = doc.new_page()
+            page.insert_text((50, 50), texto, fontsize=9)
+        doc.save(caminho, garbage=3, deflate=True)
+    finally:
+        doc.close()
+    return paginas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("saida", help="PDF a ser gerado")
+    parser.add_argument("--paginas", type=int, default=1000)
+    parser.add_argument("--layouts", help=f"layouts separados por vírgula (padrão: {','.join(LAYOUTS)})")
+    parser.add_argument("--semente", type=int, default=2024)
+    args = parser.parse_args()
+
+    layouts = args.layouts.split(",") if args.layouts else None
+    gerar_pdf(args.saida, args.paginas, layouts, args.semente)
+    print(f"{args.paginas} páginas gravadas em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""Implementação anterior (cadeias de if) dos extratores, mantida como referência.
+
+Usada por ``bench_extratores.py`` para conferir que o motor de regras de
+``extratores.py`` devolve os mesmos resultados e para comparar a velocidade.
+Não deve ser usada pelo programa.
+"""
+
+import re
+
+BENEFICIARIO_INDEFINIDO = "BENEFICIÁRIO INDEFINIDO"
+VALOR_INDEFINIDO = "VALOR INDEFINIDO"
+
+
+def contem_4_cpfs(texto):
+    """Verifica se o texto contém pelo menos 4 CPFs no formato XXX.XXX.XXX-XX"""
+    if texto is None:
+        return False
+    cpfs = re.findall(r"\d{3}\.\d{3}\.\d{3}-\d{2}", texto)
+    return len(cpfs) >= 4
+
+
+def extrair_beneficiario(texto):
+    """Extrai o nome do beneficiário do texto com tratamento para None"""
+    if texto is None or texto.strip() == "":
+        return "BENEFICIÁRIO INDEFINIDO"
+
+    texto = texto.upper()
+
+    # CASO ESPECÍFICO BRADESCO (VINICIUS) - PRIORIDADE MÁXIMA
+    if "DADOS DE QUEM RECEBEU" in texto:
+        partes = texto.split("DADOS DE QUEM RECEBEU")
+        if len(partes) > 1:
+            parte_recebedor = partes[1]
+            match = re.search(r"NOME:\s*([^\n]+)", parte_recebedor)
+            if match:
+                nome = match.group(1).strip()
+                if nome and nome != "NOME":
+                    return nome[:25]
+
+    # Critério para SAC BB - entre "BENEFICIARIO:" e "NOME FANTASIA:"
+    if "BENEFICIARIO:" in texto and "NOME FANTASIA:" in texto:
+        partes = texto.split("BENEFICIARIO:")
+        if len(partes) > 1:
+            subpartes = partes[1].split("NOME FANTASIA:")
+            if len(subpartes) > 0:
+                beneficiario = subpartes[0].strip()
+                if beneficiario:
+                    return beneficiario.split('\n')[0][:25]
+
+    # Novo critério para FGTS
+    if "FGTS GRF" in texto:
+        return "FGTS"
+
+    # Novo critério para Santander - Convenio de Arrecadacao
+    if "CONVENIO DE ARRECADACAO" in texto:
+        match = re.search(r"PM\s+([^\n]+)", texto)
+        if match:
+            return match.group(1).strip()[:25]
+
+    # Caso especial para "DA EMPRESA"
+    if "DA EMPRESA" in texto:
+        padrao_nome = re.compile(r'NOME:\s*\n\s*([^\n]+)')
+        match = padrao_nome.search(texto)
+        if match:
+            beneficiario = match.group(1).strip()
+            if beneficiario and beneficiario not in ['', 'NOME']:
+                return beneficiario[:25]
+
+        padrao_nome_linha = re.compile(r'NOME:\s*([^\n]+)')
+        match = padrao_nome_linha.search(texto)
+        if match:
+            beneficiario = match.group(1).strip()
+            beneficiario = re.split(r'\s{2,}|CNPJ|CPF|$', beneficiario)[0]
+            if beneficiario and beneficiario not in ['', 'NOME']:
+                return beneficiario[:25]
+
+    if texto.startswith("DA EMPRESA"):
+        match = re.search(r"NOME:\s*(\S.*?)(?:\n|$)", texto, re.IGNORECASE)
+        if match:
+            beneficiario = match.group(1).strip()
+            if beneficiario and beneficiario.upper() not in ['', 'NOME']:
+                return beneficiario.upper()[:25]
+
+    if "PAGAMENTO DE DARF" in texto:
+        return "DARF"
+    if "CAGEPA" in texto:
+        return "CAGEPA"
+
+    if "SALÁRIO" in texto or "SALARIOS" in texto:
+        return "FOLHA"
+
+    clientes = [m.start() for m in re.finditer("CLIENTE:", texto)]
+    if len(clientes) >= 2:
+        ultimo_cliente_pos = clientes[-1]
+        texto_apos = texto[ultimo_cliente_pos+8:]
+        beneficiario = texto_apos.split('\n')[0].strip()
+        if beneficiario:
+            return beneficiario.upper()[:25]
+
+    if "CLIENTE:" in texto and "FAVORECIDO:" in texto:
+        partes = texto.split("FAVORECIDO:")
+        if len(partes) > 1:
+            beneficiario = partes[1].split('\n')[0].strip()
+            if beneficiario:
+                return beneficiario.upper()[:25]
+
+    if "NOME SOCIAL:" in texto:
+        linhas = texto.split('\n')
+        for i, linha in enumerate(linhas):
+            if "NOME SOCIAL:" in linha and i + 1 < len(linhas):
+                beneficiario = linhas[i + 1].strip()
+                if beneficiario and beneficiario.upper() not in ['NOME', '']:
+                    return beneficiario.upper()[:25]
+
+    if "CONVENIO" in texto:
+        partes = texto.split("CONVENIO")
+        if len(partes) > 1:
+            beneficiario = partes[1].split('\n')[0].strip()
+            if beneficiario:
+                return beneficiario.upper()[:25]
+
+    if "NOME DO RECEBEDOR:" in texto:
+        partes = texto.split("NOME DO RECEBEDOR:")
+        if len(partes) > 1:
+            beneficiario = partes[1].split('\n')[0].strip()
+            if beneficiario:
+                return beneficiario.upper()[:25]
+
+    if "NOME FANTASIA:" in texto:
+        match = re.search(r"NOME FANTASIA:\s*(.*?)(?:\n|$)", texto)
+        if match:
+            beneficiario = match.group(1).strip()
+            if beneficiario:
+                return beneficiario.upper()[:25]
+
+        linhas = texto.split('\n')
+        for i, linha in enumerate(linhas):
+            if "NOME FANTASIA:" in linha and i+1 < len(linhas):
+                beneficiario = linhas[i+1].strip()
+                if beneficiario:
+                    return beneficiario.upper()[:25]
+
+    if "SANTANDER" in texto and "DADOS DO BENEFICIÁRIO ORIGINAL" in texto:
+        padrao_santander = re.compile(
+            r"DADOS DO BENEFICIÁRIO ORIGINAL.*?RAZÃO SOCIAL:\s*([^\n]+)",
+            re.IGNORECASE | re.DOTALL
+        )
+        match = padrao_santander.search(texto)
+        if match:
+            beneficiario = match.group(1).strip()
+            beneficiario = re.sub(r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}', '', beneficiario).strip()
+            if beneficiario:
+                return beneficiario.upper()[:25]
+
+        linhas = [linha.strip() for linha in texto.split('\n') if linha.strip()]
+        for i, linha in enumerate(linhas):
+            if "DADOS DO BENEFICIÁRIO ORIGINAL" in linha and i+3 < len(linhas):
+                if re.search(r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}', linhas[i+1]):
+                    beneficiario = linhas[i+3]
+                    if not re.search(r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}', beneficiario):
+                        return beneficiario.upper()[:25]
+
+    padroes = [
+        r"FAVORECIDA:\s*(.+)",
+        r"PAGO\s+PARA:?\s*(.+)",
+        r"FAVORECIDO:?\s*(.+)",
+        r"BENEFICI[ÁA]RIO:?\s*(.+)",
+        r"NOME:?\s*(.+)",
+        r"NOME DO RECEBEDOR:?\s*(.+)",
+        r"CREDITADA:\s*NOME:?\s*(.+)",
+        r"BENEFICIÁRIO:?\s*(.+)",
+        r"TIPO DE COMPROMISSO:?\s*(.+)",
+        r"DADOS DO RECEBEDOR\s*\n\s*PARA\s*(.+)",
+        r"FAVORECIDO\s*\n\s*NOME:?\s*(.+)",
+    ]
+
+    for padrao in padroes:
+        match = re.search(padrao, texto, re.IGNORECASE)
+        if match:
+            nome = match.group(1).split("CNPJ")[0].strip().split("\n")[0]
+            nome = re.sub(r"[^\w\s]", "", nome).strip()
+
+            if "DO PAGADOR" in nome or "FANTASIA" in nome:
+                return "BENEFICIÁRIO INDEFINIDO"
+
+            if "BENEFICIÁRIO ORIGINAL" in texto and nome == "ORIGINAL":
+                continue
+
+            if nome == "NOME":
+                linhas = texto.splitlines()
+                for i, linha in enumerate(linhas):
+                    if linha.strip() == "NOME:" and i + 1 < len(linhas):
+                        nome = linhas[i + 1].strip()
+                        break
+
+            return nome.upper()[:25] if nome else "BENEFICIÁRIO INDEFINIDO"
+
+    return "BENEFICIÁRIO INDEFINIDO"
+
+
+def extrair_valor(texto, log=None):
+    """Extrai valor do texto com tratamento para None"""
+    if texto is None or texto.strip() == "":
+        return "VALOR INDEFINIDO"
+
+    texto = str(texto).upper()
+
+    # PRIORIDADE ABSOLUTA PARA VALOR COBRADO (MESMA LINHA)
+    if "VALOR COBRADO" in texto:
+        # Busca padrão: "VALOR COBRADO" seguido de números
+        match = re.search(r"VALOR COBRADO[:\s]*R?\$?\s*([\d.,]+)", texto)
+        if not match:
+            # Se não encontrar na mesma linha, busca na próxima
+            linhas = texto.split('\n')
+            for i, linha in enumerate(linhas):
+                if "VALOR COBRADO" in linha and i + 1 < len(linhas):
+                    valor_linha = linhas[i + 1].strip()
+                    match = re.search(r"R?\$?\s*([\d.,]+)", valor_linha)
+        if match:
+            valor = match.group(1).replace('.', '').replace(',', '_')
+            return valor.upper()
+
+    # Caso específico para comprovantes de PIX do Bradesco
+    if "VALOR:" in texto:
+        match = re.search(r"VALOR:\s*R?\$?\s*([\d.,]+)", texto)
+        if match:
+            valor = match.group(1).replace('.', '').replace(',', '_')
+            return valor.upper()
+
+    if "VALOR RECOLHIDO:" in texto:
+        match = re.search(r"VALOR RECOLHIDO:\s*R?\$?\s*([\d.,]+)", texto)
+        if match:
+            valor = match.group(1).replace('.', '').replace(',', '_')
+            return valor.upper()
+
+    if "CONVENIO DE ARRECADACAO" in texto:
+        match = re.search(r"R\$\s*([\d.,]+)", texto)
+        if match:
+            valor = match.group(1).replace('.', '').replace(',', '_')
+            return valor.upper()
+
+    padrao_cnpj_valor = re.search(r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}[^\d]*([\d]{1,3}(?:\.?\d{3})*,\d{2})', texto)
+    if padrao_cnpj_valor:
+        valor = padrao_cnpj_valor.group(1).replace('.', '').replace(',', '_')
+        if log:
+            log("Valor identificado após CNPJ")
+        return valor.upper()
+
+    if "(=) VALOR DO PAGAMENTO:" in texto:
+        linhas = texto.split('\n')
+        for i, linha in enumerate(linhas):
+            if "(=) VALOR DO PAGAMENTO:" in linha and i+1 < len(linhas):
+                valor_linha = linhas[i+1].strip()
+                match = re.search(r'[\d]{1,3}(?:\.?\d{3})*,\d{2}', valor_linha)
+                if match:
+                    valor = match.group(0).replace('.', '').replace(',', '_')
+                    return valor.upper()
+
+    if "VALOR DA TRANSAÇÃO:" in texto:
+        partes = texto.split("VALOR DA TRANSAÇÃO:")
+        if len(partes) > 1:
+            valor_part = partes[1].split('\n')[0].strip()
+            match = re.search(r'[\d]{1,3}(?:\.?\d{3})*,\d{2}', valor_part)
+            if match:
+                valor = match.group(0).replace('.', '').replace(',', '_')
+                return valor.upper()
+
+    padroes = [
+        r"\(=\)\s*VALOR\s*DO\s*PAGAMENTO\s*\(R\$\):\s*([\d\.,]+)",
+        r"\(=\)\s*VALOR\s*DO\s*PAGAMENTO\s*\(R\$\):\s*\n\s*([\d\.,]+)",
+        r"VALOR\s+DO\s+DOCUMENTO[:\s]*R?\$?\s*([\d\.,]+)",
+        r"VALOR[:\s]*R?\$?\s*([\d\.,]+)",
+        r"VALOR\s*:\s*R?\$?\s*([\d\.,]+)",
+        r"VALOR DA TED[:\s]*R?\$?\s*([\d\.,]+)",
+        r"VALOR DO PAGAMENTO \(R\$\):?\s*([\d\.,]+)",
+        r"VALOR TOTAL PAGO[:\s]*R?\$?\s*([\d\.,]+)",
+        r"VALOR TOTAL[:\s]*R?\$?\s*([\d\.,]+)",
+        r"VALOR ATUALIZADO:?\s*R?\$?\s*([\d\.,]+)",
+    ]
+
+    for padrao in padroes:
+        match = re.search(padrao, texto, re.IGNORECASE)
+        if match:
+            valor = match.group(1).replace(".", "").replace(",", "_")
+            return valor.upper()
+
+    return "VALOR INDEFINIDO"
@@ -35,24 +35,24 @@ a = Analysis(
     ],
     datas=[
         ('assets/app.ico', 'assets'),
-        *collect_data_files('PIL'),
         *collect_data_files('tkinterdnd2'),  # Adicionado especificamente para tkinterdnd2
     ],
+    # fitz, PyPDF2 e openpyxl são importados dentro das funções; o PyInstaller
+    # os encontra mesmo assim, mas ficam listados para não depender disso
     hiddenimports=[
         'tkinter',
         'fitz',
         'pkg_resources.py2_warn',
-        'PIL',
-        'pandas._libs.tslibs.timedeltas',  # Importante para pandas
-        'pandas._libs.tslibs.np_datetime',  # Importante para pandas
-        'pandas._libs.tslibs.base',  # Importante para pandas
+        'PyPDF2',
+        'openpyxl',
         'tkinterdnd2',  # Adicionado explicitamente
-        'numpy',  # Necessário para pandas
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=['cv2', 'pdf2image'],  # Removidos se não estiver usando
+    # O relatório não usa mais pandas/numpy e o Parquet (pyarrow) fica fora do executável.
+    # Pillow e pytesseract (OCR) só entram se estiverem instalados no ambiente de compilação.
+    excludes=['cv2', 'pdf2image', 'pandas', 'numpy', 'pyarrow', 'matplotlib', 'scipy', 'IPython'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
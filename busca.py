@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Índice de busca local (SQLite FTS5) dos comprovantes gerados.
+
+Cada comprovante gravado pela divisão entra no índice com o texto das suas
+páginas, o PDF e as páginas de origem e os campos extraídos (beneficiário,
+valor, data, CPF/CNPJ e autenticação). As consultas combinam:
+
+    texto         palavras em qualquer lugar do comprovante (índice FTS5,
+                  sem diferenciar maiúsculas nem acentos)
+    beneficiario  palavras do nome, aceitando o começo de cada uma (os nomes
+                  são cortados em 25 caracteres)
+    documento     CPF ou CNPJ, com ou sem pontuação
+    valor         faixa de valores
+    data          faixa de datas do pagamento
+
+Valor, data e documento ficam em colunas com índice próprio, então mesmo
+um arquivo de vários anos, com centenas de milhares de comprovantes,
+responde em milissegundos, sem reabrir nenhum PDF.
+
+Os comprovantes são acumulados em memória e gravados em lotes de
+``COMPROVANTES_POR_LOTE``, cada um em uma transação curta, para os
+processos do pool não ficarem esperando um ao outro.
+"""
+
+import os
+import re
+import sqlite3
+import time
+
+from relatorio import valor_numerico
+
+INDICE_BUSCA_PADRAO = os.path.join(os.path.expanduser("~"), ".divisor_comprovantes", "busca.sqlite3")
+
+COMPROVANTES_POR_LOTE = 200
+LIMITE_PADRAO = 50
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS comprovantes (
+    id INTEGER PRIMARY KEY,
+    local TEXT NOT NULL UNIQUE,
+    arquivo_zip TEXT,
+    origem TEXT NOT NULL,
+    pagina_inicial INTEGER NOT NULL,
+    pagina_final INTEGER NOT NULL,
+    layout TEXT,
+    beneficiario TEXT NOT NULL,
+    valor REAL,
+    data TEXT NOT NULL DEFAULT '',
+    documento TEXT NOT NULL DEFAULT '',
+    autenticacao TEXT NOT NULL DEFAULT '',
+    registrado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comprovantes_valor ON comprovantes(valor);
+CREATE INDEX IF NOT EXISTS comprovantes_data ON comprovantes(data);
+CREATE INDEX IF NOT EXISTS comprovantes_documento ON comprovantes(documento);
+CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+    beneficiario, texto, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_COLUNAS = ('local', 'arquivo_zip', 'origem', 'pagina_inicial', 'pagina_final', 'layout', 'beneficiario',
+            'valor', 'data', 'documento', 'autenticacao')
+
+_RE_NAO_DIGITO = re.compile(r"\D")
+_RE_PALAVRA = re.compile(r"\w+")
+
+
+def _normalizar(caminho):
+    return os.path.normcase(os.path.abspath(caminho))
+
+
+def _termos(texto, prefixo=False):
+    """Palavras do texto como termos FTS5 entre aspas (sem operadores vindos do usuário)"""
+    sufixo = "*" if prefixo else ""
+    return " ".join(f'"{palavra}"{sufixo}' for palavra in _RE_PALAVRA.findall(texto))
+
+
+def somente_digitos(documento):
+    """CPF/CNPJ sem pontuação, como fica guardado no índice"""
+    return _RE_NAO_DIGITO.sub('', documento or '')
+
+
+class IndiceBusca:
+    """Comprovantes gerados e o texto de cada um, consultáveis entre execuções."""
+
+    def __init__(self, caminho=INDICE_BUSCA_PADRAO):
+        self.caminho = caminho
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        # Vários processos do pool gravam no mesmo índice
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(_ESQUEMA)
+        self._pendentes = []
+
+    def close(self):
+        try:
+            self.gravar()
+        finally:
+            self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def registrar(self, registro, texto):
+        """Acrescenta o comprovante de um registro da divisão com o texto das suas páginas.
+
+        Um comprovante gravado de novo no mesmo local substitui o anterior.
+        """
+        self._pendentes.append((
+            (
+                _normalizar(registro['arquivo_saida']),
+                registro.get('arquivo_zip'),
+                registro['arquivo_origem'],
+                registro['pagina_inicial'],
+                registro['pagina_final'],
+                registro.get('layout'),
+                registro['beneficiario'],
+                valor_numerico(registro['valor']),
+                registro.get('data') or '',
+                somente_digitos(registro.get('documento')),
+                registro.get('autenticacao') or '',
+            ),
+            texto or '',
+        ))
+        if len(self._pendentes) >= COMPROVANTES_POR_LOTE:
+            self.gravar()
+
+    def gravar(self):
+        """Grava os comprovantes acumulados em uma única transação"""
+        if not self._pendentes:
+            return
+        pendentes, self._pendentes = self._pendentes, []
+        agora = time.time()
+        with self.conexao:
+            for campos, texto in pendentes:
+                anterior = self.conexao.execute(
+                    "SELECT id FROM comprovantes WHERE local = ?", (campos[0],)).fetchone()
+                if anterior is not None:
+                    self.conexao.execute("DELETE FROM textos WHERE rowid = ?", anterior)
+                    self.conexao.execute("DELETE FROM comprovantes WHERE id = ?", anterior)
+                identificador = self.conexao.execute(
+                    f"INSERT INTO comprovantes ({', '.join(_COLUNAS)}, registrado) "
+                    f"VALUES ({', '.join('?' * len(_COLUNAS))}, ?)",
+                    campos + (agora,),
+                ).lastrowid
+                self.conexao.execute(
+                    "INSERT INTO textos (rowid, beneficiario, texto) VALUES (?, ?, ?)",
+                    (identificador, campos[6], texto),
+                )
+
+    def mover(self, pares):
+        """Atualiza o local dos comprovantes renomeados, a partir de ``(origem, destino)``"""
+        self.gravar()
+        with self.conexao:
+            for origem, destino in pares:
+                origem, destino = _normalizar(origem), _normalizar(destino)
+                if origem == destino:
+                    continue
+                # Um comprovante que já estava no destino sai das duas tabelas, como em gravar
+                anterior = self.conexao.execute(
+                    "SELECT id FROM comprovantes WHERE local = ?", (destino,)).fetchone()
+                if anterior is not None:
+                    self.conexao.execute("DELETE FROM textos WHERE rowid = ?", anterior)
+                    self.conexao.execute("DELETE FROM comprovantes WHERE id = ?", anterior)
+                self.conexao.execute(
+                    "UPDATE comprovantes SET local = ? WHERE local = ?", (destino, origem))
+
+    def buscar(self, texto=None, beneficiario=None, documento=None, valor_minimo=None, valor_maximo=None,
+               data_inicial=None, data_final=None, limite=LIMITE_PADRAO):
+        """Comprovantes que atendem a todos os filtros informados, como dicionários.
+
+        Os indexados por último vêm primeiro. Com ``texto`` ou ``beneficiario``
+        cada resultado traz em ``trecho`` o pedaço do texto encontrado. Datas
+        no formato AAAA-MM-DD.
+        """
+        self.gravar()
+        condicoes = []
+        parametros = []
+        consulta = []
+        termos_beneficiario = _termos(beneficiario or '', prefixo=True)
+        if termos_beneficiario:
+            consulta.append(f"beneficiario : ({termos_beneficiario})")
+        termos_texto = _termos(texto or '')
+        if termos_texto:
+            consulta.append(termos_texto)
+        consulta = " AND ".join(consulta)
+        if consulta:
+            condicoes.append("textos MATCH ?")
+            parametros.append(consulta)
+        if documento:
+            condicoes.append("c.documento = ?")
+            parametros.append(somente_digitos(documento))
+        if valor_minimo is not None:
+            condicoes.append("c.valor >= ?")
+            parametros.append(valor_minimo)
+        if valor_maximo is not None:
+            condicoes.append("c.valor <= ?")
+            parametros.append(valor_maximo)
+        if data_inicial:
+            condicoes.append("c.data >= ?")
+            parametros.append(data_inicial)
+        if data_final:
+            condicoes.append("c.data <= ?")
+            parametros.append(data_final)
+
+        colunas = ", ".join(f"c.{coluna}" for coluna in _COLUNAS)
+        if consulta:
+            # Pela ordem do rowid o FTS5 para nos primeiros resultados; ordenar por relevância (rank)
+            # calcularia a nota de todos os comprovantes com o termo, dezenas de ms num arquivo grande
+            sql = (f"SELECT {colunas}, snippet(textos, 1, '[', ']', '…', 10) FROM textos "
+                   "JOIN comprovantes c ON c.id = textos.rowid")
+            ordem = "ORDER BY textos.rowid DESC"
+        else:
+            sql = f"SELECT {colunas}, NULL FROM comprovantes c"
+            ordem = "ORDER BY c.id DESC"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += f" {ordem} LIMIT ?"
+        parametros.append(limite)
+        return [dict(zip(_COLUNAS + ('trecho',), linha)) for linha in self.conexao.execute(sql, parametros)]
+
+    def total(self):
+        """Quantidade de comprovantes no índice"""
+        self.gravar()
+        return self.conexao.execute("SELECT COUNT(*) FROM comprovantes").fetchone()[0]
+
+    def limpar(self):
+        """Apaga todo o conteúdo do índice"""
+        self._pendentes = []
+        with self.conexao:
+            self.conexao.execute("DELETE FROM textos")
+            self.conexao.execute("DELETE FROM comprovantes")
+        self.conexao.execute("VACUUM")
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Cache local (SQLite) do texto e dos campos extraídos de cada página.
+
+As páginas são identificadas pelo hash do conteúdo do PDF e pelo número da
+página, então renomear ou mover o arquivo não invalida o cache. O texto
+extraído pelo PyMuPDF continua válido enquanto o arquivo não muda; os campos
+(beneficiário, valor, layout...) valem apenas para a versão das regras com que
+foram extraídos, e são refeitos a partir do texto guardado quando as regras
+mudam. Os arquivos usados há mais tempo são descartados quando o cache passa
+de ``limite_paginas`` páginas.
+
+O texto reconhecido por OCR fica em uma tabela própria, indexada pelo hash
+do conteúdo da página (imagens e instruções de desenho), e segue o mesmo
+limite.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+
+from extratores import versao_regras
+
+# Incrementar ao mudar o formato das tabelas ou a análise das páginas no processador
+VERSAO_CACHE = 3
+
+CACHE_PADRAO = os.path.join(os.path.expanduser("~"), ".divisor_comprovantes", "cache_paginas.sqlite3")
+LIMITE_PAGINAS_PADRAO = 200000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    hash TEXT PRIMARY KEY,
+    paginas INTEGER NOT NULL,
+    acesso REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paginas (
+    hash TEXT NOT NULL REFERENCES arquivos(hash) ON DELETE CASCADE,
+    numero INTEGER NOT NULL,
+    texto BLOB NOT NULL,
+    versao TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    folha INTEGER NOT NULL,
+    continuacao INTEGER NOT NULL,
+    data TEXT NOT NULL DEFAULT '',
+    documento TEXT NOT NULL DEFAULT '',
+    autenticacao TEXT NOT NULL DEFAULT '',
+    assinatura TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (hash, numero)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS arquivos_acesso ON arquivos(acesso);
+CREATE TABLE IF NOT EXISTS ocr (
+    hash TEXT PRIMARY KEY,
+    texto BLOB NOT NULL,
+    acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ocr_acesso ON ocr(acesso);
+"""
+
+# Colunas acrescentadas depois da primeira versão, criadas em caches antigos ao abrir
+_COLUNAS_NOVAS = ('data', 'documento', 'autenticacao', 'assinatura')
+
+
+def hash_arquivo(caminho, bloco=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo, lido em blocos"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()
+
+
+class CachePaginas:
+    """Texto e campos extraídos por página, guardados entre execuções."""
+
+    def __init__(self, caminho=CACHE_PADRAO, limite_paginas=LIMITE_PAGINAS_PADRAO, posicional=False,
+                 campos_complementares=True):
+        self.caminho = caminho
+        self.limite_paginas = limite_paginas
+        # A extração por posição dá outros resultados para o mesmo texto
+        versao = f"{VERSAO_CACHE}:{versao_regras()}" + (":posicional" if posicional else "")
+        # Com campos_complementares as páginas gravadas trazem data, CPF/CNPJ, autenticação e assinatura
+        self.versao = versao + (":campos" if campos_complementares else "")
+        # Páginas gravadas com os campos complementares servem também a quem não precisa deles
+        self._versoes_validas = {self.versao, versao + ":campos"}
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        # Vários processos do pool podem usar o mesmo cache ao mesmo tempo
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA foreign_keys=ON")
+        self.conexao.executescript(_ESQUEMA)
+        existentes = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(paginas)")}
+        for coluna in _COLUNAS_NOVAS:
+            if coluna not in existentes:
+                self.conexao.execute(f"ALTER TABLE paginas ADD COLUMN {coluna} TEXT NOT NULL DEFAULT ''")
+
+    def close(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def carregar(self, hash_pdf, total_paginas, com_textos=True):
+        """Retorna ``(paginas, textos)`` do arquivo.
+
+        ``paginas`` só vem preenchida se todas as páginas foram analisadas com
+        a versão atual das regras (e com os campos complementares, se este
+        cache os pede); ``textos`` vem sempre que o arquivo está no cache. Um
+        arquivo ausente devolve ``(None, None)``. Com
+        ``com_textos=False`` o texto nem é lido e ``textos`` vem sempre None.
+        """
+        coluna_texto = "texto" if com_textos else "NULL"
+        linhas = self.conexao.execute(
+            f"SELECT numero, {coluna_texto}, versao, nome, valor, layout, folha, continuacao, data, documento, "
+            "autenticacao, assinatura "
+            "FROM paginas WHERE hash = ? ORDER BY numero",
+            (hash_pdf,),
+        ).fetchall()
+        if len(linhas) != total_paginas:
+            return None, None
+
+        with self.conexao:
+            self.conexao.execute("UPDATE arquivos SET acesso = ? WHERE hash = ?", (time.time(), hash_pdf))
+
+        textos = [zlib.decompress(linha[1]).decode('utf-8') for linha in linhas] if com_textos else None
+        if any(linha[2] not in self._versoes_validas for linha in linhas):
+            return None, textos
+
+        paginas = [
+            {
+                'numero': numero,
+                'nome': nome,
+                'valor': valor,
+                'layout': layout,
+                'folha': bool(folha),
+                'continuacao': bool(continuacao),
+                'data': data,
+                'documento': documento,
+                'autenticacao': autenticacao,
+                'assinatura': assinatura,
+            }
+            for numero, texto, versao, nome, valor, layout, folha, continuacao, data, documento, autenticacao,
+            assinatura in linhas
+        ]
+        return paginas, textos
+
+    def salvar(self, hash_pdf, paginas, textos):
+        """Guarda as páginas analisadas e o texto de cada uma, descartando os arquivos mais antigos"""
+        with self.conexao:
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO arquivos (hash, paginas, acesso) VALUES (?, ?, ?)",
+                (hash_pdf, len(paginas), time.time()),
+            )
+            self._gravar_paginas(hash_pdf, paginas, textos)
+            self._descartar_antigos()
+
+    def salvar_parte(self, hash_pdf, total_paginas, paginas, textos):
+        """Guarda parte das páginas de um arquivo de ``total_paginas``, mantendo as já gravadas"""
+        with self.conexao:
+            # REPLACE apagaria (em cascata) as páginas das partes anteriores
+            self.conexao.execute(
+                "INSERT INTO arquivos (hash, paginas, acesso) VALUES (?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET paginas = excluded.paginas, acesso = excluded.acesso",
+                (hash_pdf, total_paginas, time.time()),
+            )
+            self._gravar_paginas(hash_pdf, paginas, textos)
+            self._descartar_antigos()
+
+    def _gravar_paginas(self, hash_pdf, paginas, textos):
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO paginas "
+            "(hash, numero, texto, versao, nome, valor, layout, folha, continuacao, data, documento, autenticacao, "
+            "assinatura) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (hash_pdf, p['numero'], zlib.compress(texto.encode('utf-8')), self.versao,
+                 p['nome'], p['valor'], p['layout'], int(p['folha']), int(p['continuacao']),
+                 p['data'], p['documento'], p['autenticacao'], p['assinatura'])
+                for p, texto in zip(paginas, textos)
+            ),
+        )
+
+    def _descartar_antigos(self):
+        """Remove os arquivos menos usados até o total de páginas caber no limite"""
+        total = self.conexao.execute("SELECT COALESCE(SUM(paginas), 0) FROM arquivos").fetchone()[0]
+        if total <= self.limite_paginas:
+            return
+        for hash_pdf, paginas in self.conexao.execute(
+                "SELECT hash, paginas FROM arquivos ORDER BY acesso").fetchall():
+            self.conexao.execute("DELETE FROM arquivos WHERE hash = ?", (hash_pdf,))
+            total -= paginas
+            if total <= self.limite_paginas:
+                break
+
+    def texto_ocr(self, chave):
+        """Texto reconhecido antes para a página de ``chave`` (ver ``ocr.chave_pagina``), ou None"""
+        linha = self.conexao.execute("SELECT texto FROM ocr WHERE hash = ?", (chave,)).fetchone()
+        if linha is None:
+            return None
+        with self.conexao:
+            self.conexao.execute("UPDATE ocr SET acesso = ? WHERE hash = ?", (time.time(), chave))
+        return zlib.decompress(linha[0]).decode('utf-8')
+
+    def salvar_ocr(self, chave, texto):
+        """Guarda o texto reconhecido, descartando os mais antigos acima do limite"""
+        with self.conexao:
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO ocr (hash, texto, acesso) VALUES (?, ?, ?)",
+                (chave, zlib.compress(texto.encode('utf-8')), time.time()),
+            )
+            excedente = self.conexao.execute("SELECT COUNT(*) FROM ocr").fetchone()[0] - self.limite_paginas
+            if excedente > 0:
+                self.conexao.execute(
+                    "DELETE FROM ocr WHERE hash IN (SELECT hash FROM ocr ORDER BY acesso LIMIT ?)", (excedente,))
+
+    def limpar(self):
+        """Apaga todo o conteúdo do cache"""
+        with self.conexao:
+            self.conexao.execute("DELETE FROM paginas")
+            self.conexao.execute("DELETE FROM arquivos")
+            self.conexao.execute("DELETE FROM ocr")
+        self.conexao.execute("VACUUM")
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""Linha de comando do Divisor de Comprovantes (sem interface gráfica).
+
+Exemplos:
+    python divisor_cli.py extratos/ -o saida --excel -w 0
+    python divisor_cli.py a.pdf b.pdf --sem-zip --sem-numeracao
+    python divisor_cli.py extratos/ --somente-zip --relatorio csv
+    python divisor_cli.py extratos/ --somente-zip --otimizar-saida maxima
+    python divisor_cli.py extratos/ -o saida --retomar
+    python divisor_cli.py exportacao_marco/ exportacao_abril/ --duplicados pular
+    python divisor_cli.py extratos/ --indexar
+    python divisor_cli.py --buscar boleto --beneficiario "maria souza" --valor-minimo 1000 --data-inicial 01/03/2024
+    python divisor_cli.py --buscar --documento 12.345.678/0001-90 --valor-maximo 1.234,56
+    python divisor_cli.py digitalizados.pdf --ocr --ocr-dpi 200
+    python divisor_cli.py extratos/ --medir --trace medicoes.json
+    python divisor_cli.py entrada_financeiro/ -o saida --monitorar --relatorio csv -w 4
+    python divisor_cli.py comprovantes/ --renomear -w 0
+    python divisor_cli.py comprovantes/renomeacao_desfazer.jsonl --desfazer-renomeacao
+    python divisor_cli.py a.pdf b.pdf --mesclar mesclado.pdf
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import sys
+import time
+
+from busca import INDICE_BUSCA_PADRAO, LIMITE_PADRAO, IndiceBusca
+from cache_paginas import CACHE_PADRAO
+from duplicados import ACAO_DUPLICADOS_PADRAO, ACOES_DUPLICADOS, INDICE_DUPLICADOS_PADRAO
+from manifesto import ARQUIVO_MANIFESTO
+from monitor import ESTABILIDADE_PADRAO, INTERVALO_PADRAO, MonitorPastas
+from ocr import IDIOMA_OCR, OCR_DPI_PADRAO
+from processador import (
+    MOTOR_MESCLAGEM_PADRAO,
+    MOTORES_MESCLAGEM,
+    OTIMIZACAO_SAIDA_PADRAO,
+    OTIMIZACOES_SAIDA,
+    PAGINAS_POR_JANELA,
+    PASTA_SAIDA,
+    ProcessadorComprovantes,
+    corrigir_caminho,
+)
+from relatorio import FORMATOS
+from renomeacao import ARQUIVO_DESFAZER
+
+
+def coletar_pdfs(entradas, recursivo=False):
+    """Expande arquivos e pastas de entrada em uma lista ordenada de PDFs"""
+    pdfs = []
+    for entrada in entradas:
+        entrada = corrigir_caminho(entrada)
+        if os.path.isdir(entrada):
+            if recursivo:
+                for raiz, pastas, arquivos in os.walk(entrada):
+                    # Não reprocessa saídas de execuções anteriores
+                    pastas[:] = sorted(p for p in pastas if p != PASTA_SAIDA)
+                    pdfs.extend(os.path.join(raiz, a) for a in sorted(arquivos) if a.lower().endswith('.pdf'))
+            else:
+                pdfs.extend(os.path.join(entrada, a) for a in sorted(os.listdir(entrada))
+                            if a.lower().endswith('.pdf'))
+        elif entrada.lower().endswith('.pdf'):
+            pdfs.append(entrada)
+        else:
+            print(f"Ignorado (não é PDF nem pasta): {entrada}", file=sys.stderr)
+    return list(dict.fromkeys(pdfs))
+
+
+def valor_argumento(texto):
+    """Valor em reais no formato brasileiro (1.234,56) ou com ponto decimal (1234.56)"""
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return float(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"valor inválido: {texto}")
+
+
+def data_argumento(texto):
+    """Data DD/MM/AAAA ou AAAA-MM-DD, devolvida como AAAA-MM-DD"""
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"data inválida (use DD/MM/AAAA): {texto}")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog="divisor_cli",
+        description="Divide, renomeia e mescla comprovantes de pagamento em PDF sem interface gráfica.",
+    )
+    parser.add_argument("entradas", nargs="*",
+                        help="arquivos PDF ou pastas contendo PDFs; com --buscar, as palavras procuradas no texto")
+    parser.add_argument("-o", "--saida",
+                        help=f"pasta base de saída (recebe '{PASTA_SAIDA}', ZIPs e relatório); "
+                             "padrão: a pasta de cada PDF")
+    parser.add_argument("-r", "--recursivo", action="store_true", help="procura PDFs também nas subpastas")
+    zip_ = parser.add_mutually_exclusive_group()
+    zip_.add_argument("--sem-zip", action="store_true", help="não gera o arquivo ZIP")
+    zip_.add_argument("--somente-zip", action="store_true",
+                      help="grava os comprovantes divididos apenas dentro do ZIP, sem os arquivos soltos")
+    relatorio = parser.add_mutually_exclusive_group()
+    relatorio.add_argument("--excel", action="store_true",
+                           help="gera o relatório Excel (o mesmo que --relatorio xlsx)")
+    relatorio.add_argument("--relatorio", choices=FORMATOS,
+                           help="gera o relatório dos comprovantes no formato escolhido; csv e parquet são "
+                                "mais rápidos que xlsx em lotes grandes (parquet requer pyarrow)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="quantidade de processos em paralelo (0 = todos os núcleos); com um único PDF "
+                             "grande, as páginas são divididas entre os processos")
+    parser.add_argument("--janela", type=int, default=PAGINAS_POR_JANELA, metavar="PAGINAS",
+                        help="PDFs com mais páginas que isso são analisados e divididos em janelas desse "
+                             f"tamanho, com memória limitada (padrão: {PAGINAS_POR_JANELA}; 0 desliga)")
+    parser.add_argument("--otimizar-saida", choices=OTIMIZACOES_SAIDA, default=OTIMIZACAO_SAIDA_PADRAO,
+                        help="reduz o tamanho de cada comprovante gerado: limpa mantém só os recursos usados "
+                             "pela página, reduz as fontes e comprime; maxima também usa object streams e "
+                             f"remove objetos duplicados, gastando mais CPU (padrão: {OTIMIZACAO_SAIDA_PADRAO})")
+    parser.add_argument("--sem-numeracao", action="store_true",
+                        help="remove a numeração dos nomes dos arquivos gerados")
+    parser.add_argument("--cache", default=CACHE_PADRAO, metavar="ARQUIVO",
+                        help="cache de páginas já analisadas, reaproveitado quando o PDF não mudou "
+                             f"(padrão: {CACHE_PADRAO})")
+    parser.add_argument("--sem-cache", action="store_true", help="não lê nem grava o cache de páginas")
+    parser.add_argument("--duplicados", choices=ACOES_DUPLICADOS,
+                        help="consulta o índice de comprovantes já gravados (nesta e em execuções anteriores) e "
+                             "marca no log os repetidos ou os pula, sem gravar nem renomear")
+    parser.add_argument("--indice-duplicados", default=INDICE_DUPLICADOS_PADRAO, metavar="ARQUIVO",
+                        help=f"com --duplicados, onde fica o índice (padrão: {INDICE_DUPLICADOS_PADRAO})")
+    parser.add_argument("--indexar", action="store_true",
+                        help="guarda cada comprovante gerado, com o texto e os campos extraídos, no índice de busca "
+                             "consultado por --buscar")
+    parser.add_argument("--indice-busca", default=INDICE_BUSCA_PADRAO, metavar="ARQUIVO",
+                        help=f"índice usado por --indexar e --buscar (padrão: {INDICE_BUSCA_PADRAO})")
+    parser.add_argument("--posicional", action="store_true",
+                        help="usa a posição das palavras na página para ler o valor ao lado ou abaixo do rótulo, "
+                             "mesmo quando o texto corrido os separa")
+    parser.add_argument("--ocr", action="store_true",
+                        help="reconhece o texto das páginas digitalizadas (requer Tesseract e pytesseract)")
+    parser.add_argument("--ocr-dpi", type=int, default=OCR_DPI_PADRAO,
+                        help=f"resolução usada para renderizar as páginas no OCR (padrão: {OCR_DPI_PADRAO})")
+    parser.add_argument("--ocr-idioma", default=IDIOMA_OCR,
+                        help=f"idioma(s) do Tesseract, ex.: por+eng (padrão: {IDIOMA_OCR})")
+    parser.add_argument("--manifesto", metavar="ARQUIVO",
+                        help=f"registro do andamento do lote (padrão: '{ARQUIVO_MANIFESTO}' na pasta de saída "
+                             "ou na pasta do primeiro PDF)")
+    parser.add_argument("--retomar", action="store_true",
+                        help="continua um lote interrompido, pulando os PDFs e comprovantes já concluídos "
+                             "segundo o manifesto")
+    parser.add_argument("--medir", action="store_true",
+                        help="mostra ao final o tempo gasto em cada etapa e nas regras de extração mais demoradas")
+    parser.add_argument("--trace", metavar="ARQUIVO",
+                        help="grava em JSON os tempos por etapa, arquivo, página e regra de extração "
+                             "(implica --medir)")
+
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_PADRAO,
+                        help=f"com --monitorar, segundos entre as varreduras das pastas (padrão: {INTERVALO_PADRAO})")
+    parser.add_argument("--estabilidade", type=float, default=ESTABILIDADE_PADRAO,
+                        help="com --monitorar, segundos que um PDF precisa ficar sem mudar antes de ser processado "
+                             f"(padrão: {ESTABILIDADE_PADRAO})")
+    busca = parser.add_argument_group("filtros de --buscar")
+    busca.add_argument("--beneficiario", help="palavras do nome do beneficiário (aceita o começo de cada uma)")
+    busca.add_argument("--documento", metavar="CPF_CNPJ", help="CPF ou CNPJ do beneficiário, com ou sem pontuação")
+    busca.add_argument("--valor-minimo", type=valor_argumento, metavar="VALOR")
+    busca.add_argument("--valor-maximo", type=valor_argumento, metavar="VALOR")
+    busca.add_argument("--data-inicial", type=data_argumento, metavar="DATA", help="data do pagamento, DD/MM/AAAA")
+    busca.add_argument("--data-final", type=data_argumento, metavar="DATA")
+    busca.add_argument("--limite", type=int, default=LIMITE_PADRAO,
+                       help=f"quantidade máxima de resultados (padrão: {LIMITE_PADRAO})")
+    parser.add_argument("--motor-mesclagem", choices=MOTORES_MESCLAGEM, default=MOTOR_MESCLAGEM_PADRAO,
+                        help="com --mesclar, pymupdf grava em etapas e remove fontes e imagens repetidas; pypdf2 "
+                             f"monta tudo em memória (padrão: {MOTOR_MESCLAGEM_PADRAO})")
+
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--renomear", action="store_true",
+                      help="apenas renomeia os PDFs de entrada pelo beneficiário e valor da primeira página")
+    modo.add_argument("--desfazer-renomeacao", action="store_true",
+                      help=f"devolve os nomes originais aos arquivos de uma renomeação; as entradas são os arquivos "
+                           f"'{ARQUIVO_DESFAZER}' gravados por ela")
+    modo.add_argument("--mesclar", metavar="ARQUIVO", help="mescla os PDFs de entrada no ARQUIVO informado")
+    modo.add_argument("--monitorar", action="store_true",
+                      help="fica monitorando as pastas de entrada e processa cada PDF novo assim que termina de ser "
+                           "copiado, até Ctrl+C")
+    modo.add_argument("--buscar", action="store_true",
+                      help="procura no índice de busca os comprovantes que atendem aos filtros, sem abrir nenhum PDF")
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.somente_zip and args.sem_numeracao:
+        parser.error("--sem-numeracao depende dos arquivos soltos; não use com --somente-zip")
+    formato_relatorio = 'xlsx' if args.excel else args.relatorio
+
+    if args.buscar:
+        return buscar(args)
+    if not args.entradas:
+        parser.error("informe os arquivos PDF ou as pastas de entrada")
+
+    if args.desfazer_renomeacao:
+        return desfazer(args)
+
+    if args.monitorar:
+        if args.recursivo or args.sem_numeracao:
+            parser.error("--recursivo e --sem-numeracao não podem ser usados com --monitorar")
+        pastas = [corrigir_caminho(entrada) for entrada in args.entradas]
+        if not all(os.path.isdir(pasta) for pasta in pastas):
+            parser.error("com --monitorar as entradas devem ser pastas")
+        pdfs = []
+        base_manifesto = args.saida or os.path.abspath(pastas[0])
+    else:
+        pdfs = coletar_pdfs(args.entradas, args.recursivo)
+        if not pdfs:
+            print("Nenhum arquivo PDF encontrado nas entradas informadas", file=sys.stderr)
+            return 2
+        base_manifesto = args.saida or os.path.dirname(os.path.abspath(pdfs[0]))
+
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+
+    manifesto = args.manifesto or os.path.join(base_manifesto, ARQUIVO_MANIFESTO)
+
+    processador = ProcessadorComprovantes(
+        gerar_zip=not args.sem_zip,
+        pasta_destino=args.saida,
+        workers=args.workers,
+        gravar_arquivos=not args.somente_zip,
+        arquivo_cache=None if args.sem_cache else args.cache,
+        arquivo_manifesto=manifesto,
+        # O monitoramento sempre continua o manifesto, para não reprocessar PDFs antigos
+        retomar=args.retomar or args.monitorar,
+        ocr=args.ocr,
+        ocr_dpi=args.ocr_dpi,
+        ocr_idioma=args.ocr_idioma,
+        medir=args.medir or bool(args.trace),
+        paginas_por_janela=max(0, args.janela),
+        posicional=args.posicional,
+        otimizar_saida=args.otimizar_saida,
+        arquivo_duplicados=args.indice_duplicados if args.duplicados else None,
+        acao_duplicados=args.duplicados or ACAO_DUPLICADOS_PADRAO,
+        arquivo_busca=args.indice_busca if args.indexar else None,
+        campos_complementares=bool(formato_relatorio),
+    )
+
+    try:
+        return executar(args, processador, pdfs, formato_relatorio)
+    except Exception as e:
+        print(f"❌ Erro durante o processamento: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if processador.medicoes is not None:
+            relatar_medicoes(processador.medicoes, args.trace)
+
+
+def executar(args, processador, pdfs, formato_relatorio=None):
+    """Executa o modo escolhido e retorna o código de saída"""
+    if args.monitorar:
+        monitor = MonitorPastas([corrigir_caminho(e) for e in args.entradas], processador, intervalo=args.intervalo,
+                                estabilidade=args.estabilidade, formato_relatorio=formato_relatorio)
+        try:
+            monitor.executar()
+        except KeyboardInterrupt:
+            print("⏹️ Monitoramento interrompido", file=sys.stderr)
+        return 0
+
+    if args.mesclar:
+        return 0 if processador.merge_pdfs(pdfs, args.mesclar, args.motor_mesclagem) else 1
+
+    if args.renomear:
+        renomeados = processador.rename_pdfs(pdfs)
+        # Duplicados pulados ficam com o nome atual de propósito e não contam como falha
+        pulados = processador.duplicados_count if processador.acao_duplicados == 'pular' else 0
+        return 0 if renomeados + pulados == len(pdfs) else 1
+
+    registros = processador.process_pdfs(pdfs)
+
+    # Cada pasta de saída distinta recebe seu próprio relatório/remoção de numeração
+    por_pasta = {}
+    for registro in registros:
+        por_pasta.setdefault(os.path.dirname(registro['arquivo_saida']), []).append(registro)
+    for output_dir, registros_pasta in por_pasta.items():
+        if args.sem_numeracao and os.path.exists(output_dir):
+            processador.remove_numbering_from_filenames(output_dir, registros_pasta)
+        if formato_relatorio:
+            processador.generate_report(registros_pasta, output_dir, formato_relatorio)
+
+    return 1 if processador.erros else 0
+
+
+def buscar(args):
+    """Mostra os comprovantes do índice de busca que atendem aos filtros"""
+    if not os.path.exists(args.indice_busca):
+        print(f"❌ Índice de busca não encontrado: {args.indice_busca} (gere com --indexar)", file=sys.stderr)
+        return 2
+    inicio = time.perf_counter()
+    with IndiceBusca(args.indice_busca) as indice:
+        resultados = indice.buscar(
+            texto=" ".join(args.entradas),
+            beneficiario=args.beneficiario,
+            documento=args.documento,
+            valor_minimo=args.valor_minimo,
+            valor_maximo=args.valor_maximo,
+            data_inicial=args.data_inicial,
+            data_final=args.data_final,
+            limite=args.limite,
+        )
+    duracao = time.perf_counter() - inicio
+    for r in resultados:
+        valor = "" if r['valor'] is None else f"R$ {r['valor']:.2f}".replace('.', ',')
+        print(f"{r['data'] or '':10}  {valor:>14}  {r['beneficiario']}  {r['documento']}")
+        print(f"    {r['local']} (páginas {r['pagina_inicial']}-{r['pagina_final']} de {r['origem']})")
+        if r['trecho']:
+            print(f"    {' '.join(r['trecho'].split())}")
+    print(f"🔎 {len(resultados)} comprovante(s) em {duracao * 1000:.1f} ms", file=sys.stderr)
+    return 0 if resultados else 1
+
+
+def desfazer(args):
+    """Desfaz as renomeações registradas nos arquivos informados"""
+    # Os índices que já existem voltam para os nomes originais, mesmo sem --duplicados/--indexar nesta execução
+    processador = ProcessadorComprovantes(
+        arquivo_duplicados=args.indice_duplicados if os.path.exists(args.indice_duplicados) else None,
+        arquivo_busca=args.indice_busca if os.path.exists(args.indice_busca) else None,
+    )
+    codigo = 0
+    for arquivo in args.entradas:
+        try:
+            processador.desfazer_renomeacoes(corrigir_caminho(arquivo))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Erro ao desfazer a renomeação de {arquivo}: {str(e)}", file=sys.stderr)
+            codigo = 1
+    return codigo
+
+
+def relatar_medicoes(medicoes, trace=None):
+    """Mostra o resumo das medições e, se pedido, grava o JSON completo"""
+    for linha in medicoes.resumo():
+        print(linha, file=sys.stderr)
+    if trace:
+        try:
+            medicoes.exportar_json(trace)
+            print(f"✅ Medições gravadas em: {trace}", file=sys.stderr)
+        except OSError as e:
+            print(f"❌ Erro ao gravar as medições: {str(e)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
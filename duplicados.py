@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Índice local (SQLite) dos comprovantes já gravados, para achar os repetidos entre lotes.
+
+Exportações sobrepostas trazem o mesmo pagamento mais de uma vez, e ele
+acabaria dividido e renomeado duas vezes (``NOME_VALOR`` e ``NOME_VALOR_1``).
+Cada comprovante entra no índice por até duas chaves:
+
+    conteúdo  o texto normalizado da primeira página e a quantidade de páginas
+    campos    beneficiário, valor, data e código de autenticação, quando o
+              comprovante tem autenticação; pega o mesmo pagamento exportado
+              com outro cabeçalho ou rodapé
+
+As chaves são digests de 16 bytes na chave primária de uma tabela WITHOUT
+ROWID, então cada consulta é uma única busca na árvore do SQLite, sem
+carregar o índice na memória, e continua rápida com centenas de milhares de
+comprovantes.
+
+Um comprovante só é duplicado de outro que ainda existe em outro lugar:
+reprocessar o mesmo PDF para a mesma pasta de saída não acusa nada, e um
+registro cujo arquivo sumiu (apagado ou renomeado fora do programa) passa a
+apontar para o novo local.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+from extratores import BENEFICIARIO_INDEFINIDO, VALOR_INDEFINIDO
+
+INDICE_DUPLICADOS_PADRAO = os.path.join(os.path.expanduser("~"), ".divisor_comprovantes", "duplicados.sqlite3")
+
+# 'marcar' grava o duplicado e o aponta no log e no registro; 'pular' não grava
+ACOES_DUPLICADOS = ('marcar', 'pular')
+ACAO_DUPLICADOS_PADRAO = 'marcar'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS comprovantes (
+    id INTEGER PRIMARY KEY,
+    local TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    origem TEXT NOT NULL,
+    pagina_inicial INTEGER NOT NULL,
+    registrado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comprovantes_local ON comprovantes(local);
+CREATE TABLE IF NOT EXISTS chaves (
+    chave BLOB PRIMARY KEY,
+    comprovante INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_CONTEUDO = b"c"
+_CAMPOS = b"f"
+
+
+def _digest(texto):
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+
+
+def assinatura_texto(texto):
+    """Assinatura do texto da página (já normalizado pelos extratores); "" para página sem texto"""
+    if not texto:
+        return ""
+    return hashlib.blake2b(texto.strip().encode('utf-8'), digest_size=16).hexdigest()
+
+
+def chaves_comprovante(primeira, total_paginas):
+    """Chaves de um comprovante a partir da análise da primeira página e da quantidade de páginas"""
+    chaves = []
+    if primeira.get('assinatura'):
+        chaves.append(_CONTEUDO + _digest(f"{primeira['assinatura']}:{total_paginas}"))
+    # Sem autenticação os campos não bastam: o mesmo valor pode ser pago ao mesmo beneficiário no mesmo dia
+    if (primeira.get('autenticacao') and primeira['nome'] != BENEFICIARIO_INDEFINIDO
+            and primeira['valor'] != VALOR_INDEFINIDO):
+        campos = "\x1f".join((primeira['nome'], primeira['valor'], primeira['data'], primeira['autenticacao']))
+        chaves.append(_CAMPOS + _digest(campos))
+    return chaves
+
+
+def _normalizar(caminho):
+    return os.path.normcase(os.path.abspath(caminho))
+
+
+class IndiceDuplicados:
+    """Chaves dos comprovantes gravados, guardadas entre execuções."""
+
+    def __init__(self, caminho=INDICE_DUPLICADOS_PADRAO, desde=None):
+        """``desde`` é o início do lote: o que foi registrado depois vale mesmo sem o arquivo no disco"""
+        self.caminho = caminho
+        self.desde = desde
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        # Vários processos do pool registram comprovantes ao mesmo tempo
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        # Um registro por comprovante: sem fsync a cada um (o WAL continua íntegro numa queda)
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(_ESQUEMA)
+        # Arquivos registrados por este índice aberto: podem ainda estar na fila de gravação
+        self._registrados = set()
+
+    def close(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def registrar(self, chaves, local, arquivo=None, origem=None, pagina_inicial=1):
+        """Registra o comprovante gravado em ``local``; retorna o local do igual já registrado, ou None.
+
+        ``arquivo`` é o arquivo em disco que contém o comprovante (padrão: o
+        próprio ``local``; o ZIP quando os comprovantes só são gravados nele).
+        Um duplicado não é registrado.
+        """
+        if not chaves:
+            return None
+        local = _normalizar(local)
+        arquivo = _normalizar(arquivo or local)
+        with self.conexao:
+            # Consulta e gravação na mesma transação, sem outro processo no meio
+            self.conexao.execute("BEGIN IMMEDIATE")
+            proprio = None
+            for chave in chaves:
+                linha = self.conexao.execute(
+                    "SELECT c.id, c.local, c.arquivo, c.registrado FROM chaves k "
+                    "JOIN comprovantes c ON c.id = k.comprovante "
+                    "WHERE k.chave = ?",
+                    (chave,),
+                ).fetchone()
+                if linha is None:
+                    continue
+                identificador, local_registrado, arquivo_registrado, registrado = linha
+                # Outro processo do mesmo lote pode ainda não ter gravado (ou movido) o arquivo
+                recente = self.desde is not None and registrado >= self.desde
+                if local_registrado != local and (recente or arquivo_registrado in self._registrados
+                                                  or os.path.exists(arquivo_registrado)):
+                    return local_registrado
+                # O mesmo comprovante de novo, ou um registro cujo arquivo não existe mais
+                proprio = identificador
+
+            valores = (local, arquivo, origem or local, pagina_inicial, time.time())
+            if proprio is None:
+                proprio = self.conexao.execute(
+                    "INSERT INTO comprovantes (local, arquivo, origem, pagina_inicial, registrado) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    valores,
+                ).lastrowid
+            else:
+                self.conexao.execute(
+                    "UPDATE comprovantes SET local = ?, arquivo = ?, origem = ?, pagina_inicial = ?, registrado = ? "
+                    "WHERE id = ?",
+                    valores + (proprio,),
+                )
+            self.conexao.executemany(
+                "INSERT OR REPLACE INTO chaves (chave, comprovante) VALUES (?, ?)",
+                ((chave, proprio) for chave in chaves),
+            )
+        self._registrados.add(arquivo)
+        return None
+
+    def mover(self, pares):
+        """Atualiza o local dos comprovantes renomeados, a partir de ``(origem, destino)``.
+
+        O arquivo em disco só muda junto quando era o próprio local (não um ZIP).
+        """
+        with self.conexao:
+            self.conexao.executemany(
+                "UPDATE comprovantes SET arquivo = CASE WHEN arquivo = local THEN ? ELSE arquivo END, local = ? "
+                "WHERE local = ?",
+                ((_normalizar(destino), _normalizar(destino), _normalizar(origem)) for origem, destino in pares),
+            )
+
+    def limpar(self):
+        """Apaga todo o conteúdo do índice"""
+        with self.conexao:
+            self.conexao.execute("DELETE FROM chaves")
+            self.conexao.execute("DELETE FROM comprovantes")
+        self.conexao.execute("VACUUM")
@@ -0,0 +1,923 @@
+# -*- coding: utf-8 -*-
+"""Extração de beneficiário, valor, data, CPF/CNPJ e autenticação a partir do texto dos comprovantes.
+
+As regras de cada layout ficam declaradas como dados em ``REGRAS_BENEFICIARIO``
+e ``REGRAS_VALOR``, na ordem de prioridade, e são compiladas uma única vez ao
+carregar o módulo. Cada página é normalizada (maiúsculas) e dividida em linhas
+no máximo uma vez, em ``TextoPagina``, e compartilhada entre os dois extratores.
+CPFs, CNPJs e datas da página saem de uma única varredura (``TextoPagina.cpfs``,
+``cnpjs`` e ``datas``), usada pela regra de valor após CNPJ, pela detecção das
+páginas de continuação da FOLHA e pelos campos do relatório.
+
+Quando a página traz também as palavras com coordenadas (``page.get_text("words")``
+do PyMuPDF), as regras do tipo 'posicao' localizam o rótulo e leem o valor na
+palavra vizinha à direita ou na linha abaixo dele, mesmo que o texto corrido
+tenha separado os dois. Sem as palavras essas regras não se aplicam e a
+cadeia segue para as regras de texto do mesmo layout.
+
+Campos de uma regra:
+    nome          identificação da regra (usada em logs e medições)
+    layout        banco/tipo de documento que a regra identifica; a primeira
+                  regra com layout cujos termos estão na página define o
+                  layout dela (``TextoPagina.layout``), e a extração da página
+                  pula as regras de layout anteriores a ela
+    tipo          'constante', 'regex', 'segmento', 'linha_seguinte',
+                  'ultimo_marcador', 'rotulo', 'posicao' ou 'funcao'
+    requer        textos que precisam estar todos na página
+    requer_algum  textos dos quais pelo menos um precisa estar na página
+    prefixo       texto com que a página precisa começar
+    padrao        expressão regular (``flags`` opcionais, ``grupo`` padrão 1)
+    marcador      rótulo usado pelos tipos 'segmento', 'linha_seguinte',
+                  'ultimo_marcador' e 'posicao' ('segmento' pega o trecho entre
+                  a primeira e a segunda ocorrência do marcador)
+    ate           em 'segmento', corta o trecho antes deste texto
+    direcao       em 'posicao', onde fica o valor: 'direita', 'abaixo' ou
+                  'direita_ou_abaixo' (padrão)
+    apos          em 'posicao', cabeçalho que delimita a região da página: só
+                  vale o rótulo que estiver abaixo dele
+    mensagem      mensagem de log emitida quando a regra encontra o valor
+
+Só para beneficiário:
+    corte         regex cujo primeiro pedaço (``re.split``) é mantido
+    remove        regex removida do nome encontrado
+    rejeita       nomes que não são aceitos (a cadeia continua)
+    aceita_vazio  aceita nome vazio, encerrando a cadeia
+    apara         se False, não remove espaços das pontas antes de validar
+"""
+
+import hashlib
+import itertools
+import operator
+import re
+import time
+import types
+
+BENEFICIARIO_INDEFINIDO = "BENEFICIÁRIO INDEFINIDO"
+VALOR_INDEFINIDO = "VALOR INDEFINIDO"
+
+LIMITE_NOME = 25
+
+_CPF = r"\d{3}\.\d{3}\.\d{3}-\d{2}"
+_CNPJ = r"\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}"
+_MOEDA = r"[\d]{1,3}(?:\.?\d{3})*,\d{2}"
+
+_RE_CPF = re.compile(_CPF)
+_RE_CNPJ = re.compile(_CNPJ)
+_RE_PONTUACAO = re.compile(r"[^\w\s]")
+_RE_VALOR_COBRADO = re.compile(r"VALOR COBRADO[:\s]*R?\$?\s*([\d.,]+)")
+_RE_NUMERO = re.compile(r"R?\$?\s*([\d.,]+)")
+
+# Posição da pontuação que ancora cada um na varredura de ``TextoPagina``
+_TRACO_CPF = 11
+_BARRA_CNPJ = 10
+_BARRA_DATA = 2
+_RE_DATA = re.compile(r"(?<!\d)(\d{2})/(\d{2})/(\d{4})(?!\d)")
+_RE_MOEDA = re.compile(_MOEDA)
+_RE_DIGITO = re.compile(r"\d")
+# A data do pagamento tem preferência sobre a de emissão do comprovante, que costuma vir antes
+_RE_ROTULO_DATA = re.compile(
+    r"(?:DATA D[AOE] (?:PAGAMENTO|TRANSA[ÇC][ÃA]O|OPERA[ÇC][ÃA]O|D[ÉE]BITO|TRANSFER[ÊE]NCIA|EFETIVA[ÇC][ÃA]O)"
+    r"|PAGO EM|DEBITADO EM)[:\s]*$"
+)
+_ALCANCE_ROTULO_DATA = 40
+_LINHAS_DOCUMENTO = 3
+# Rótulos buscados com str.find; a regex só é aplicada (com match) onde um deles aparece
+_ROTULOS_AUTENTICACAO = ("AUTENTICA", "ID DA TRANSA", "CONTROLE")
+_RE_AUTENTICACAO = re.compile(
+    r"(?:AUTENTICA[ÇC][ÃA]O|ID DA TRANSA[ÇC][ÃA]O|CONTROLE)"
+    r"(?: [^\W\d_]+)?[:\s]*([0-9A-Z][0-9A-Z.\-]{6,}[0-9A-Z])"
+)
+
+# Espaço entre palavras da mesma linha, em alturas de letra, a partir do qual começa outra coluna
+LACUNA_COLUNA = 3
+
+_Y0 = operator.itemgetter(1)
+_Y1 = operator.itemgetter(3)
+_LINHA_DA_PALAVRA = operator.itemgetter(5, 6)
+_POSICAO_DA_LINHA = operator.itemgetter(1, 0)
+
+
+class TextoPagina:
+    """Texto de uma página já em maiúsculas, com as linhas calculadas sob demanda uma única vez"""
+
+    __slots__ = ('texto', 'palavras', '_linhas', '_linhas_unicode', '_linhas_nao_vazias', '_linhas_posicionadas',
+                 '_indice_palavras', '_layout', '_cadeias', '_cpfs', '_cnpjs', '_datas')
+
+    def __init__(self, texto, palavras=None):
+        self.texto = str(texto).upper()
+        # Tuplas (x0, y0, x1, y1, palavra, bloco, linha, n) de ``page.get_text("words")``, ou None
+        self.palavras = palavras
+        self._linhas = None
+        self._linhas_unicode = None
+        self._linhas_nao_vazias = None
+        self._linhas_posicionadas = None
+        self._indice_palavras = None
+        self._layout = None
+        self._cadeias = None
+        self._cpfs = None
+        self._cnpjs = None
+        self._datas = None
+
+    @property
+    def layout(self):
+        """Layout detectado (banco ou tipo de documento)"""
+        if self._layout is None:
+            self._layout, self._cadeias = _classificar(self.texto)
+        return self._layout
+
+    @property
+    def cadeias(self):
+        """Regras de beneficiário e de valor que ainda podem se aplicar à página, dado o seu layout"""
+        if self._cadeias is None:
+            self._layout, self._cadeias = _classificar(self.texto)
+        return self._cadeias
+
+    @property
+    def linhas(self):
+        """Linhas separadas por '\\n'"""
+        if self._linhas is None:
+            self._linhas = self.texto.split('\n')
+        return self._linhas
+
+    @property
+    def linhas_unicode(self):
+        """Linhas separadas por qualquer quebra de linha (``str.splitlines``)"""
+        if self._linhas_unicode is None:
+            self._linhas_unicode = self.texto.splitlines()
+        return self._linhas_unicode
+
+    @property
+    def linhas_nao_vazias(self):
+        """Linhas sem espaços nas pontas, descartando as vazias"""
+        if self._linhas_nao_vazias is None:
+            self._linhas_nao_vazias = [linha.strip() for linha in self.linhas if linha.strip()]
+        return self._linhas_nao_vazias
+
+    @property
+    def linhas_posicionadas(self):
+        """Linhas do PyMuPDF como ``(x0, y0, x1, y1, palavras)``, de cima para baixo,
+        com as palavras (tuplas de ``get_text("words")``) da esquerda para a direita"""
+        if self._linhas_posicionadas is None:
+            linhas = []
+            for _, grupo in itertools.groupby(self.palavras, _LINHA_DA_PALAVRA):
+                palavras = sorted(grupo)
+                linhas.append((palavras[0][0], min(map(_Y0, palavras)), palavras[-1][2], max(map(_Y1, palavras)),
+                               palavras))
+            linhas.sort(key=_POSICAO_DA_LINHA)
+            # Só as palavras que abrem rótulos das regras de posição: termo -> posições (linha, palavra)
+            indice = {}
+            for i, linha in enumerate(linhas):
+                for j, palavra in enumerate(linha[4]):
+                    termo = palavra[4].upper().rstrip(':')
+                    if termo in _TERMOS_POSICAO:
+                        indice.setdefault(termo, []).append((i, j))
+            self._linhas_posicionadas = linhas
+            self._indice_palavras = indice
+        return self._linhas_posicionadas
+
+    def localizar(self, rotulo):
+        """Posições ``(x0, y0, x1, y1)`` do rótulo de uma regra de posição, na ordem de leitura"""
+        linhas = self.linhas_posicionadas
+        termos = [termo.rstrip(':') for termo in rotulo.split()]
+        encontrados = []
+        for i, j in self._indice_palavras.get(termos[0], ()):
+            _, y0, _, y1, palavras = linhas[i]
+            fim = j + len(termos) - 1
+            if fim < len(palavras) and all(palavras[j + k][4].upper().rstrip(':') == termo
+                                            for k, termo in enumerate(termos[1:], start=1)):
+                encontrados.append((palavras[j][0], y0, palavras[fim][2], y1))
+        return encontrados
+
+    def a_direita(self, x0, y0, x1, y1):
+        """Palavras na mesma altura da caixa e à direita dela, até a próxima coluna"""
+        centro = (y0 + y1) / 2
+        lacuna = (y1 - y0) * LACUNA_COLUNA
+        candidatas = sorted(
+            palavra
+            for _, ly0, _, ly1, palavras in self.linhas_posicionadas if ly0 <= centro <= ly1
+            for palavra in palavras if palavra[0] >= x1 - 1
+        )
+        return _juntar_coluna(candidatas, lacuna)
+
+    def abaixo(self, x0, y0, x1, y1):
+        """Palavras da primeira linha abaixo da caixa que começa na coluna dela, até a próxima coluna"""
+        altura = y1 - y0
+        for lx0, ly0, lx1, _, palavras in self.linhas_posicionadas:
+            if ly0 < y1 - altura / 4 or lx0 > x1 + altura or lx1 < x0:
+                continue
+            candidatas = [palavra for palavra in palavras if palavra[2] >= x0 - altura]
+            return _juntar_coluna(candidatas, altura * LACUNA_COLUNA)
+        return ""
+
+    @property
+    def cpfs(self):
+        """CPFs da página como ``(posição, CPF)``, na ordem do texto"""
+        if self._cpfs is None:
+            self._varrer()
+        return self._cpfs
+
+    @property
+    def cnpjs(self):
+        """CNPJs da página como ``(posição, CNPJ)``, na ordem do texto"""
+        if self._cnpjs is None:
+            self._varrer()
+        return self._cnpjs
+
+    @property
+    def datas(self):
+        """Datas DD/MM/AAAA válidas da página como ``(posição, AAAA-MM-DD)``, na ordem do texto"""
+        if self._datas is None:
+            self._varrer()
+        return self._datas
+
+    def _varrer(self):
+        """Uma passada pelas barras e traços do texto, separando CPFs, CNPJs e datas.
+
+        Os três têm a pontuação em posição fixa (o traço do CPF no 12º
+        caractere, a barra do CNPJ no 11º, a primeira barra da data no 3º),
+        então cada um é testado com ``match`` só a partir dela, em vez de uma
+        regex procurar a partir de cada dígito da página.
+        """
+        texto = self.texto
+        cpfs = []
+        cnpjs = []
+        datas = []
+        hifen = texto.find('-', _TRACO_CPF)
+        while hifen >= 0:
+            encontrado = _RE_CPF.match(texto, hifen - _TRACO_CPF)
+            # Sem sobrepor o anterior, como em ``finditer``
+            if encontrado and (not cpfs or encontrado.start() >= cpfs[-1][0] + len(cpfs[-1][1])):
+                cpfs.append((encontrado.start(), encontrado.group()))
+            hifen = texto.find('-', hifen + 1)
+        barra = texto.find('/', _BARRA_DATA)
+        while barra >= 0:
+            if barra >= _BARRA_CNPJ:
+                encontrado = _RE_CNPJ.match(texto, barra - _BARRA_CNPJ)
+                if encontrado and (not cnpjs or encontrado.start() >= cnpjs[-1][0] + len(cnpjs[-1][1])):
+                    cnpjs.append((encontrado.start(), encontrado.group()))
+            encontrado = _RE_DATA.match(texto, barra - _BARRA_DATA)
+            if encontrado:
+                data = _data_valida(*encontrado.groups())
+                if data:
+                    datas.append((encontrado.start(), data))
+            barra = texto.find('/', barra + 1)
+        self._cpfs = cpfs
+        self._cnpjs = cnpjs
+        self._datas = datas
+
+    def segmento(self, marcador):
+        """Trecho entre a primeira e a segunda ocorrência do marcador (como ``split(marcador)[1]``)"""
+        inicio = self.texto.find(marcador)
+        if inicio < 0:
+            return None
+        inicio += len(marcador)
+        fim = self.texto.find(marcador, inicio)
+        return self.texto[inicio:] if fim < 0 else self.texto[inicio:fim]
+
+
+def _juntar_coluna(palavras, lacuna):
+    """Junta as palavras (em maiúsculas) desde a primeira até um espaço maior que ``lacuna``
+    ou até o próximo rótulo (palavra terminada em ':')"""
+    partes = []
+    fim = None
+    for palavra in palavras:
+        if (fim is not None and palavra[0] - fim > lacuna) or palavra[4].endswith(':'):
+            break
+        partes.append(palavra[4])
+        fim = palavra[2]
+    return " ".join(partes).upper()
+
+
+def preparar_texto(texto, palavras=None):
+    """Normaliza o texto uma vez para ser usado pelos dois extratores (None se vazio).
+
+    ``palavras`` (de ``page.get_text("words")``) habilita as regras de posição.
+    """
+    if isinstance(texto, TextoPagina):
+        return texto
+    if texto is None or texto.strip() == "":
+        return None
+    return TextoPagina(texto, palavras or None)
+
+
+# ---------------------------------------------------------------------------
+# Regras com lógica própria
+# ---------------------------------------------------------------------------
+
+def _santander_beneficiario_original_linhas(pagina):
+    """Santander: nome três linhas abaixo do cabeçalho, quando a linha seguinte é o CNPJ"""
+    linhas = pagina.linhas_nao_vazias
+    for i, linha in enumerate(linhas):
+        if "DADOS DO BENEFICIÁRIO ORIGINAL" in linha and i + 3 < len(linhas):
+            if _RE_CNPJ.search(linhas[i + 1]):
+                beneficiario = linhas[i + 3]
+                if not _RE_CNPJ.search(beneficiario):
+                    return beneficiario[:LIMITE_NOME]
+    return None
+
+
+def _valor_cobrado(pagina):
+    """Valor cobrado na mesma linha ou, senão, na linha seguinte à última ocorrência"""
+    match = _RE_VALOR_COBRADO.search(pagina.texto)
+    if not match:
+        linhas = pagina.linhas
+        for i, linha in enumerate(linhas):
+            if "VALOR COBRADO" in linha and i + 1 < len(linhas):
+                match = _RE_NUMERO.search(linhas[i + 1].strip())
+    return match.group(1) if match else None
+
+
+def _valor_apos_cnpj(pagina):
+    """Primeiro valor em moeda que vem logo depois de um CNPJ (o primeiro número após ele)"""
+    texto = pagina.texto
+    for posicao, cnpj in pagina.cnpjs:
+        digito = _RE_DIGITO.search(texto, posicao + len(cnpj))
+        if digito is None:
+            return None
+        match = _RE_MOEDA.match(texto, digito.start())
+        if match:
+            return match.group()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Regras declaradas, em ordem de prioridade
+# ---------------------------------------------------------------------------
+
+REGRAS_BENEFICIARIO = [
+    # CASO ESPECÍFICO BRADESCO (VINICIUS) - PRIORIDADE MÁXIMA
+    {'nome': 'bradesco_quem_recebeu_posicao', 'layout': 'bradesco', 'tipo': 'posicao',
+     'requer': ("DADOS DE QUEM RECEBEU",), 'apos': "DADOS DE QUEM RECEBEU", 'marcador': "NOME:", 'rejeita': ("NOME",)},
+    {'nome': 'bradesco_quem_recebeu', 'layout': 'bradesco', 'tipo': 'regex', 'marcador': "DADOS DE QUEM RECEBEU",
+     'padrao': r"NOME:\s*([^\n]+)", 'rejeita': ("NOME",)},
+    # SAC BB - entre "BENEFICIARIO:" e "NOME FANTASIA:"
+    {'nome': 'bb_sac_posicao', 'layout': 'bb', 'tipo': 'posicao', 'requer': ("NOME FANTASIA:",),
+     'marcador': "BENEFICIARIO:", 'direcao': 'direita'},
+    {'nome': 'bb_sac', 'layout': 'bb', 'tipo': 'segmento', 'requer': ("NOME FANTASIA:",),
+     'marcador': "BENEFICIARIO:", 'ate': "NOME FANTASIA:", 'apara': False},
+    {'nome': 'fgts', 'layout': 'fgts', 'tipo': 'constante', 'requer': ("FGTS GRF",), 'resultado': "FGTS"},
+    # Santander - Convenio de Arrecadacao
+    {'nome': 'santander_convenio_arrecadacao', 'layout': 'santander', 'tipo': 'regex',
+     'requer': ("CONVENIO DE ARRECADACAO",), 'padrao': r"PM\s+([^\n]+)", 'aceita_vazio': True},
+    {'nome': 'da_empresa_nome_posicao', 'layout': 'itau', 'tipo': 'posicao', 'requer': ("DA EMPRESA",),
+     'apos': "DA EMPRESA", 'marcador': "NOME:", 'corte': r"\s*(?:CNPJ|CPF)", 'rejeita': ("NOME",)},
+    {'nome': 'da_empresa_nome_linha_seguinte', 'layout': 'itau', 'tipo': 'regex', 'requer': ("DA EMPRESA",),
+     'padrao': r"NOME:\s*\n\s*([^\n]+)", 'rejeita': ("NOME",)},
+    {'nome': 'da_empresa_nome', 'layout': 'itau', 'tipo': 'regex', 'requer': ("DA EMPRESA",),
+     'padrao': r"NOME:\s*([^\n]+)", 'corte': r"\s{2,}|CNPJ|CPF|$", 'rejeita': ("NOME",)},
+    {'nome': 'inicia_da_empresa', 'layout': 'itau', 'tipo': 'regex', 'prefixo': "DA EMPRESA",
+     'padrao': r"NOME:\s*(\S.*?)(?:\n|$)", 'rejeita': ("NOME",)},
+    {'nome': 'darf', 'layout': 'darf', 'tipo': 'constante', 'requer': ("PAGAMENTO DE DARF",), 'resultado': "DARF"},
+    {'nome': 'cagepa', 'layout': 'cagepa', 'tipo': 'constante', 'requer': ("CAGEPA",), 'resultado': "CAGEPA"},
+    {'nome': 'folha', 'layout': 'folha', 'tipo': 'constante', 'requer_algum': ("SALÁRIO", "SALARIOS"),
+     'resultado': "FOLHA"},
+    {'nome': 'ultimo_cliente', 'layout': 'btg', 'tipo': 'ultimo_marcador', 'marcador': "CLIENTE:", 'minimo': 2},
+    {'nome': 'cliente_favorecido_posicao', 'layout': 'btg', 'tipo': 'posicao', 'requer': ("CLIENTE:",),
+     'marcador': "FAVORECIDO:"},
+    {'nome': 'cliente_favorecido', 'layout': 'btg', 'tipo': 'segmento', 'requer': ("CLIENTE:",),
+     'marcador': "FAVORECIDO:"},
+    {'nome': 'nome_social_posicao', 'layout': 'caixa', 'tipo': 'posicao', 'marcador': "NOME SOCIAL:",
+     'rejeita': ("NOME",)},
+    {'nome': 'nome_social', 'layout': 'caixa', 'tipo': 'linha_seguinte', 'marcador': "NOME SOCIAL:",
+     'rejeita': ("NOME",)},
+    {'nome': 'convenio', 'tipo': 'segmento', 'marcador': "CONVENIO"},
+    {'nome': 'nome_do_recebedor', 'tipo': 'segmento', 'marcador': "NOME DO RECEBEDOR:"},
+    {'nome': 'nome_fantasia', 'tipo': 'regex', 'requer': ("NOME FANTASIA:",),
+     'padrao': r"NOME FANTASIA:\s*(.*?)(?:\n|$)"},
+    {'nome': 'nome_fantasia_linha_seguinte', 'tipo': 'linha_seguinte', 'marcador': "NOME FANTASIA:"},
+    {'nome': 'santander_razao_social_posicao', 'layout': 'santander', 'tipo': 'posicao',
+     'requer': ("SANTANDER", "DADOS DO BENEFICIÁRIO ORIGINAL"), 'apos': "DADOS DO BENEFICIÁRIO ORIGINAL",
+     'marcador': "RAZÃO SOCIAL:", 'remove': _CNPJ},
+    {'nome': 'santander_beneficiario_original', 'layout': 'santander', 'tipo': 'regex',
+     'requer': ("SANTANDER", "DADOS DO BENEFICIÁRIO ORIGINAL"),
+     'padrao': r"DADOS DO BENEFICIÁRIO ORIGINAL.*?RAZÃO SOCIAL:\s*([^\n]+)", 'flags': re.DOTALL,
+     'remove': _CNPJ},
+    {'nome': 'santander_beneficiario_original_linhas', 'layout': 'santander', 'tipo': 'funcao',
+     'requer': ("SANTANDER", "DADOS DO BENEFICIÁRIO ORIGINAL"),
+     'funcao': _santander_beneficiario_original_linhas},
+    # Rótulos genéricos
+    {'nome': 'favorecida', 'tipo': 'rotulo', 'requer': ("FAVORECIDA:",), 'padrao': r"FAVORECIDA:\s*(.+)"},
+    {'nome': 'pago_para', 'tipo': 'rotulo', 'requer': ("PAGO",), 'padrao': r"PAGO\s+PARA:?\s*(.+)"},
+    {'nome': 'favorecido', 'tipo': 'rotulo', 'requer': ("FAVORECIDO",), 'padrao': r"FAVORECIDO:?\s*(.+)"},
+    {'nome': 'beneficiario', 'tipo': 'rotulo', 'requer': ("BENEFICI",), 'padrao': r"BENEFICI[ÁA]RIO:?\s*(.+)"},
+    {'nome': 'nome', 'tipo': 'rotulo', 'requer': ("NOME",), 'padrao': r"NOME:?\s*(.+)"},
+    {'nome': 'nome_do_recebedor_rotulo', 'tipo': 'rotulo', 'requer': ("NOME DO RECEBEDOR",),
+     'padrao': r"NOME DO RECEBEDOR:?\s*(.+)"},
+    {'nome': 'creditada', 'tipo': 'rotulo', 'requer': ("CREDITADA:",), 'padrao': r"CREDITADA:\s*NOME:?\s*(.+)"},
+    {'nome': 'beneficiario_acentuado', 'tipo': 'rotulo', 'requer': ("BENEFICIÁRIO",),
+     'padrao': r"BENEFICIÁRIO:?\s*(.+)"},
+    {'nome': 'tipo_de_compromisso', 'tipo': 'rotulo', 'requer': ("TIPO DE COMPROMISSO",),
+     'padrao': r"TIPO DE COMPROMISSO:?\s*(.+)"},
+    {'nome': 'dados_do_recebedor', 'tipo': 'rotulo', 'requer': ("DADOS DO RECEBEDOR",),
+     'padrao': r"DADOS DO RECEBEDOR\s*\n\s*PARA\s*(.+)"},
+    {'nome': 'favorecido_nome', 'tipo': 'rotulo', 'requer': ("FAVORECIDO",),
+     'padrao': r"FAVORECIDO\s*\n\s*NOME:?\s*(.+)"},
+]
+
+REGRAS_VALOR = [
+    # PRIORIDADE ABSOLUTA PARA VALOR COBRADO (MESMA LINHA OU A SEGUINTE)
+    {'nome': 'valor_cobrado_posicao', 'layout': 'bb', 'tipo': 'posicao', 'marcador': "VALOR COBRADO",
+     'padrao': _MOEDA, 'grupo': 0},
+    {'nome': 'valor_cobrado', 'layout': 'bb', 'tipo': 'funcao', 'requer': ("VALOR COBRADO",),
+     'funcao': _valor_cobrado},
+    # Comprovantes de PIX do Bradesco
+    {'nome': 'valor_pix', 'tipo': 'regex', 'requer': ("VALOR:",), 'padrao': r"VALOR:\s*R?\$?\s*([\d.,]+)"},
+    {'nome': 'valor_recolhido', 'tipo': 'regex', 'requer': ("VALOR RECOLHIDO:",),
+     'padrao': r"VALOR RECOLHIDO:\s*R?\$?\s*([\d.,]+)"},
+    {'nome': 'convenio_arrecadacao', 'layout': 'santander', 'tipo': 'regex',
+     'requer': ("CONVENIO DE ARRECADACAO",), 'padrao': r"R\$\s*([\d.,]+)"},
+    {'nome': 'valor_apos_cnpj', 'tipo': 'funcao', 'requer': ("/",), 'funcao': _valor_apos_cnpj,
+     'mensagem': "Valor identificado após CNPJ"},
+    {'nome': 'valor_do_pagamento_posicao', 'tipo': 'posicao', 'marcador': "(=) VALOR DO PAGAMENTO:",
+     'padrao': _MOEDA, 'grupo': 0},
+    {'nome': 'valor_do_pagamento_linha_seguinte', 'tipo': 'linha_seguinte', 'marcador': "(=) VALOR DO PAGAMENTO:",
+     'padrao': _MOEDA, 'grupo': 0},
+    {'nome': 'valor_da_transacao_posicao', 'tipo': 'posicao', 'marcador': "VALOR DA TRANSAÇÃO:",
+     'padrao': _MOEDA, 'grupo': 0},
+    {'nome': 'valor_da_transacao', 'tipo': 'segmento', 'marcador': "VALOR DA TRANSAÇÃO:",
+     'padrao': _MOEDA, 'grupo': 0},
+    # Rótulos genéricos
+    {'nome': 'valor_do_pagamento_rs', 'tipo': 'regex', 'requer': ("(=)",),
+     'padrao': r"\(=\)\s*VALOR\s*DO\s*PAGAMENTO\s*\(R\$\):\s*([\d\.,]+)"},
+    {'nome': 'valor_do_pagamento_rs_linha_seguinte', 'tipo': 'regex', 'requer': ("(=)",),
+     'padrao': r"\(=\)\s*VALOR\s*DO\s*PAGAMENTO\s*\(R\$\):\s*\n\s*([\d\.,]+)"},
+    {'nome': 'valor_do_documento', 'tipo': 'regex', 'requer': ("VALOR",),
+     'padrao': r"VALOR\s+DO\s+DOCUMENTO[:\s]*R?\$?\s*([\d\.,]+)"},
+    {'nome': 'valor', 'tipo': 'regex', 'requer': ("VALOR",), 'padrao': r"VALOR[:\s]*R?\$?\s*([\d\.,]+)"},
+    {'nome': 'valor_dois_pontos', 'tipo': 'regex', 'requer': ("VALOR",), 'padrao': r"VALOR\s*:\s*R?\$?\s*([\d\.,]+)"},
+    {'nome': 'valor_da_ted', 'tipo': 'regex', 'requer': ("VALOR DA TED",), 'padrao': r"VALOR DA TED[:\s]*R?\$?\s*([\d\.,]+)"},
+    {'nome': 'valor_do_pagamento', 'tipo': 'regex', 'requer': ("VALOR DO PAGAMENTO",),
+     'padrao': r"VALOR DO PAGAMENTO \(R\$\):?\s*([\d\.,]+)"},
+    {'nome': 'valor_total_pago', 'tipo': 'regex', 'requer': ("VALOR TOTAL PAGO",),
+     'padrao': r"VALOR TOTAL PAGO[:\s]*R?\$?\s*([\d\.,]+)"},
+    {'nome': 'valor_total', 'tipo': 'regex', 'requer': ("VALOR TOTAL",), 'padrao': r"VALOR TOTAL[:\s]*R?\$?\s*([\d\.,]+)"},
+    {'nome': 'valor_atualizado', 'tipo': 'regex', 'requer': ("VALOR ATUALIZADO",),
+     'padrao': r"VALOR ATUALIZADO:?\s*R?\$?\s*([\d\.,]+)"},
+]
+
+
+# Primeira palavra de cada rótulo e cabeçalho das regras de posição, indexada em ``TextoPagina``
+_TERMOS_POSICAO = frozenset(
+    texto.split()[0].rstrip(':')
+    for regra in REGRAS_BENEFICIARIO + REGRAS_VALOR if regra['tipo'] == 'posicao'
+    for texto in (regra['marcador'], regra.get('apos')) if texto
+)
+
+
+# ---------------------------------------------------------------------------
+# Compilação das regras
+# ---------------------------------------------------------------------------
+
+def _finalizador_nome(regra):
+    """Limpeza e validação do nome encontrado por uma regra de beneficiário"""
+    apara = regra.get('apara', True)
+    corte = re.compile(regra['corte']) if 'corte' in regra else None
+    remove = re.compile(regra['remove']) if 'remove' in regra else None
+    rejeita = frozenset(regra.get('rejeita', ()))
+    aceita_vazio = regra.get('aceita_vazio', False)
+
+    def finalizar(nome):
+        if apara:
+            nome = nome.strip()
+        if corte is not None:
+            nome = corte.split(nome)[0]
+        if remove is not None:
+            nome = remove.sub('', nome).strip()
+        if (not nome and not aceita_vazio) or nome in rejeita:
+            return None
+        return nome[:LIMITE_NOME]
+
+    return finalizar
+
+
+def _finalizador_valor(regra):
+    """Regras de valor devolvem o número como encontrado; a formatação fica em ``extrair_valor``"""
+    return lambda valor: valor
+
+
+def _compilar_busca(regra, finalizar):
+    """Cria a função que aplica a regra a uma página, devolvendo o resultado ou None"""
+    tipo = regra['tipo']
+    marcador = regra.get('marcador')
+    grupo = regra.get('grupo', 1)
+    padrao = re.compile(regra['padrao'], regra.get('flags', 0)) if 'padrao' in regra else None
+
+    if tipo == 'constante':
+        resultado = regra['resultado']
+        return lambda pagina: resultado
+
+    if tipo == 'funcao':
+        return regra['funcao']
+
+    if tipo == 'regex':
+        def buscar(pagina):
+            texto = pagina.segmento(marcador) if marcador else pagina.texto
+            match = padrao.search(texto)
+            return finalizar(match.group(grupo)) if match else None
+        return buscar
+
+    if tipo == 'segmento':
+        ate = regra.get('ate')
+
+        def buscar(pagina):
+            trecho = pagina.segmento(marcador)
+            if ate is not None:
+                # Corta no segundo rótulo e só então pega a primeira linha
+                trecho = trecho.split(ate)[0].strip()
+                if not trecho:
+                    return None
+                trecho = trecho.split('\n')[0]
+            else:
+                trecho = trecho.split('\n')[0].strip()
+            if padrao is not None:
+                match = padrao.search(trecho)
+                if not match:
+                    return None
+                trecho = match.group(grupo)
+            return finalizar(trecho)
+        return buscar
+
+    if tipo == 'linha_seguinte':
+        def buscar(pagina):
+            linhas = pagina.linhas
+            for i, linha in enumerate(linhas):
+                if marcador in linha and i + 1 < len(linhas):
+                    candidato = linhas[i + 1].strip()
+                    if padrao is not None:
+                        match = padrao.search(candidato)
+                        candidato = match.group(grupo) if match else None
+                    if candidato is not None:
+                        candidato = finalizar(candidato)
+                        if candidato is not None:
+                            return candidato
+            return None
+        return buscar
+
+    if tipo == 'ultimo_marcador':
+        minimo = regra.get('minimo', 1)
+
+        def buscar(pagina):
+            if pagina.texto.count(marcador) < minimo:
+                return None
+            texto_apos = pagina.texto[pagina.texto.rfind(marcador) + len(marcador):]
+            return finalizar(texto_apos.split('\n')[0])
+        return buscar
+
+    if tipo == 'rotulo':
+        def buscar(pagina):
+            match = padrao.search(pagina.texto)
+            if not match:
+                return None
+            nome = match.group(1).split("CNPJ")[0].strip().split("\n")[0]
+            nome = _RE_PONTUACAO.sub("", nome).strip()
+
+            if "DO PAGADOR" in nome or "FANTASIA" in nome:
+                return BENEFICIARIO_INDEFINIDO
+
+            if "BENEFICIÁRIO ORIGINAL" in pagina.texto and nome == "ORIGINAL":
+                return None
+
+            if nome == "NOME":
+                linhas = pagina.linhas_unicode
+                for i, linha in enumerate(linhas):
+                    if linha.strip() == "NOME:" and i + 1 < len(linhas):
+                        nome = linhas[i + 1].strip()
+                        break
+
+            return nome[:LIMITE_NOME] if nome else BENEFICIARIO_INDEFINIDO
+        return buscar
+
+    if tipo == 'posicao':
+        direcao = regra.get('direcao', 'direita_ou_abaixo')
+        vizinhos = {
+            'direita': (TextoPagina.a_direita,),
+            'abaixo': (TextoPagina.abaixo,),
+            'direita_ou_abaixo': (TextoPagina.a_direita, TextoPagina.abaixo),
+        }[direcao]
+        apos = regra.get('apos')
+
+        def buscar(pagina):
+            if pagina.palavras is None:
+                return None
+            limite = None
+            if apos is not None:
+                cabecalhos = pagina.localizar(apos)
+                if not cabecalhos:
+                    return None
+                limite = cabecalhos[0][3]
+            for caixa in pagina.localizar(marcador):
+                if limite is not None and caixa[1] < limite - (caixa[3] - caixa[1]) / 2:
+                    continue
+                for vizinho in vizinhos:
+                    candidato = vizinho(pagina, *caixa)
+                    if padrao is not None:
+                        match = padrao.search(candidato)
+                        candidato = match.group(grupo) if match else None
+                    if candidato:
+                        candidato = finalizar(candidato)
+                        if candidato is not None:
+                            return candidato
+            return None
+        return buscar
+
+    raise ValueError(f"Tipo de regra desconhecido: {tipo}")
+
+
+def _requisitos(regra):
+    """Textos que precisam estar (todos) na página para a regra ser aplicada"""
+    requer = tuple(regra.get('requer', ()))
+    if regra.get('marcador'):
+        # Todos os tipos com marcador dependem de ele estar na página
+        requer += (regra['marcador'],)
+    return requer
+
+
+def compilar_regras(regras, finalizador):
+    """Compila as regras declaradas em tuplas
+    ``(nome, layout, requer, requer_algum, prefixo, buscar, mensagem)``"""
+    compiladas = []
+    for regra in regras:
+        compiladas.append((
+            regra['nome'],
+            regra.get('layout'),
+            _requisitos(regra),
+            tuple(regra.get('requer_algum', ())),
+            regra.get('prefixo'),
+            _compilar_busca(regra, finalizador(regra)),
+            regra.get('mensagem'),
+        ))
+    return compiladas
+
+
+_BENEFICIARIO_COMPILADAS = compilar_regras(REGRAS_BENEFICIARIO, _finalizador_nome)
+_VALOR_COMPILADAS = compilar_regras(REGRAS_VALOR, _finalizador_valor)
+
+
+# ---------------------------------------------------------------------------
+# Classificação do layout
+# ---------------------------------------------------------------------------
+
+LAYOUT_GENERICO = "generico"
+LAYOUT_SEM_TEXTO = "sem_texto"
+
+# Nome do banco, usado quando nenhuma regra específica de layout se aplica
+BANCOS = [
+    ('santander', "SANTANDER"),
+    ('itau', "ITAÚ"),
+    ('itau', "ITAU"),
+    ('btg', "BTG"),
+    ('caixa', "CAIXA"),
+    ('bradesco', "BRADESCO"),
+    ('bb', "BANCO DO BRASIL"),
+]
+
+def _cadeias_a_partir_de(posicao):
+    """Cadeias ``(beneficiário, valor)`` sem as regras de layout anteriores a ``posicao``
+    (na ordem das regras de beneficiário seguidas das de valor)"""
+    cadeias = []
+    for inicio, compiladas in ((0, _BENEFICIARIO_COMPILADAS), (len(_BENEFICIARIO_COMPILADAS), _VALOR_COMPILADAS)):
+        cadeias.append(tuple(regra for i, regra in enumerate(compiladas, inicio) if not regra[1] or i >= posicao))
+    return tuple(cadeias)
+
+
+def _regras_de_layout(compiladas):
+    """Termos ``(layout, requer, requer_algum, prefixo, cadeias)`` das regras específicas de layout,
+    na ordem de prioridade, sem repetir termos que já falharam numa regra anterior.
+
+    Quando a regra define o layout, os termos de todas as regras de layout
+    anteriores já foram testados e faltam na página: ``cadeias`` são as
+    regras de extração sem elas.
+    """
+    regras = []
+    for posicao, (nome, layout, requer, requer_algum, prefixo, buscar, mensagem) in enumerate(compiladas):
+        if not layout:
+            continue
+        if any(set(anterior[1]) <= set(requer) and anterior[2] == requer_algum and anterior[3] in (None, prefixo)
+               for anterior in regras):
+            # Se os termos da anterior não bastaram, os desta também não bastam
+            continue
+        regras.append((layout, requer, requer_algum, prefixo, _cadeias_a_partir_de(posicao)))
+    return regras
+
+
+_REGRAS_DE_LAYOUT = _regras_de_layout(_BENEFICIARIO_COMPILADAS + _VALOR_COMPILADAS)
+# Nenhuma regra de layout se aplica: só as genéricas
+_CADEIAS_GENERICAS = _cadeias_a_partir_de(len(_BENEFICIARIO_COMPILADAS) + len(_VALOR_COMPILADAS))
+
+
+def _classificar(texto):
+    """``(layout, cadeias)`` do texto: o layout da primeira regra específica cujos termos estão
+    presentes, ou o banco citado, ou genérico, com as regras de extração que ainda podem se aplicar"""
+    for layout, requer, requer_algum, prefixo, cadeias in _REGRAS_DE_LAYOUT:
+        for termo in requer:
+            if termo not in texto:
+                break
+        else:
+            if prefixo is not None and not texto.startswith(prefixo):
+                continue
+            if requer_algum and not any(termo in texto for termo in requer_algum):
+                continue
+            return layout, cadeias
+    for banco, termo in BANCOS:
+        if termo in texto:
+            return banco, _CADEIAS_GENERICAS
+    return LAYOUT_GENERICO, _CADEIAS_GENERICAS
+
+
+def _aplicar(compiladas, pagina, log=None, medicoes=None, campo=None):
+    """Aplica as regras em ordem; os testes de substring evitam rodar expressões à toa"""
+    if medicoes is not None:
+        return _aplicar_medindo(compiladas, pagina, log, medicoes, campo)
+    texto = pagina.texto
+    for nome, layout, requer, requer_algum, prefixo, buscar, mensagem in compiladas:
+        for termo in requer:
+            if termo not in texto:
+                break
+        else:
+            if prefixo is not None and not texto.startswith(prefixo):
+                continue
+            if requer_algum:
+                for termo in requer_algum:
+                    if termo in texto:
+                        break
+                else:
+                    continue
+            resultado = buscar(pagina)
+            if resultado is not None:
+                if mensagem and log:
+                    log(mensagem)
+                return resultado
+    return None
+
+
+def _aplicar_medindo(compiladas, pagina, log, medicoes, campo):
+    """Mesmo que ``_aplicar``, registrando em ``medicoes`` o tempo e o resultado de cada regra"""
+    texto = pagina.texto
+    relogio = time.perf_counter
+    for nome, layout, requer, requer_algum, prefixo, buscar, mensagem in compiladas:
+        inicio = relogio()
+        resultado = None
+        aplicada = (all(termo in texto for termo in requer)
+                    and (prefixo is None or texto.startswith(prefixo))
+                    and (not requer_algum or any(termo in texto for termo in requer_algum)))
+        if aplicada:
+            resultado = buscar(pagina)
+        medicoes.registrar_regra(campo, nome, relogio() - inicio, aplicada, resultado is not None)
+        if resultado is not None:
+            if mensagem and log:
+                log(mensagem)
+            return resultado
+    return None
+
+
+# ---------------------------------------------------------------------------
+# API pública
+# ---------------------------------------------------------------------------
+
+def contem_4_cpfs(texto):
+    """Verifica se o texto contém pelo menos 4 CPFs no formato XXX.XXX.XXX-XX"""
+    if texto is None:
+        return False
+    if isinstance(texto, TextoPagina):
+        return len(texto.cpfs) >= 4
+    encontrados = 0
+    for _ in _RE_CPF.finditer(texto):
+        encontrados += 1
+        if encontrados >= 4:
+            return True
+    return False
+
+
+def _rotulados(texto, rotulos, regex):
+    """Ocorrências de ``regex`` que começam em algum dos ``rotulos``, na ordem do texto"""
+    proximas = {rotulo: texto.find(rotulo) for rotulo in rotulos}
+    while True:
+        posicao, rotulo = min(((p, r) for r, p in proximas.items() if p >= 0), default=(-1, None))
+        if posicao < 0:
+            return
+        encontrado = regex.match(texto, posicao)
+        if encontrado:
+            yield encontrado
+        proximas[rotulo] = texto.find(rotulo, posicao + 1)
+
+
+def _data_valida(dia, mes, ano):
+    return f"{ano}-{mes}-{dia}" if 1 <= int(dia) <= 31 and 1 <= int(mes) <= 12 else None
+
+
+def extrair_data(texto):
+    """Data do pagamento no formato AAAA-MM-DD ("" se não encontrada).
+
+    Usa a data com rótulo de pagamento/transação; sem rótulo, a primeira data da página.
+    """
+    pagina = preparar_texto(texto)
+    if pagina is None or not pagina.datas:
+        return ""
+    for posicao, data in pagina.datas:
+        if _RE_ROTULO_DATA.search(pagina.texto, max(0, posicao - _ALCANCE_ROTULO_DATA), posicao):
+            return data
+    return pagina.datas[0][1]
+
+
+def extrair_autenticacao(texto):
+    """Código de autenticação/identificação da transação, sem pontos e traços ("" se não encontrado)"""
+    pagina = preparar_texto(texto)
+    if pagina is None:
+        return ""
+    for encontrado in _rotulados(pagina.texto, _ROTULOS_AUTENTICACAO, _RE_AUTENTICACAO):
+        codigo = encontrado.group(1)
+        # Exige um dígito para não confundir com a palavra seguinte ao rótulo
+        if any(c.isdigit() for c in codigo):
+            return codigo.replace('.', '').replace('-', '')
+    return ""
+
+
+def extrair_documento(texto, beneficiario):
+    """CPF ou CNPJ que aparece logo depois do beneficiário ("" se não encontrado)"""
+    pagina = preparar_texto(texto)
+    if pagina is None or not beneficiario or beneficiario == BENEFICIARIO_INDEFINIDO:
+        return ""
+    inicio = pagina.texto.find(beneficiario)
+    if inicio < 0:
+        return ""
+    # Na linha do nome e nas duas seguintes: o documento de outra pessoa da página fica mais longe
+    fim = inicio
+    for _ in range(_LINHAS_DOCUMENTO):
+        fim = pagina.texto.find('\n', fim + 1)
+        if fim < 0:
+            fim = len(pagina.texto)
+            break
+    documentos = [documento for documento in itertools.chain(pagina.cpfs, pagina.cnpjs)
+                  if inicio <= documento[0] < fim]
+    return min(documentos)[1] if documentos else ""
+
+
+def extrair_beneficiario(texto, medicoes=None):
+    """Extrai o nome do beneficiário do texto (ou de um ``TextoPagina``) com tratamento para None"""
+    pagina = preparar_texto(texto)
+    if pagina is None:
+        return BENEFICIARIO_INDEFINIDO
+    resultado = _aplicar(pagina.cadeias[0], pagina, None, medicoes, 'beneficiario')
+    return BENEFICIARIO_INDEFINIDO if resultado is None else resultado
+
+
+def extrair_valor(texto, log=None, medicoes=None):
+    """Extrai valor do texto (ou de um ``TextoPagina``) com tratamento para None"""
+    pagina = preparar_texto(texto)
+    if pagina is None:
+        return VALOR_INDEFINIDO
+    resultado = _aplicar(pagina.cadeias[1], pagina, log, medicoes, 'valor')
+    if resultado is None:
+        return VALOR_INDEFINIDO
+    return resultado.replace('.', '').replace(',', '_')
+
+
+def classificar_layout(texto):
+    """Retorna o layout detectado para o texto de uma página"""
+    pagina = preparar_texto(texto)
+    return LAYOUT_SEM_TEXTO if pagina is None else pagina.layout
+
+
+# ---------------------------------------------------------------------------
+# Versão das regras
+# ---------------------------------------------------------------------------
+
+def _assinatura(valor):
+    """Representação estável de constantes, regras e código, independente da execução"""
+    if isinstance(valor, dict):
+        return "{" + ",".join(f"{k!r}:{_assinatura(v)}" for k, v in sorted(valor.items())) + "}"
+    if isinstance(valor, (list, tuple)):
+        return "[" + ",".join(_assinatura(v) for v in valor) + "]"
+    if isinstance(valor, (set, frozenset)):
+        return "{" + ",".join(sorted(_assinatura(v) for v in valor)) + "}"
+    if isinstance(valor, re.Pattern):
+        return f"re({valor.pattern!r},{valor.flags})"
+    if isinstance(valor, types.CodeType):
+        return f"code({valor.co_code.hex()},{_assinatura(valor.co_consts)},{valor.co_names})"
+    if isinstance(valor, type):
+        return f"class({_assinatura({k: v for k, v in vars(valor).items() if callable(v) or isinstance(v, property)})})"
+    if isinstance(valor, property):
+        return _assinatura(valor.fget)
+    if hasattr(valor, '__code__'):
+        return _assinatura(valor.__code__)
+    return repr(valor)
+
+
+_versao_regras = None
+
+
+def versao_regras():
+    """Hash das regras, constantes e funções deste módulo.
+
+    Muda sempre que a extração pode dar outro resultado, servindo de chave
+    para invalidar resultados guardados em cache.
+    """
+    global _versao_regras
+    if _versao_regras is None:
+        partes = [
+            f"{nome}={_assinatura(valor)}"
+            for nome, valor in sorted(globals().items())
+            if not nome.startswith('__') and not isinstance(valor, types.ModuleType) and nome != '_versao_regras'
+        ]
+        _versao_regras = hashlib.sha256("\n".join(partes).encode('utf-8')).hexdigest()[:16]
+    return _versao_regras
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Gravação dos comprovantes divididos em uma thread própria, alimentada por uma fila limitada.
+
+Enquanto o processo principal lê as páginas, extrai os campos e serializa
+cada comprovante (trabalho de CPU, que segura o GIL), ``GravadorComprovantes``
+grava os bytes na pasta de saída e no ZIP e registra a saída no manifesto.
+Escrever em disco libera o GIL, então uma pasta de rede lenta deixa de
+atrasar a análise. A fila guarda no máximo ``COMPROVANTES_NA_FILA``
+comprovantes: se o disco ficar para trás, quem serializa espera, e a memória
+não cresce com o tamanho do PDF.
+
+Os comprovantes são gravados na ordem em que entram na fila, então o ZIP e o
+manifesto ficam iguais aos da gravação em série. Só depois de gravado um
+comprovante entra no manifesto, como antes: uma interrupção nunca deixa
+registrado um arquivo que não chegou ao disco.
+"""
+
+import queue
+import threading
+import time
+
+COMPROVANTES_NA_FILA = 32
+
+_FIM = None
+
+
+class GravadorComprovantes:
+    """Grava em segundo plano, em ordem, os comprovantes de um PDF.
+
+    ``arquivo_zip`` é o ``zipfile.ZipFile`` já aberto (ou None) e
+    ``manifesto`` o ``ManifestoLote`` do lote (ou None). O primeiro erro de
+    gravação é levantado na próxima chamada de ``gravar`` ou em ``fechar``;
+    os comprovantes que estavam na fila depois dele são descartados.
+    """
+
+    def __init__(self, pdf_path, arquivo_zip=None, manifesto=None, tamanho_fila=COMPROVANTES_NA_FILA):
+        self.pdf_path = pdf_path
+        self.arquivo_zip = arquivo_zip
+        self.manifesto = manifesto
+        self.bytes_arquivos = 0
+        # etapa -> [segundos, quantidade], somados às medições do processador ao fechar
+        self.tempos = {}
+        self.erro = None
+        self._fila = queue.Queue(tamanho_fila)
+        self._thread = threading.Thread(target=self._executar, name="gravador_comprovantes", daemon=True)
+        self._thread.start()
+
+    def gravar(self, registro, dados=None, caminho=None, nome_zip=None):
+        """Põe um comprovante na fila, esperando se ela estiver cheia.
+
+        Com ``dados`` os bytes vão para ``caminho`` (se informado) e para o
+        ZIP como ``nome_zip``; sem ``dados`` o arquivo que já existe em
+        ``caminho`` é copiado para o ZIP. Com manifesto, o ``registro`` entra
+        nele quando o comprovante é gravado agora (com ``dados``).
+        """
+        if self.erro is not None:
+            raise self.erro
+        self._fila.put((registro, dados, caminho, nome_zip))
+
+    def fechar(self):
+        """Espera a fila esvaziar e encerra a thread, levantando o erro de gravação, se houve"""
+        if self._thread.is_alive():
+            self._fila.put(_FIM)
+            self._thread.join()
+        if self.erro is not None:
+            raise self.erro
+
+    def _executar(self):
+        while True:
+            item = self._fila.get()
+            if item is _FIM:
+                return
+            if self.erro is not None:
+                continue
+            try:
+                self._gravar(*item)
+            except BaseException as e:
+                self.erro = e
+
+    def _medir(self, etapa, inicio):
+        total = self.tempos.setdefault(etapa, [0.0, 0])
+        total[0] += time.perf_counter() - inicio
+        total[1] += 1
+
+    def _gravar(self, registro, dados, caminho, nome_zip):
+        if dados is None:
+            # Gravado antes da interrupção: só entra no ZIP, que é sempre refeito
+            inicio = time.perf_counter()
+            self.arquivo_zip.write(caminho, nome_zip)
+            self._medir('zip', inicio)
+            return
+        if caminho:
+            inicio = time.perf_counter()
+            with open(caminho, 'wb') as f:
+                f.write(dados)
+            self.bytes_arquivos += len(dados)
+            self._medir('gravacao_disco', inicio)
+        if nome_zip:
+            inicio = time.perf_counter()
+            self.arquivo_zip.writestr(nome_zip, dados)
+            self._medir('zip', inicio)
+        if self.manifesto is not None:
+            inicio = time.perf_counter()
+            self.manifesto.registrar_saida(self.pdf_path, registro)
+            self._medir('manifesto', inicio)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Manifesto de um lote de processamento, gravado à medida que o lote avança.
+
+Cada linha do arquivo (JSON Lines) é um evento: início de um PDF, um
+comprovante gravado, conclusão, erro ou a renomeação de saídas já gravadas
+(como a remoção da numeração). Se o programa for interrompido, o
+lote pode ser retomado: PDFs concluídos são pulados sem abrir o arquivo e,
+num PDF interrompido no meio, os comprovantes já gravados não são gerados de
+novo. Como o arquivo só recebe linhas no final, uma interrupção perde no
+máximo a última linha, que é ignorada na leitura.
+"""
+
+import json
+import os
+
+from cache_paginas import hash_arquivo
+
+ARQUIVO_MANIFESTO = "manifesto_processamento.jsonl"
+
+
+def _chave(pdf_path):
+    return os.path.normcase(os.path.abspath(pdf_path))
+
+
+def _identificacao(pdf_path):
+    """Tamanho e data de modificação, usados para reconhecer o arquivo sem lê-lo"""
+    info = os.stat(pdf_path)
+    return info.st_size, info.st_mtime_ns
+
+
+class ManifestoLote:
+    """Registro incremental de um lote; ``retomar=False`` começa um manifesto novo."""
+
+    def __init__(self, caminho, retomar=True):
+        self.caminho = caminho
+        self.arquivos = {}
+        if retomar and os.path.exists(caminho):
+            self._carregar()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.saida = open(caminho, 'a' if retomar else 'w', encoding='utf-8')
+        if retomar and self._termina_cortado():
+            # Isola a linha cortada para que o próximo evento não se junte a ela
+            self.saida.write("\n")
+
+    def _termina_cortado(self):
+        with open(self.caminho, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def close(self):
+        self.saida.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _carregar(self):
+        with open(self.caminho, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    # Linha cortada por uma interrupção
+                    continue
+                self._aplicar(evento)
+
+    def _aplicar(self, evento):
+        """Atualiza o estado de um PDF com um evento lido ou gravado"""
+        tipo = evento['evento']
+        if tipo == 'inicio':
+            self.arquivos[evento['arquivo']] = {
+                'hash': evento['hash'],
+                'tamanho': evento['tamanho'],
+                'mtime': evento['mtime'],
+                'opcoes': evento['opcoes'],
+                'status': 'iniciado',
+                'registros': [],
+            }
+            return
+        if tipo == 'renomeado':
+            saidas = {_chave(de): para for de, para in evento['saidas'].items()}
+            for estado in self.arquivos.values():
+                for registro in estado['registros']:
+                    registro['arquivo_saida'] = saidas.get(_chave(registro['arquivo_saida']),
+                                                           registro['arquivo_saida'])
+            return
+        estado = self.arquivos.get(evento['arquivo'])
+        if estado is None:
+            return
+        if tipo == 'saida':
+            estado['registros'].append(evento['registro'])
+        elif tipo == 'concluido':
+            estado['status'] = 'concluido'
+            estado['registros'] = evento['registros']
+        elif tipo == 'erro':
+            estado['status'] = 'erro'
+
+    def _gravar(self, evento, sincronizar=False):
+        self._aplicar(evento)
+        self.saida.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        self.saida.flush()
+        if sincronizar:
+            os.fsync(self.saida.fileno())
+
+    def _mesmo_arquivo(self, estado, pdf_path, opcoes, hash_pdf=None):
+        """Confere se o PDF é o mesmo do manifesto, lendo o conteúdo só se tamanho ou data mudaram"""
+        if estado is None or estado['opcoes'] != opcoes:
+            return False
+        tamanho, mtime = _identificacao(pdf_path)
+        if (tamanho, mtime) == (estado['tamanho'], estado['mtime']):
+            return True
+        return tamanho == estado['tamanho'] and (hash_pdf or hash_arquivo(pdf_path)) == estado['hash']
+
+    def concluido(self, pdf_path, opcoes):
+        """Registros de um PDF já concluído com as mesmas opções e saídas ainda presentes, ou None"""
+        estado = self.arquivos.get(_chave(pdf_path))
+        if estado is None or estado['status'] != 'concluido' or not self._mesmo_arquivo(estado, pdf_path, opcoes):
+            return None
+        for registro in estado['registros']:
+            if opcoes['gravar_arquivos'] and not os.path.exists(registro['arquivo_saida']):
+                return None
+            if registro.get('arquivo_zip') and not os.path.exists(registro['arquivo_zip']):
+                return None
+        return estado['registros']
+
+    def registros_concluidos(self, exceto=()):
+        """Registros de todos os PDFs concluídos (menos os de ``exceto``), na ordem em que entraram no manifesto"""
+        exceto = {_chave(pdf_path) for pdf_path in exceto}
+        return [
+            registro
+            for arquivo, estado in self.arquivos.items()
+            if estado['status'] == 'concluido' and arquivo not in exceto
+            for registro in estado['registros']
+        ]
+
+    def saidas_gravadas(self, pdf_path, opcoes, hash_pdf=None):
+        """Comprovantes já gravados por uma execução interrompida do mesmo PDF, por caminho de saída.
+
+        ``hash_pdf`` é o SHA-256 já calculado pelo chamador; sem ele o arquivo é
+        lido só se tamanho ou data mudaram.
+        """
+        estado = self.arquivos.get(_chave(pdf_path))
+        if (estado is None or estado['status'] != 'iniciado'
+                or not self._mesmo_arquivo(estado, pdf_path, opcoes, hash_pdf)):
+            return {}
+        return {
+            registro['arquivo_saida']: registro
+            for registro in estado['registros']
+            if os.path.exists(registro['arquivo_saida'])
+        }
+
+    def iniciar(self, pdf_path, opcoes, hash_pdf=None):
+        """Registra o início do processamento de um PDF, calculando o SHA-256 se ``hash_pdf`` não vier"""
+        tamanho, mtime = _identificacao(pdf_path)
+        self._gravar({
+            'evento': 'inicio',
+            'arquivo': _chave(pdf_path),
+            'hash': hash_pdf or hash_arquivo(pdf_path),
+            'tamanho': tamanho,
+            'mtime': mtime,
+            'opcoes': opcoes,
+        })
+
+    def registrar_saida(self, pdf_path, registro):
+        self._gravar({'evento': 'saida', 'arquivo': _chave(pdf_path), 'registro': registro})
+
+    def concluir(self, pdf_path, registros):
+        self._gravar({'evento': 'concluido', 'arquivo': _chave(pdf_path), 'registros': registros},
+                     sincronizar=True)
+
+    def renomear_saidas(self, renomeados):
+        """Registra os novos nomes ``{antigo: novo}`` de comprovantes já gravados (ex.: sem a numeração)"""
+        self._gravar({'evento': 'renomeado', 'saidas': renomeados}, sincronizar=True)
+
+    def falhar(self, pdf_path, erro):
+        self._gravar({'evento': 'erro', 'arquivo': _chave(pdf_path), 'erro': erro}, sincronizar=True)
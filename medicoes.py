@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Medição do tempo gasto em cada etapa do processamento.
+
+Desligada por padrão: o processador só cria um ``Medicoes`` com ``medir=True``
+e, sem ele, cada ponto de medição custa apenas um teste de ``None``. Ligada,
+acumula tempo e contagem por etapa (no total e por arquivo), o tempo de cada
+regra de extração com quantas vezes foi aplicada e encontrou o campo, e um
+registro por página com os tempos dela e as regras que acertaram. O resultado
+sai como resumo em texto (``resumo``) ou em JSON (``exportar_json``).
+
+Os tempos medidos em processos do pool são somados aos do processo principal
+(``incorporar``), então o total de uma etapa pode passar do tempo de relógio.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+
+def _somar(totais, chave, segundos, quantidade):
+    total = totais.get(chave)
+    if total is None:
+        totais[chave] = [segundos, quantidade]
+    else:
+        total[0] += segundos
+        total[1] += quantidade
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 3)
+
+
+class Medicoes:
+    """Tempos e contagens acumulados por etapa, arquivo, regra de extração e página."""
+
+    def __init__(self):
+        self.etapas = {}
+        self.arquivos = {}
+        self.regras = {}
+        self.paginas = []
+        # Arquivo em processamento; as etapas medidas também são somadas a ele
+        self.arquivo = None
+        self._pagina = {}
+        self._inicio = time.perf_counter()
+
+    def registrar(self, etapa, segundos, quantidade=1, pagina=False):
+        """Soma a duração de uma etapa; com ``pagina=True`` ela entra também no registro da página atual"""
+        _somar(self.etapas, etapa, segundos, quantidade)
+        if self.arquivo is not None:
+            _somar(self.arquivos.setdefault(self.arquivo, {}), etapa, segundos, quantidade)
+        if pagina:
+            self._pagina[etapa] = segundos
+
+    @contextmanager
+    def medir(self, etapa, quantidade=1):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio, quantidade)
+
+    def registrar_regra(self, campo, regra, segundos, aplicada, encontrou):
+        """Soma o tempo de uma regra de extração e guarda a que encontrou o campo na página atual"""
+        por_regra = self.regras.setdefault(campo, {})
+        total = por_regra.get(regra)
+        if total is None:
+            total = por_regra[regra] = [0.0, 0, 0, 0]
+        total[0] += segundos
+        total[1] += 1
+        total[2] += aplicada
+        total[3] += encontrou
+        if encontrou:
+            self._pagina[f"regra_{campo}"] = regra
+
+    def registrar_pagina(self, numero, **dados):
+        """Fecha o registro da página com as etapas e regras acumuladas desde o anterior"""
+        registro = {'arquivo': self.arquivo, 'pagina': numero}
+        registro.update(self._pagina)
+        registro.update(dados)
+        self.paginas.append(registro)
+        self._pagina = {}
+
+    def como_dict(self):
+        """Medições em estruturas simples, para voltar de um processo do pool"""
+        return {'etapas': self.etapas, 'arquivos': self.arquivos, 'regras': self.regras, 'paginas': self.paginas}
+
+    def incorporar(self, dados):
+        """Soma as medições feitas em outro processo (``como_dict``)"""
+        for etapa, (segundos, quantidade) in dados['etapas'].items():
+            _somar(self.etapas, etapa, segundos, quantidade)
+        for arquivo, etapas in dados['arquivos'].items():
+            totais = self.arquivos.setdefault(arquivo, {})
+            for etapa, (segundos, quantidade) in etapas.items():
+                _somar(totais, etapa, segundos, quantidade)
+        for campo, regras in dados['regras'].items():
+            por_regra = self.regras.setdefault(campo, {})
+            for regra, valores in regras.items():
+                total = por_regra.setdefault(regra, [0.0, 0, 0, 0])
+                for i, valor in enumerate(valores):
+                    total[i] += valor
+        self.paginas.extend(dados['paginas'])
+
+    def _regras_ordenadas(self):
+        linhas = [
+            (segundos, campo, regra, avaliada, aplicada, encontrou)
+            for campo, regras in self.regras.items()
+            for regra, (segundos, avaliada, aplicada, encontrou) in regras.items()
+        ]
+        return sorted(linhas, key=lambda linha: linha[0], reverse=True)
+
+    def resumo(self, limite_regras=10):
+        """Linhas de texto com as etapas e as regras mais demoradas"""
+        linhas = [f"⏱️ Tempo por etapa ({time.perf_counter() - self._inicio:.2f} s de relógio):"]
+        for etapa, (segundos, quantidade) in sorted(self.etapas.items(), key=lambda item: item[1][0], reverse=True):
+            # Uma etapa medida sobre nenhum item (renomear sem arquivos, por exemplo) fica sem média
+            cada = _ms(segundos / quantidade) if quantidade else 0.0
+            linhas.append(f"  {etapa:<20} {segundos:9.3f} s  {quantidade:>7}x  {cada:>9.3f} ms cada")
+        regras = self._regras_ordenadas()[:limite_regras]
+        if regras:
+            linhas.append("⏱️ Regras de extração mais demoradas:")
+            for segundos, campo, regra, avaliada, aplicada, encontrou in regras:
+                linhas.append(f"  {campo + '/' + regra:<50} {_ms(segundos):9.1f} ms  avaliada {avaliada}x, "
+                              f"aplicada {aplicada}x, encontrou {encontrou}x")
+        return linhas
+
+    def exportar_json(self, caminho):
+        """Grava todas as medições, incluindo o registro de cada página, em JSON"""
+        dados = {
+            'segundos_relogio': round(time.perf_counter() - self._inicio, 3),
+            'etapas': {
+                etapa: {'ms': _ms(segundos), 'vezes': quantidade}
+                for etapa, (segundos, quantidade) in self.etapas.items()
+            },
+            'arquivos': {
+                arquivo: {etapa: {'ms': _ms(segundos), 'vezes': quantidade}
+                          for etapa, (segundos, quantidade) in etapas.items()}
+                for arquivo, etapas in self.arquivos.items()
+            },
+            'regras': [
+                {'campo': campo, 'regra': regra, 'ms': _ms(segundos), 'avaliada': avaliada,
+                 'aplicada': aplicada, 'encontrou': encontrou}
+                for segundos, campo, regra, avaliada, aplicada, encontrou in self._regras_ordenadas()
+            ],
+            'paginas': [
+                {chave: _ms(valor) if isinstance(valor, float) else valor for chave, valor in pagina.items()}
+                for pagina in self.paginas
+            ],
+        }
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Monitoramento de pastas de entrada, processando os PDFs novos à medida que chegam.
+
+As pastas são varridas a cada ``intervalo`` segundos (sem dependências
+externas, funcionando também em pastas de rede). Um PDF só entra na fila
+depois de passar ``estabilidade`` segundos sem mudar de tamanho nem de data e
+de terminar com o marcador ``%%EOF``, para não pegar arquivos que ainda estão
+sendo copiados. Os PDFs prontos seguem para ``process_pdfs`` em lotes de até
+``limite_por_lote`` arquivos, usando o pool de ``workers`` do processador.
+
+O manifesto do processador fica aberto durante todo o monitoramento: PDFs já
+concluídos (nesta ou em execuções anteriores) não são reprocessados e o
+relatório de cada pasta de saída é atualizado a partir dos registros
+guardados nele, sem reabrir os PDFs antigos.
+"""
+
+import os
+import threading
+import time
+
+INTERVALO_PADRAO = 5
+ESTABILIDADE_PADRAO = 10
+LIMITE_POR_LOTE = 50
+
+# Tempo parado sem o %%EOF depois do qual o arquivo é processado mesmo assim
+ESPERA_MAXIMA_SEM_EOF = 120
+_BYTES_FINAIS = 1024
+
+
+def termina_com_eof(caminho):
+    """Indica se o PDF tem o marcador de fim de arquivo perto do final (cópia completa)"""
+    try:
+        with open(caminho, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - _BYTES_FINAIS))
+            return b"%%EOF" in f.read()
+    except OSError:
+        # Bloqueado por quem ainda está gravando
+        return False
+
+
+class MonitorPastas:
+    """Acompanha pastas de entrada e processa os PDFs novos com um ``ProcessadorComprovantes``."""
+
+    def __init__(self, pastas, processador, intervalo=INTERVALO_PADRAO, estabilidade=ESTABILIDADE_PADRAO,
+                 formato_relatorio=None, limite_por_lote=LIMITE_POR_LOTE):
+        if processador.arquivo_manifesto and not processador.retomar:
+            # Sem retomar o manifesto seria recriado, perdendo o histórico de PDFs concluídos
+            raise ValueError("O monitoramento exige um processador com retomar=True")
+        self.pastas = list(pastas)
+        self.processador = processador
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.formato_relatorio = formato_relatorio
+        self.limite_por_lote = limite_por_lote
+        # caminho -> (tamanho, mtime_ns, desde quando está assim)
+        self._observados = {}
+        # caminho -> (tamanho, mtime_ns) já processado ou com erro nesta execução
+        self._concluidos = {}
+        # Registros desta execução, usados no relatório quando não há manifesto
+        self.registros = []
+        self._parar = threading.Event()
+
+    def log_message(self, message):
+        self.processador.log_message(message)
+
+    def parar(self):
+        """Pede o fim do monitoramento; o lote em andamento termina antes"""
+        self._parar.set()
+
+    def _listar(self):
+        """PDFs no primeiro nível das pastas monitoradas, com tamanho e data"""
+        for pasta in self.pastas:
+            try:
+                entradas = list(os.scandir(pasta))
+            except OSError as e:
+                self.log_message(f"⚠️ Não foi possível ler a pasta {pasta}: {str(e)}")
+                continue
+            for entrada in entradas:
+                if not entrada.name.lower().endswith('.pdf'):
+                    continue
+                try:
+                    if not entrada.is_file():
+                        continue
+                    info = entrada.stat()
+                except OSError:
+                    continue
+                yield entrada.path, (info.st_size, info.st_mtime_ns)
+
+    def verificar(self, agora=None):
+        """Varre as pastas e retorna os PDFs prontos para processar"""
+        agora = time.monotonic() if agora is None else agora
+        prontos = []
+        vistos = set()
+        for caminho, identificacao in self._listar():
+            vistos.add(caminho)
+            if self._concluidos.get(caminho) == identificacao or identificacao[0] == 0:
+                continue
+            observado = self._observados.get(caminho)
+            if observado is None or observado[:2] != identificacao:
+                # Novo ou ainda mudando: o prazo de estabilidade recomeça
+                self._observados[caminho] = (*identificacao, agora)
+                continue
+            parado = agora - observado[2]
+            if parado < self.estabilidade:
+                continue
+            if not termina_com_eof(caminho) and parado < ESPERA_MAXIMA_SEM_EOF:
+                continue
+            prontos.append(caminho)
+
+        for caminho in list(self._observados):
+            if caminho not in vistos:
+                del self._observados[caminho]
+        return sorted(prontos)
+
+    def _separar_concluidos(self, prontos):
+        """Tira da lista os PDFs que o manifesto já registra como concluídos"""
+        pendentes = []
+        for caminho in prontos:
+            if self.processador.ja_concluido(caminho) is None:
+                pendentes.append(caminho)
+            else:
+                self._concluir(caminho)
+        return pendentes
+
+    def _concluir(self, caminho):
+        observado = self._observados.pop(caminho, None)
+        if observado is not None:
+            self._concluidos[caminho] = observado[:2]
+
+    def processar(self, prontos, manifesto=None):
+        """Processa um lote de PDFs prontos e atualiza os relatórios"""
+        self.log_message(f"\n📥 {len(prontos)} PDF(s) novo(s) nas pastas monitoradas")
+        registros = self.processador.process_pdfs(prontos)
+        # Com erro também contam como concluídos: só voltam à fila se o arquivo mudar
+        for caminho in prontos:
+            self._concluir(caminho)
+        if manifesto is None:
+            self.registros.extend(registros)
+        if self.formato_relatorio and registros:
+            self._atualizar_relatorios(registros, manifesto)
+
+    def _atualizar_relatorios(self, novos, manifesto):
+        """Acrescenta os novos registros ao CSV ou regrava os demais formatos com todos os registros"""
+        acrescentar = self.formato_relatorio == 'csv'
+        if acrescentar:
+            registros = novos
+        else:
+            registros = manifesto.registros_concluidos() if manifesto is not None else self.registros
+        pastas_novas = {os.path.dirname(r['arquivo_saida']) for r in novos}
+
+        por_pasta = {}
+        for registro in registros:
+            output_dir = os.path.dirname(registro['arquivo_saida'])
+            if output_dir in pastas_novas:
+                por_pasta.setdefault(output_dir, []).append(registro)
+        for output_dir, registros_pasta in por_pasta.items():
+            self.processador.generate_report(registros_pasta, output_dir, self.formato_relatorio, acrescentar)
+
+    def executar(self):
+        """Monitora as pastas até ``parar`` ser chamado"""
+        self.log_message(f"👀 Monitorando {', '.join(self.pastas)} (a cada {self.intervalo} s)")
+        with self.processador.manifesto_aberto() as manifesto:
+            while not self._parar.is_set():
+                prontos = self._separar_concluidos(self.verificar())
+                while prontos and not self._parar.is_set():
+                    lote, prontos = prontos[:self.limite_por_lote], prontos[self.limite_por_lote:]
+                    self.processar(lote, manifesto)
+                self._parar.wait(self.intervalo)
+        self.log_message("⏹️ Monitoramento encerrado")
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Reconhecimento de texto (OCR) das páginas digitalizadas, sem texto selecionável.
+
+Usa o Tesseract por meio do ``pytesseract`` (e do Pillow), que são opcionais:
+sem eles as páginas digitalizadas continuam como antes, sem texto. O texto
+reconhecido é guardado no cache de páginas pelo hash do conteúdo da página
+(instruções de desenho, imagens e demais recursos), então a mesma página
+nunca passa duas vezes pelo OCR, mesmo em outro arquivo, e só é renderizada
+quando o texto ainda não está no cache.
+"""
+
+import hashlib
+import io
+import re
+from functools import lru_cache
+
+from cache_paginas import CachePaginas
+
+OCR_DPI_PADRAO = 300
+IDIOMA_OCR = "por"
+
+
+@lru_cache(maxsize=None)
+def ocr_disponivel():
+    """Indica se o pytesseract, o Pillow e o executável do Tesseract estão instalados"""
+    try:
+        import pytesseract
+        from PIL import Image  # noqa: F401
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+# Referências a outros objetos ("12 0 R") mudam de um arquivo para outro sem mudar a página
+_REFERENCIA = re.compile(r"\b\d+ \d+ R\b")
+
+
+def _objeto(doc, xref):
+    return _REFERENCIA.sub("R", doc.xref_object(xref, compressed=True)).encode('utf-8')
+
+
+def chave_pagina(doc, indice, dpi, idioma):
+    """Chave do OCR de uma página, calculada sem renderizá-la.
+
+    Combina as instruções de desenho, o tamanho e a rotação da página, os
+    dados brutos (ainda comprimidos) de cada imagem e da sua máscara, os
+    formulários e as fontes, com a resolução e o idioma, já que ambos mudam o
+    texto reconhecido.
+    """
+    page = doc.load_page(indice)
+    chave = hashlib.sha256(page.read_contents())
+    chave.update(f":{tuple(page.cropbox)}:{page.rotation}:{dpi}:{idioma}".encode('utf-8'))
+    for xref, smask, *dados in page.get_images(full=True):
+        chave.update(repr(dados[:-1]).encode('utf-8'))
+        chave.update(_objeto(doc, xref))
+        chave.update(doc.xref_stream_raw(xref) or b"")
+        if smask:
+            chave.update(doc.xref_stream_raw(smask) or b"")
+    for xref, *_ in page.get_xobjects():
+        chave.update(_objeto(doc, xref))
+        chave.update(doc.xref_stream_raw(xref) or b"")
+    for xref, *dados in page.get_fonts(full=True):
+        chave.update(repr(dados[:-1]).encode('utf-8'))
+    return chave.hexdigest()
+
+
+def renderizar_pagina(doc, indice, dpi):
+    """Renderiza a página em tons de cinza, retornando o PNG"""
+    import fitz  # PyMuPDF
+
+    return doc.load_page(indice).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+
+
+def reconhecer_png(png, idioma):
+    """Texto reconhecido pelo Tesseract em uma imagem PNG"""
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as imagem:
+        return pytesseract.image_to_string(imagem, lang=idioma)
+
+
+def reconhecer_paginas(pdf_path, indices, dpi=OCR_DPI_PADRAO, idioma=IDIOMA_OCR, arquivo_cache=None, log=print):
+    """Aplica o OCR nas páginas ``indices`` do PDF, consultando e alimentando o cache.
+
+    Retorna ``(textos, do_cache)``: o texto de cada página reconhecida, por
+    índice, e quantas vieram do cache. Páginas com erro ficam de fora.
+    """
+    import fitz  # PyMuPDF
+
+    textos = {}
+    do_cache = 0
+    cache = CachePaginas(arquivo_cache) if arquivo_cache else None
+    doc = fitz.open(pdf_path)
+    try:
+        for indice in indices:
+            try:
+                chave = chave_pagina(doc, indice, dpi, idioma) if cache is not None else None
+                texto = cache.texto_ocr(chave) if cache is not None else None
+                if texto is not None:
+                    do_cache += 1
+                else:
+                    texto = reconhecer_png(renderizar_pagina(doc, indice, dpi), idioma)
+                    if cache is not None:
+                        cache.salvar_ocr(chave, texto)
+                textos[indice] = texto
+            except Exception as e:
+                log(f"Erro no OCR da página {indice + 1}: {str(e)}")
+    finally:
+        doc.close()
+        if cache is not None:
+            cache.close()
+    return textos, do_cache
@@ -0,0 +1,1516 @@
+# -*- coding: utf-8 -*-
+"""Motor de processamento dos comprovantes, independente da interface gráfica.
+
+O PyMuPDF (``fitz``), o PyPDF2, o ``zipfile`` e o pool de processos só são
+importados quando uma operação precisa deles, para que abrir a interface ou a
+ajuda da linha de comando seja rápido.
+"""
+
+import itertools
+import os
+import re
+import shutil
+import sqlite3
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from busca import IndiceBusca
+from cache_paginas import CachePaginas, hash_arquivo
+from gravacao import GravadorComprovantes
+from duplicados import (
+    ACAO_DUPLICADOS_PADRAO,
+    ACOES_DUPLICADOS,
+    IndiceDuplicados,
+    assinatura_texto,
+    chaves_comprovante,
+)
+from manifesto import ManifestoLote
+from medicoes import Medicoes
+from relatorio import ARQUIVO_RELATORIO, FORMATO_PADRAO, gravar_relatorio
+from renomeacao import ARQUIVO_DESFAZER, AlocadoresPorPasta, AlocadorNomes, aplicar_renomeacoes, desfazer_renomeacoes
+from ocr import IDIOMA_OCR, OCR_DPI_PADRAO, ocr_disponivel, reconhecer_paginas
+from extratores import (
+    BENEFICIARIO_INDEFINIDO,
+    LAYOUT_SEM_TEXTO,
+    VALOR_INDEFINIDO,
+    contem_4_cpfs,
+    extrair_autenticacao,
+    extrair_beneficiario,
+    extrair_data,
+    extrair_documento,
+    extrair_valor,
+    preparar_texto,
+)
+
+PASTA_SAIDA = "comprovantes_processados"
+# Numeração que a divisão põe no início do nome de cada comprovante ("001_", "1000_")
+_NUMERACAO = re.compile(r"^\d{3,}_")
+
+# Abaixo disso abrir o PDF em vários processos custa mais do que analisar em série
+PAGINAS_MINIMAS_PARALELO = 100
+PAGINAS_MINIMAS_POR_LOTE = 25
+
+# PDFs maiores que isso são analisados e divididos janela a janela, com memória limitada
+PAGINAS_POR_JANELA = 500
+
+# Mesclagem: o PyMuPDF grava em etapas e remove fontes/imagens repetidas; o PyPDF2 monta tudo em memória
+MOTORES_MESCLAGEM = ('pymupdf', 'pypdf2')
+MOTOR_MESCLAGEM_PADRAO = 'pymupdf'
+ARQUIVOS_POR_ETAPA_MESCLAGEM = 200
+# Acima disso a mesclagem não junta os objetos repetidos: o tempo dessa busca cresce mais que
+# linearmente (2500 comprovantes: 11 s; 10000: 5 min), enquanto a memória quase não muda
+ARQUIVOS_MAXIMOS_DEDUPLICACAO = 2000
+
+# Otimização de cada comprovante gravado: 'limpa' reescreve o conteúdo da página mantendo só os
+# recursos usados, reduz as fontes aos caracteres usados e comprime; 'maxima' também junta os
+# objetos em object streams e elimina objetos duplicados
+OTIMIZACOES_SAIDA = ('nenhuma', 'limpa', 'maxima')
+OTIMIZACAO_SAIDA_PADRAO = 'nenhuma'
+_OPCOES_GRAVACAO = {
+    'nenhuma': {},
+    'limpa': {'garbage': 3, 'deflate': True, 'clean': True},
+    'maxima': {'garbage': 4, 'deflate': True, 'clean': True, 'use_objstms': 1},
+}
+
+_SEM_MEDICAO = nullcontext()
+# Campos das páginas quando nem o relatório nem os índices precisam deles (só lido, nunca alterado)
+_SEM_CAMPOS_COMPLEMENTARES = {'data': "", 'documento': "", 'autenticacao': "", 'assinatura': ""}
+
+
+def corrigir_caminho(caminho):
+    """Corrige problemas com separadores de caminho e verifica existência do arquivo."""
+    if not caminho:
+        return caminho
+
+    if os.path.exists(caminho):
+        return caminho
+
+    tentativas = [
+        caminho,
+        caminho.replace('/', '\\'),
+        caminho.replace('\\', '/'),
+        os.path.normpath(caminho),
+        os.path.abspath(caminho)
+    ]
+
+    tentativas = list(dict.fromkeys(tentativas))
+
+    for tentativa in tentativas:
+        try:
+            if os.path.exists(tentativa):
+                return tentativa
+        except (TypeError, ValueError):
+            continue
+
+    return caminho
+
+
+def nome_arquivo_saida(nome, valor, contador=None, ext=".pdf"):
+    """Monta o nome do arquivo de saída no padrão NOME_VALOR (com numeração opcional)"""
+    if nome == BENEFICIARIO_INDEFINIDO and valor == VALOR_INDEFINIDO:
+        base = f"{nome} {valor}"
+    else:
+        base = f"{nome}_{valor}"
+    if contador is not None:
+        base = f"{contador:03d}_{base}"
+    return f"{base}{ext}"
+
+
+def agrupar_paginas(paginas_analisadas):
+    """Agrupa as páginas analisadas (lista ou qualquer iterável, em ordem) em comprovantes.
+
+    Gera tuplas ``(inicio, fim, primeira)`` com índices de página a partir de
+    zero (``fim`` exclusivo) e a página que abre o comprovante. Uma página de
+    FOLHA leva junto as páginas de continuação (lista de CPFs) que a seguem; as
+    demais viram um arquivo cada. Cada comprovante é entregue assim que a
+    página seguinte a ele é lida.
+    """
+    primeira = None
+    inicio = 0
+    indice = -1
+    for indice, pagina in enumerate(paginas_analisadas):
+        if primeira is not None:
+            if primeira['folha'] and pagina['continuacao']:
+                continue
+            yield inicio, indice, primeira
+        primeira, inicio = pagina, indice
+    if primeira is not None:
+        yield inicio, indice + 1, primeira
+
+
+def agrupar_comprovantes(paginas_analisadas):
+    """Agrupa as páginas analisadas em comprovantes, gerando ``(inicio, fim, nome, valor)``"""
+    for inicio, fim, primeira in agrupar_paginas(paginas_analisadas):
+        yield inicio, fim, "FOLHA" if primeira['folha'] else primeira['nome'], primeira['valor']
+
+
+class ProcessadorComprovantes:
+    """Divide, renomeia, mescla e gera relatórios de comprovantes sem depender do Tk.
+
+    As mensagens são enviadas para ``log`` (padrão: ``print``) e o andamento
+    para ``progresso(atual, total)``, permitindo uso tanto pela interface
+    gráfica quanto pela linha de comando. ``workers`` define quantos processos
+    dividem os arquivos de entrada (0 usa todos os núcleos); um PDF processado
+    sozinho tem seus intervalos de páginas analisados em paralelo. Com
+    ``gravar_arquivos=False`` os comprovantes divididos vão apenas para o ZIP.
+    ``arquivo_cache`` liga o cache de páginas (SQLite) naquele caminho e
+    ``arquivo_manifesto`` registra o andamento do lote; com ``retomar=True`` o
+    lote continua de onde um manifesto anterior parou. ``ocr=True`` passa as
+    páginas sem texto pelo OCR em ``ocr_workers`` processos (0 usa todos os
+    núcleos). ``medir=True`` registra em ``self.medicoes`` o tempo de cada
+    etapa, página e regra de extração. PDFs com mais de ``paginas_por_janela``
+    páginas são analisados em janelas desse tamanho e cada comprovante é
+    gravado assim que fica completo, sem guardar o texto do documento inteiro
+    (0 desliga). ``arquivo_busca`` guarda cada comprovante gerado, com o texto
+    das páginas e os campos extraídos, no índice de busca daquele caminho.
+    Data, CPF/CNPJ e autenticação (para o relatório) só são extraídos com
+    ``campos_complementares=True`` ou com o índice de duplicados ou o de busca
+    configurado.
+    """
+
+    def __init__(self, log=None, progresso=None, gerar_zip=True, pasta_destino=None, workers=1,
+                 gravar_arquivos=True, arquivo_cache=None, arquivo_manifesto=None, retomar=False,
+                 ocr=False, ocr_dpi=OCR_DPI_PADRAO, ocr_idioma=IDIOMA_OCR, ocr_workers=0, medir=False,
+                 paginas_por_janela=PAGINAS_POR_JANELA, posicional=False, otimizar_saida=OTIMIZACAO_SAIDA_PADRAO,
+                 arquivo_duplicados=None, acao_duplicados=ACAO_DUPLICADOS_PADRAO, arquivo_busca=None,
+                 campos_complementares=False):
+        if not gerar_zip and not gravar_arquivos:
+            raise ValueError("É preciso gerar o ZIP, gravar os arquivos divididos ou ambos")
+        if otimizar_saida not in _OPCOES_GRAVACAO:
+            raise ValueError(f"Otimização de saída desconhecida: {otimizar_saida} "
+                             f"(use {', '.join(OTIMIZACOES_SAIDA)})")
+        if acao_duplicados not in ACOES_DUPLICADOS:
+            raise ValueError(f"Ação para duplicados desconhecida: {acao_duplicados} "
+                             f"(use {', '.join(ACOES_DUPLICADOS)})")
+        self.log = log or print
+        self.progresso = progresso
+        self.gerar_zip = gerar_zip
+        self.gravar_arquivos = gravar_arquivos
+        self.arquivo_cache = arquivo_cache
+        self.arquivo_manifesto = arquivo_manifesto
+        self.retomar = retomar
+        self._manifesto = None
+        self.ocr = ocr
+        self.ocr_dpi = ocr_dpi
+        self.ocr_idioma = ocr_idioma
+        self.ocr_workers = max(1, ocr_workers or os.cpu_count() or 1)
+        self.pasta_destino = pasta_destino
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.paginas_por_janela = paginas_por_janela
+        self.posicional = posicional
+        self.otimizar_saida = otimizar_saida
+        # Some de vez na primeira falha por falta de suporte, sem repetir o aviso a cada comprovante
+        self._reduzir_fontes = otimizar_saida != 'nenhuma'
+        self.medicoes = Medicoes() if medir else None
+        self.bytes_gravados = {'arquivos': 0, 'zip': 0}
+        self.arquivo_duplicados = arquivo_duplicados
+        self.acao_duplicados = acao_duplicados
+        self.duplicados_count = 0
+        self.arquivo_busca = arquivo_busca
+        self.campos_complementares = bool(campos_complementares or arquivo_duplicados or arquivo_busca)
+        self.undefined_count = 0
+        self.erros = []
+        # SHA-256 do último PDF processado, devolvido pelos processos do pool para o manifesto
+        self._hash_pdf = None
+        # Nomes de saída reservados no lote em andamento, por pasta (None fora de ``process_pdfs``)
+        self._alocadores = None
+        # Início do lote em andamento, para o índice de duplicados confiar no que os outros processos registraram
+        self._inicio_lote = None
+
+    def log_message(self, message):
+        self.log(message)
+
+    def _informar_progresso(self, atual, total):
+        if self.progresso is not None:
+            self.progresso(atual, total)
+
+    def _medir(self, etapa, quantidade=1):
+        """Contexto que mede a etapa quando a medição está ligada"""
+        if self.medicoes is None:
+            return _SEM_MEDICAO
+        return self.medicoes.medir(etapa, quantidade)
+
+    def _incorporar_medicoes(self, resultado):
+        """Soma as medições devolvidas por um processo do pool"""
+        if self.medicoes is not None and resultado.get('medicoes'):
+            self.medicoes.incorporar(resultado['medicoes'])
+
+    def output_dir_for(self, pdf_path):
+        """Retorna a pasta onde ficam os comprovantes divididos de um PDF"""
+        base = self.pasta_destino or os.path.dirname(pdf_path)
+        return os.path.join(base, PASTA_SAIDA)
+
+    def _alocador_saida(self, output_dir):
+        return self._alocadores[os.path.normcase(os.path.abspath(output_dir))]
+
+    def _saida_livre(self, output_dir, nome_saida):
+        """Caminho que o comprovante receberia no lote, sem reservá-lo: ``nome_saida`` ou ``NOME_1``..."""
+        if self._alocadores is None:
+            return os.path.join(output_dir, nome_saida)
+        return os.path.join(output_dir, self._alocador_saida(output_dir).livre(nome_saida))
+
+    def _reservar_saida(self, output_dir, nome_saida):
+        """Reserva no lote o nome de um comprovante, para que outra entrada na mesma pasta não o sobrescreva"""
+        if self._alocadores is None:
+            return os.path.join(output_dir, nome_saida)
+        return os.path.join(output_dir, self._alocador_saida(output_dir).reservar(nome_saida))
+
+    def remove_numbering_from_filenames(self, output_dir, registros=None):
+        """Remove a numeração ("001_") do início dos nomes dos arquivos.
+
+        Nomes sem numeração, como os de uma execução anterior na mesma pasta,
+        ficam como estão. Os ``registros`` informados e o manifesto passam a
+        apontar para os novos nomes.
+        """
+        try:
+            files = os.listdir(output_dir)
+            alocador = AlocadorNomes(output_dir, files)
+            pares = []
+
+            for filename in files:
+                numeracao = _NUMERACAO.match(filename)
+                if numeracao and len(filename) > numeracao.end() and filename.lower().endswith('.pdf'):
+                    new_name = alocador.reservar(filename[numeracao.end():])
+                    pares.append((os.path.join(output_dir, filename), os.path.join(output_dir, new_name)))
+
+            with self._medir('renomear', len(pares)):
+                renomeados = aplicar_renomeacoes(pares, log=self.log_message)
+            self._mover_no_indice(renomeados)
+            self._renomear_no_manifesto(renomeados)
+
+            for registro in registros or ():
+                registro['arquivo_saida'] = renomeados.get(registro['arquivo_saida'], registro['arquivo_saida'])
+
+            self.log_message(f"✅ Numeração removida de {len(renomeados)} arquivos em: {output_dir}")
+            return True
+        except Exception as e:
+            self.log_message(f"❌ Erro ao remover numeração: {str(e)}")
+            return False
+
+    def _renomear_no_manifesto(self, renomeados):
+        """Leva para o manifesto os novos nomes das saídas, para que a retomada continue a encontrá-las"""
+        if not renomeados or not self.arquivo_manifesto:
+            return
+        try:
+            if self._manifesto is not None:
+                self._manifesto.renomear_saidas(renomeados)
+            elif os.path.exists(self.arquivo_manifesto):
+                with ManifestoLote(self.arquivo_manifesto) as manifesto:
+                    manifesto.renomear_saidas(renomeados)
+        except OSError as e:
+            self.log_message(f"⚠️ Erro ao gravar o manifesto: {str(e)}")
+
+    def report_path_for(self, output_dir, formato=FORMATO_PADRAO):
+        """Retorna o caminho do relatório dos comprovantes de uma pasta de saída"""
+        return os.path.join(os.path.dirname(output_dir), f"{ARQUIVO_RELATORIO}.{formato}")
+
+    def generate_report(self, registros, output_dir, formato=FORMATO_PADRAO, acrescentar=False):
+        """Gera o relatório (xlsx, csv ou parquet) a partir dos registros da divisão.
+
+        Com ``acrescentar=True`` (só CSV) os registros vão para o final do relatório existente.
+        """
+        if not registros:
+            self.log_message("Nenhum comprovante processado para gerar relatório")
+            return False
+        caminho = self.report_path_for(output_dir, formato)
+        try:
+            with self._medir('relatorio'):
+                gravar_relatorio(registros, caminho, formato, acrescentar)
+            self.log_message(f"✅ Relatório gerado em: {caminho} ({len(registros)} comprovante(s))")
+            return True
+        except Exception as e:
+            self.log_message(f"❌ Erro ao gerar relatório: {str(e)}")
+            return False
+
+    def rename_pdfs(self, pdf_paths, arquivo_desfazer=None):
+        """Renomeia os PDFs informados com base no beneficiário e valor da primeira página.
+
+        A primeira página de todos os arquivos é lida antes (em paralelo com
+        ``workers`` > 1), os nomes novos são reservados em memória e as
+        renomeações são aplicadas em lote. Cada uma fica registrada em
+        ``arquivo_desfazer`` (padrão: ``renomeacao_desfazer.jsonl`` na pasta do
+        primeiro PDF), que ``desfazer_renomeacoes`` usa para devolver os
+        nomes originais.
+
+        Com o índice de duplicados configurado, os arquivos iguais a outros já
+        registrados são marcados no log ou, com ``acao_duplicados='pular'``,
+        ficam com o nome atual.
+
+        Retorna a quantidade de arquivos renomeados.
+        """
+        self.log_message("\nIniciando renomeação de arquivos...")
+        self.duplicados_count = 0
+
+        caminhos = []
+        for pdf_path in pdf_paths:
+            pdf_path = corrigir_caminho(pdf_path)
+            if os.path.exists(pdf_path):
+                caminhos.append(pdf_path)
+            else:
+                self.log_message(f"Arquivo não encontrado: {os.path.basename(pdf_path)}")
+        if not caminhos:
+            return 0
+
+        alocadores = AlocadoresPorPasta()
+        pares = []
+        indice = self._abrir_indice_duplicados()
+        try:
+            for pdf_path, campos in zip(caminhos, self._extrair_primeiras_paginas(caminhos)):
+                if campos is None:
+                    continue
+                if indice is not None:
+                    duplicado = self._duplicado_de(indice, chaves_comprovante(campos, campos['paginas']), pdf_path)
+                    if duplicado is not None and self.acao_duplicados == 'pular':
+                        continue
+                dir_path = os.path.dirname(pdf_path)
+                ext = os.path.splitext(pdf_path)[1]
+                nome, valor = campos['nome'], campos['valor']
+                separador = " " if nome == BENEFICIARIO_INDEFINIDO and valor == VALOR_INDEFINIDO else "_"
+                new_name = alocadores[dir_path].reservar(nome_arquivo_saida(nome, valor, ext=ext), separador)
+                pares.append((pdf_path, os.path.join(dir_path, new_name)))
+        finally:
+            if indice is not None:
+                indice.close()
+
+        if arquivo_desfazer is None:
+            arquivo_desfazer = os.path.join(os.path.dirname(caminhos[0]), ARQUIVO_DESFAZER)
+        with self._medir('renomear', len(pares)):
+            renomeados = aplicar_renomeacoes(pares, arquivo_desfazer, self.log_message)
+        self._mover_no_indice(renomeados)
+
+        for origem, destino in renomeados.items():
+            self.log_message(f"Renomeado: {os.path.basename(origem)} -> {os.path.basename(destino)}")
+        if renomeados:
+            self.log_message(f"✅ {len(renomeados)} arquivo(s) renomeado(s); para desfazer use: {arquivo_desfazer}")
+        self._informar_duplicados()
+        return len(renomeados)
+
+    def desfazer_renomeacoes(self, arquivo_desfazer):
+        """Devolve os nomes originais aos arquivos registrados em ``arquivo_desfazer``.
+
+        Os índices de duplicados e de busca configurados voltam a apontar
+        para os nomes originais. Retorna quantos arquivos voltaram.
+        """
+        revertidos = desfazer_renomeacoes(arquivo_desfazer, self.log_message)
+        self._mover_no_indice(revertidos)
+        return len(revertidos)
+
+    def _extrair_primeiras_paginas(self, caminhos):
+        """Campos da primeira página de cada PDF, na ordem de ``caminhos`` (None se não deu para ler)"""
+        total_files = len(caminhos)
+        if self.workers == 1 or total_files == 1:
+            resultados = []
+            for pdf_path in caminhos:
+                resultados.append(self._extrair_primeira_pagina(pdf_path))
+                self._informar_progresso(len(resultados), total_files)
+            return resultados
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        processos = min(self.workers, total_files)
+        resultados = []
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            # map preserva a ordem; os lotes evitam uma ida e volta ao pool por arquivo
+            for resultado in pool.map(_extrair_primeira_pagina_isolado, caminhos,
+                                      [self.medicoes is not None] * total_files, [self.posicional] * total_files,
+                                      [self.arquivo_duplicados] * total_files,
+                                      chunksize=max(1, total_files // (processos * 4))):
+                for mensagem in resultado['mensagens']:
+                    self.log_message(mensagem)
+                self.undefined_count += resultado['indefinidos']
+                self._incorporar_medicoes(resultado)
+                resultados.append(resultado['campos'])
+                self._informar_progresso(len(resultados), total_files)
+        return resultados
+
+    def _extrair_primeira_pagina(self, pdf_path):
+        """Beneficiário, valor e campos de duplicidade da primeira página do PDF, com a quantidade de páginas.
+
+        Retorna None se o arquivo não pôde ser lido.
+        """
+        import fitz  # PyMuPDF
+
+        medicoes = self.medicoes
+        if medicoes is not None:
+            medicoes.arquivo = pdf_path
+        doc = None
+        try:
+            with self._medir('abrir_pdf'):
+                doc = fitz.open(pdf_path)
+
+            if len(doc) == 0:
+                self.log_message(f"Arquivo vazio: {os.path.basename(pdf_path)}")
+                return None
+
+            with self._medir('texto_pagina'):
+                pagina = preparar_texto(*self._ler_pagina(doc.load_page(0)))
+
+            if pagina is None:
+                nome = BENEFICIARIO_INDEFINIDO
+                valor = VALOR_INDEFINIDO
+            else:
+                with self._medir('extracao'):
+                    nome = extrair_beneficiario(pagina, medicoes)
+                    valor = extrair_valor(pagina, self.log_message, medicoes)
+
+                if "INDEFINIDO" in nome or "INDEFINIDO" in valor:
+                    self.undefined_count += 1
+            if medicoes is not None:
+                medicoes.registrar_pagina(1)
+            campos = {'nome': nome, 'valor': valor, 'paginas': len(doc)}
+            if self.arquivo_duplicados:
+                campos.update(self._campos_complementares(pagina, nome))
+            return campos
+
+        except Exception as e:
+            self.log_message(f"Erro ao processar {os.path.basename(pdf_path)}: {str(e)}")
+            return None
+        finally:
+            # O arquivo precisa estar fechado para ser renomeado
+            if doc is not None:
+                try:
+                    doc.close()
+                except:
+                    pass
+            if medicoes is not None:
+                medicoes.arquivo = None
+
+    def merge_pdfs(self, pdf_paths, output_path, motor=MOTOR_MESCLAGEM_PADRAO):
+        """Mescla os PDFs informados em um único arquivo.
+
+        Com o motor 'pymupdf' os arquivos são gravados em etapas de
+        ``ARQUIVOS_POR_ETAPA_MESCLAGEM`` (a memória não cresce com a quantidade
+        de arquivos) e, ao final, fontes e imagens idênticas vindas de
+        arquivos diferentes são gravadas uma única vez, se forem no máximo
+        ``ARQUIVOS_MAXIMOS_DEDUPLICACAO`` arquivos. 'pypdf2' é o
+        ``PdfMerger``, que monta o resultado inteiro em memória.
+
+        Retorna a quantidade de arquivos mesclados (0 se nenhum era válido).
+        """
+        if motor not in MOTORES_MESCLAGEM:
+            raise ValueError(f"Motor de mesclagem desconhecido: {motor} (use {', '.join(MOTORES_MESCLAGEM)})")
+        if motor == 'pypdf2':
+            mesclados = self._mesclar_pypdf2(pdf_paths, output_path)
+        else:
+            mesclados = self._mesclar_pymupdf(pdf_paths, output_path)
+        if mesclados:
+            tamanho = os.path.getsize(output_path) / (1024 * 1024)
+            self.log_message(f"✅ Arquivos mesclados com sucesso em: {output_path} ({tamanho:.1f} MB)")
+        return mesclados
+
+    def _mesclar_pymupdf(self, pdf_paths, output_path):
+        import fitz  # PyMuPDF
+
+        # As etapas vão sendo acrescentadas a este arquivo, reaberto depois de cada uma
+        parcial = output_path + ".parcial"
+        saida = fitz.open()
+        gravado = False
+        mesclados = 0
+        na_etapa = 0
+        try:
+            for pdf_path in pdf_paths:
+                if not os.path.exists(pdf_path):
+                    self.log_message(f"Arquivo não encontrado: {os.path.basename(pdf_path)}")
+                    continue
+                try:
+                    with self._medir('mesclagem_leitura'), fitz.open(pdf_path) as origem:
+                        saida.insert_pdf(origem)
+                except Exception as e:
+                    self.log_message(f"Erro ao adicionar {os.path.basename(pdf_path)}: {str(e)}")
+                    continue
+                mesclados += 1
+                na_etapa += 1
+                self.log_message(f"Adicionado para mesclagem: {os.path.basename(pdf_path)}")
+                self._informar_progresso(mesclados, len(pdf_paths))
+
+                if na_etapa >= ARQUIVOS_POR_ETAPA_MESCLAGEM:
+                    with self._medir('mesclagem_gravacao'):
+                        if gravado:
+                            saida.saveIncr()
+                        else:
+                            saida.save(parcial)
+                            gravado = True
+                        # Reaberto, o documento lê do disco só o que precisar, liberando a etapa gravada
+                        saida.close()
+                        saida = fitz.open(parcial)
+                    na_etapa = 0
+
+            if not mesclados:
+                self.log_message("Nenhum arquivo válido foi selecionado para mesclagem")
+                return 0
+
+            if mesclados <= ARQUIVOS_MAXIMOS_DEDUPLICACAO:
+                # garbage=4 junta objetos idênticos (fontes e logotipos que cada comprovante traz)
+                opcoes = {'garbage': 4, 'deflate': True}
+            else:
+                self.log_message(f"⚠️ Mais de {ARQUIVOS_MAXIMOS_DEDUPLICACAO} arquivos: fontes e imagens repetidas "
+                                 "não serão unificadas, para a gravação não demorar demais")
+                opcoes = {'deflate': True}
+            with self._medir('mesclagem_gravacao'):
+                saida.save(output_path, **opcoes)
+            return mesclados
+        finally:
+            saida.close()
+            if gravado:
+                os.remove(parcial)
+
+    def _mesclar_pypdf2(self, pdf_paths, output_path):
+        from PyPDF2 import PdfMerger
+
+        merger = PdfMerger()
+        try:
+            file_paths = []
+            for pdf_path in pdf_paths:
+                try:
+                    if os.path.exists(pdf_path):
+                        with self._medir('mesclagem_leitura'), open(pdf_path, 'rb') as f:
+                            merger.append(f)
+                        file_paths.append(pdf_path)
+                        self.log_message(f"Adicionado para mesclagem: {os.path.basename(pdf_path)}")
+                        self._informar_progresso(len(file_paths), len(pdf_paths))
+                    else:
+                        self.log_message(f"Arquivo não encontrado: {os.path.basename(pdf_path)}")
+                except Exception as e:
+                    self.log_message(f"Erro ao adicionar {os.path.basename(pdf_path)}: {str(e)}")
+
+            if not file_paths:
+                self.log_message("Nenhum arquivo válido foi selecionado para mesclagem")
+                return 0
+
+            with self._medir('mesclagem_gravacao'), open(output_path, "wb") as f:
+                merger.write(f)
+            return len(file_paths)
+        finally:
+            merger.close()
+
+    def _opcoes_worker(self):
+        """Opções repassadas aos processos do pool para recriar o processador"""
+        return {
+            'gerar_zip': self.gerar_zip,
+            'pasta_destino': self.pasta_destino,
+            'gravar_arquivos': self.gravar_arquivos,
+            'arquivo_cache': self.arquivo_cache,
+            'ocr': self.ocr,
+            'ocr_dpi': self.ocr_dpi,
+            'ocr_idioma': self.ocr_idioma,
+            # Os arquivos já estão distribuídos entre processos; o OCR de cada um roda em série
+            'ocr_workers': 1,
+            'medir': self.medicoes is not None,
+            'paginas_por_janela': self.paginas_por_janela,
+            'posicional': self.posicional,
+            'otimizar_saida': self.otimizar_saida,
+            'arquivo_duplicados': self.arquivo_duplicados,
+            'acao_duplicados': self.acao_duplicados,
+            'arquivo_busca': self.arquivo_busca,
+            'campos_complementares': self.campos_complementares,
+        }
+
+    def _opcoes_manifesto(self):
+        """Opções que mudam as saídas; um PDF só é pulado se foi concluído com as mesmas"""
+        return {
+            'gerar_zip': self.gerar_zip,
+            'gravar_arquivos': self.gravar_arquivos,
+            'pasta_destino': self.pasta_destino,
+            'otimizar_saida': self.otimizar_saida,
+            # Só pular duplicados muda quais comprovantes são gravados
+            'pular_duplicados': bool(self.arquivo_duplicados) and self.acao_duplicados == 'pular',
+        }
+
+    @contextmanager
+    def manifesto_aberto(self):
+        """Mantém o manifesto aberto entre várias chamadas de ``process_pdfs``, devolvendo-o (None sem manifesto)"""
+        if self._manifesto is not None or not self.arquivo_manifesto:
+            yield self._manifesto
+            return
+        self._manifesto = ManifestoLote(self.arquivo_manifesto, retomar=self.retomar)
+        try:
+            yield self._manifesto
+        finally:
+            self._manifesto.close()
+            self._manifesto = None
+
+    def ja_concluido(self, pdf_path):
+        """Registros de um PDF já concluído segundo o manifesto, ou None"""
+        if self._manifesto is None:
+            return None
+        try:
+            return self._manifesto.concluido(corrigir_caminho(pdf_path), self._opcoes_manifesto())
+        except OSError:
+            return None
+
+    def process_pdfs(self, pdf_paths):
+        """Processa todos os PDFs informados e retorna os registros de extração.
+
+        Com ``workers`` > 1 os arquivos são distribuídos entre processos. Um erro
+        em um arquivo é registrado em ``self.erros`` sem interromper os demais.
+        A numeração recomeça em cada PDF; quando duas entradas geram o mesmo
+        nome na mesma pasta, a posterior na lista recebe ``NOME_1``, ``NOME_2``...,
+        com qualquer quantidade de processos.
+        """
+        self.log_message("Iniciando processamento...")
+        self.undefined_count = 0
+        self.erros = []
+        self.bytes_gravados = {'arquivos': 0, 'zip': 0}
+        self.duplicados_count = 0
+
+        with self.manifesto_aberto():
+            total_files = len(pdf_paths)
+            resultados = [[] for _ in pdf_paths]
+            pendentes = []
+            for indice, pdf_path in enumerate(pdf_paths):
+                registros = self.ja_concluido(pdf_path)
+                if registros is None:
+                    pendentes.append(indice)
+                else:
+                    resultados[indice] = registros
+
+            processed_files = total_files - len(pendentes)
+            if processed_files:
+                self.log_message(f"⏭️ {processed_files} arquivo(s) já concluído(s) no manifesto foram pulados")
+                self._informar_progresso(processed_files, total_files)
+
+            # As saídas já concluídas no manifesto continuam ocupando seus nomes
+            self._alocadores = AlocadoresPorPasta(listar=False)
+            self._inicio_lote = time.time()
+            if self._manifesto is not None:
+                reprocessados = [corrigir_caminho(pdf_paths[indice]) for indice in pendentes]
+                for registro in self._manifesto.registros_concluidos(exceto=reprocessados):
+                    self._reservar_saida(*os.path.split(registro['arquivo_saida']))
+            try:
+                if self.workers > 1 and len(pendentes) > 1:
+                    self._process_pdfs_paralelo(pdf_paths, pendentes, resultados)
+                else:
+                    for indice in pendentes:
+                        try:
+                            resultados[indice] = self.process_single_pdf(pdf_paths[indice])
+                        except Exception as e:
+                            self.erros.append((pdf_paths[indice], str(e)))
+                        processed_files += 1
+                        self._informar_progresso(processed_files, total_files)
+            finally:
+                self._alocadores = None
+                self._inicio_lote = None
+
+        # Registros sempre na ordem de entrada, independente da ordem de conclusão
+        registros = [registro for parcial in resultados for registro in parcial]
+
+        self.log_message(f"\nRESUMO: {self.undefined_count} documento(s) com beneficiário/valor indefinido")
+        self._informar_duplicados()
+        if self.erros:
+            self.log_message(f"❌ {len(self.erros)} arquivo(s) com erro: "
+                             + ", ".join(os.path.basename(p) for p, _ in self.erros))
+        self._informar_bytes_gravados()
+        return registros
+
+    def _informar_duplicados(self):
+        if self.duplicados_count:
+            situacao = "pulado(s)" if self.acao_duplicados == 'pular' else "marcado(s)"
+            self.log_message(f"⚠️ {self.duplicados_count} comprovante(s) duplicado(s) de outros já registrados, "
+                             f"{situacao}")
+
+    def _informar_bytes_gravados(self):
+        partes = []
+        if self.bytes_gravados['arquivos']:
+            partes.append(f"{self.bytes_gravados['arquivos'] / 1024 ** 2:.1f} MB em arquivos divididos")
+        if self.bytes_gravados['zip']:
+            partes.append(f"{self.bytes_gravados['zip'] / 1024 ** 2:.1f} MB em ZIP")
+        if partes:
+            self.log_message(f"📦 Gravados nesta execução: {', '.join(partes)}")
+
+    def _process_pdfs_paralelo(self, pdf_paths, pendentes, resultados):
+        """Distribui os PDFs pendentes entre processos, guardando os registros na posição de cada um.
+
+        Cada processo grava numa pasta provisória própria; os comprovantes vão
+        para a pasta de saída na ordem de entrada, com os nomes reservados no
+        lote, então o resultado não depende de qual processo terminou antes.
+        """
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        total_files = len(pdf_paths)
+        processed_files = total_files - len(pendentes)
+        opcoes = self._opcoes_worker()
+        provisorias = {indice: self._pasta_provisoria(pdf_paths[indice], indice) for indice in pendentes}
+        prontos = {}
+        proximo = 0
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(pendentes))) as pool:
+            futuros = {
+                pool.submit(_processar_arquivo_isolado, pdf_paths[indice], opcoes, provisorias[indice],
+                            self._inicio_lote): indice
+                for indice in pendentes
+            }
+            for futuro in as_completed(futuros):
+                indice = futuros[futuro]
+                pdf_path = pdf_paths[indice]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    # Falha do próprio processo (ex.: memória), não do PDF
+                    resultado = {'registros': [], 'mensagens': [], 'indefinidos': 0, 'erro': str(e),
+                                 'bytes_gravados': {}, 'duplicados': 0, 'hash': None}
+                    self.log_message(f"❌ Erro ao processar {os.path.basename(pdf_path)}: {str(e)}")
+
+                for mensagem in resultado['mensagens']:
+                    self.log_message(mensagem)
+                self._incorporar_medicoes(resultado)
+                self.undefined_count += resultado['indefinidos']
+                self.duplicados_count += resultado['duplicados']
+                for destino, quantidade in resultado['bytes_gravados'].items():
+                    self.bytes_gravados[destino] += quantidade
+                if resultado['erro'] is not None:
+                    self.erros.append((pdf_path, resultado['erro']))
+                prontos[indice] = resultado
+
+                # Só sai da pasta provisória quem tem todos os anteriores da lista já na pasta de saída
+                while proximo < len(pendentes) and pendentes[proximo] in prontos:
+                    indice = pendentes[proximo]
+                    resultado = prontos.pop(indice)
+                    resultados[indice] = self._trazer_da_pasta_provisoria(resultado['registros'], provisorias[indice])
+                    self._registrar_no_manifesto(pdf_paths[indice], resultados[indice], resultado['erro'],
+                                                 resultado['hash'])
+                    proximo += 1
+                processed_files += 1
+                self._informar_progresso(processed_files, total_files)
+
+    def _pasta_provisoria(self, pdf_path, indice):
+        """Pasta, dentro da pasta de saída, onde um processo do pool grava os comprovantes de um PDF"""
+        return os.path.join(self.output_dir_for(corrigir_caminho(pdf_path)), f".parcial_{indice}")
+
+    def _trazer_da_pasta_provisoria(self, registros, pasta_provisoria):
+        """Move para a pasta de saída, com os nomes reservados no lote, os comprovantes gravados por um processo"""
+        output_dir = os.path.dirname(pasta_provisoria)
+        movidos = {}
+        completo = True
+        for registro in registros:
+            provisorio = registro['arquivo_saida']
+            destino = self._reservar_saida(output_dir, os.path.basename(provisorio))
+            if self.gravar_arquivos:
+                try:
+                    # Como na gravação direta, substitui o arquivo de uma execução anterior com o mesmo nome
+                    os.replace(provisorio, destino)
+                except OSError as e:
+                    self.log_message(f"❌ Erro ao mover {os.path.basename(provisorio)}: {str(e)}")
+                    completo = False
+                    continue
+            registro['arquivo_saida'] = destino
+            movidos[provisorio] = destino
+        self._mover_no_indice(movidos)
+        if completo:
+            shutil.rmtree(pasta_provisoria, ignore_errors=True)
+        return registros
+
+    def _registrar_no_manifesto(self, pdf_path, registros, erro, hash_pdf=None):
+        """Registra no manifesto um PDF processado por um processo do pool, com o SHA-256 que ele já calculou"""
+        if self._manifesto is None:
+            return
+        pdf_path = corrigir_caminho(pdf_path)
+        try:
+            if erro is not None:
+                self._manifesto.falhar(pdf_path, erro)
+            else:
+                self._manifesto.iniciar(pdf_path, self._opcoes_manifesto(), hash_pdf)
+                self._manifesto.concluir(pdf_path, registros)
+        except OSError as e:
+            self.log_message(f"⚠️ Erro ao gravar o manifesto: {str(e)}")
+
+    def _ler_pagina(self, page):
+        """Texto da página e, no modo posicional, as palavras com coordenadas (da mesma extração)"""
+        if not self.posicional:
+            return page.get_text(), None
+        textpage = page.get_textpage()
+        return page.get_text(textpage=textpage), page.get_text("words", textpage=textpage)
+
+    def _analisar_texto(self, numero, texto, palavras=None):
+        """Extrai beneficiário, valor e marcadores de agrupamento do texto de uma página"""
+        medicoes = self.medicoes
+        if medicoes is not None:
+            inicio = time.perf_counter()
+        try:
+            # Normaliza o texto uma única vez para os dois extratores
+            pagina = preparar_texto(texto, palavras)
+
+            if pagina is None:
+                nome = BENEFICIARIO_INDEFINIDO
+                valor = VALOR_INDEFINIDO
+                folha = False
+                layout = LAYOUT_SEM_TEXTO
+                self.undefined_count += 1
+            else:
+                nome = extrair_beneficiario(pagina, medicoes)
+                valor = extrair_valor(pagina, self.log_message, medicoes)
+                folha = (nome == "FOLHA")
+                layout = pagina.layout
+
+                if "INDEFINIDO" in nome or "INDEFINIDO" in valor:
+                    self.undefined_count += 1
+
+            resultado = {
+                'numero': numero,
+                'nome': nome,
+                'valor': valor,
+                'layout': layout,
+                'folha': folha,
+                # Página de continuação de FOLHA (lista de CPFs); o texto não é guardado
+                'continuacao': pagina is not None and contem_4_cpfs(pagina),
+            }
+            resultado.update(self._campos_complementares(pagina, nome))
+            if self.arquivo_busca:
+                # Só para o índice de busca; sai do registro da página assim que o comprovante é indexado
+                resultado['texto'] = texto or ""
+            if medicoes is not None:
+                medicoes.registrar('extracao', time.perf_counter() - inicio, pagina=True)
+                medicoes.registrar_pagina(numero, layout=layout)
+            return resultado
+
+        except Exception as e:
+            self.log_message(f"Erro ao analisar página {numero}: {str(e)}")
+            self.undefined_count += 1
+            return {
+                'numero': numero,
+                'nome': BENEFICIARIO_INDEFINIDO,
+                'valor': VALOR_INDEFINIDO,
+                'layout': LAYOUT_SEM_TEXTO,
+                'folha': False,
+                'continuacao': False,
+                **_SEM_CAMPOS_COMPLEMENTARES,
+            }
+
+    def _campos_complementares(self, pagina, nome):
+        """Data, CPF/CNPJ do beneficiário, autenticação e assinatura do texto de uma página.
+
+        Vão para o relatório e para os índices de duplicados e de busca; data e
+        documento saem da mesma varredura que conta os CPFs da página. Sem
+        nenhum desses destinos ficam vazios, sem custo por página.
+        """
+        if pagina is None or not self.campos_complementares:
+            return _SEM_CAMPOS_COMPLEMENTARES
+        return {
+            'data': extrair_data(pagina),
+            'documento': extrair_documento(pagina, nome),
+            'autenticacao': extrair_autenticacao(pagina),
+            'assinatura': assinatura_texto(pagina.texto),
+        }
+
+    def _analisar_paginas(self, doc, inicio, fim, textos=None):
+        """Analisa as páginas [inicio, fim); com ``textos`` (lista), guarda também o texto de cada uma"""
+        paginas_analisadas = []
+        medicoes = self.medicoes
+        for i in range(inicio, fim):
+            if medicoes is not None:
+                inicio_texto = time.perf_counter()
+            try:
+                texto, palavras = self._ler_pagina(doc.load_page(i))
+            except Exception as e:
+                self.log_message(f"Erro ao analisar página {i+1}: {str(e)}")
+                texto, palavras = None, None
+            if medicoes is not None:
+                medicoes.registrar('texto_pagina', time.perf_counter() - inicio_texto, pagina=True)
+            if textos is not None:
+                textos.append(texto)
+            paginas_analisadas.append(self._analisar_texto(i + 1, texto, palavras))
+        return paginas_analisadas
+
+    def _analisar_paginas_paralelo(self, pdf_path, total_pages, textos=None):
+        """Divide as páginas em intervalos analisados por processos que abrem o PDF por conta própria"""
+        from concurrent.futures import ProcessPoolExecutor
+
+        tamanho = max(PAGINAS_MINIMAS_POR_LOTE, -(-total_pages // (self.workers * 4)))
+        intervalos = [(inicio, min(inicio + tamanho, total_pages))
+                      for inicio in range(0, total_pages, tamanho)]
+        self.log_message(f"Analisando {total_pages} páginas em {len(intervalos)} lotes paralelos")
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(intervalos))) as pool:
+            # map preserva a ordem dos intervalos, mantendo as páginas em ordem
+            resultados = pool.map(_analisar_intervalo_isolado,
+                                  [pdf_path] * len(intervalos), *zip(*intervalos),
+                                  [textos is not None] * len(intervalos),
+                                  [self.medicoes is not None] * len(intervalos),
+                                  [self.posicional] * len(intervalos),
+                                  [self.arquivo_busca] * len(intervalos),
+                                  [self.campos_complementares] * len(intervalos))
+            paginas_analisadas = []
+            for resultado in resultados:
+                for mensagem in resultado['mensagens']:
+                    self.log_message(mensagem)
+                self._incorporar_medicoes(resultado)
+                self.undefined_count += resultado['indefinidos']
+                paginas_analisadas.extend(resultado['paginas'])
+                if textos is not None:
+                    textos.extend(resultado['textos'])
+
+        return paginas_analisadas
+
+    def _abrir_cache(self):
+        """Abre o cache de páginas, se configurado; um cache com problema não impede o processamento"""
+        if not self.arquivo_cache:
+            return None
+        try:
+            return CachePaginas(self.arquivo_cache, posicional=self.posicional,
+                                campos_complementares=self.campos_complementares)
+        except (sqlite3.Error, OSError) as e:
+            self.log_message(f"⚠️ Cache de páginas indisponível: {str(e)}")
+            return None
+
+    def _abrir_indice_duplicados(self):
+        """Abre o índice de duplicados, se configurado; um índice com problema não impede o processamento"""
+        if not self.arquivo_duplicados:
+            return None
+        try:
+            return IndiceDuplicados(self.arquivo_duplicados, desde=self._inicio_lote)
+        except (sqlite3.Error, OSError) as e:
+            self.log_message(f"⚠️ Índice de duplicados indisponível: {str(e)}")
+            return None
+
+    def _duplicado_de(self, indice, chaves, local, arquivo=None, origem=None, pagina_inicial=1):
+        """Registra o comprovante no índice; retorna o local do comprovante igual já registrado, ou None"""
+        try:
+            with self._medir('duplicados'):
+                duplicado = indice.registrar(chaves, local, arquivo, origem, pagina_inicial)
+        except sqlite3.Error as e:
+            self.log_message(f"⚠️ Erro ao consultar o índice de duplicados: {str(e)}")
+            return None
+        if duplicado is not None:
+            self.duplicados_count += 1
+            pulado = " (pulado)" if self.acao_duplicados == 'pular' else ""
+            self.log_message(f"⚠️ {os.path.basename(local)} é duplicado de {duplicado}{pulado}")
+        return duplicado
+
+    def _mover_no_indice(self, renomeados):
+        """Leva para os índices de duplicados e de busca os novos nomes dos arquivos renomeados"""
+        if not renomeados:
+            return
+        for indice, descricao in ((self._abrir_indice_duplicados(), "de duplicados"),
+                                  (self._abrir_indice_busca(), "de busca")):
+            if indice is None:
+                continue
+            try:
+                indice.mover(renomeados.items())
+            except sqlite3.Error as e:
+                self.log_message(f"⚠️ Erro ao atualizar o índice {descricao}: {str(e)}")
+            finally:
+                self._fechar_indice(indice)
+
+    def _abrir_indice_busca(self):
+        """Abre o índice de busca, se configurado; um índice com problema não impede o processamento"""
+        if not self.arquivo_busca:
+            return None
+        try:
+            return IndiceBusca(self.arquivo_busca)
+        except (sqlite3.Error, OSError) as e:
+            self.log_message(f"⚠️ Índice de busca indisponível: {str(e)}")
+            return None
+
+    def _fechar_indice(self, indice):
+        try:
+            indice.close()
+        except sqlite3.Error as e:
+            self.log_message(f"⚠️ Erro ao gravar o índice: {str(e)}")
+
+    def _texto_comprovante(self, doc, inicio, fim, textos):
+        """Texto das páginas [inicio, fim) para o índice de busca, tirado de ``textos`` (número -> texto).
+
+        Páginas que vieram do cache sem o texto são lidas de novo do PDF.
+        """
+        partes = []
+        for i in range(inicio, fim):
+            texto = textos.pop(i + 1, None)
+            if texto is None:
+                try:
+                    texto = doc.load_page(i).get_text()
+                except Exception:
+                    texto = ""
+            partes.append(texto)
+        return "\n".join(partes)
+
+    def _indexar(self, busca, registro, texto):
+        try:
+            with self._medir('indice_busca'):
+                busca.registrar(registro, texto)
+        except sqlite3.Error as e:
+            self.log_message(f"⚠️ Erro ao gravar no índice de busca: {str(e)}")
+
+    def _analisar_documento(self, pdf_path, doc, total_pages, hash_pdf):
+        """Analisa todas as páginas do PDF, reaproveitando o cache quando o arquivo não mudou"""
+        cache = self._abrir_cache()
+        try:
+            paginas_analisadas, textos = None, None
+            if cache is not None:
+                try:
+                    with self._medir('cache_leitura'):
+                        paginas_analisadas, textos = cache.carregar(hash_pdf, total_pages)
+                except sqlite3.Error as e:
+                    self.log_message(f"⚠️ Erro ao ler o cache de páginas: {str(e)}")
+
+            if paginas_analisadas is not None:
+                self.log_message(f"♻️ {total_pages} página(s) recuperada(s) do cache")
+                self.undefined_count += sum(
+                    1 for p in paginas_analisadas if "INDEFINIDO" in p['nome'] or "INDEFINIDO" in p['valor'])
+                if self.arquivo_busca:
+                    for pagina, texto in zip(paginas_analisadas, textos):
+                        pagina['texto'] = texto or ""
+                alterado = False
+            elif textos is not None and not self.posicional:
+                # As regras mudaram, mas o texto do arquivo continua valendo
+                self.log_message("♻️ Texto das páginas recuperado do cache; reaplicando as regras")
+                paginas_analisadas = [self._analisar_texto(i + 1, texto) for i, texto in enumerate(textos)]
+                alterado = True
+            else:
+                textos = [] if cache is not None else None
+                if self.workers > 1 and total_pages >= PAGINAS_MINIMAS_PARALELO:
+                    with self._medir('analise_paralela'):
+                        paginas_analisadas = self._analisar_paginas_paralelo(pdf_path, total_pages, textos)
+                else:
+                    paginas_analisadas = self._analisar_paginas(doc, 0, total_pages, textos)
+                alterado = True
+
+            if self.ocr:
+                with self._medir('ocr'):
+                    alterado = self._aplicar_ocr(pdf_path, paginas_analisadas, textos) or alterado
+
+            # Páginas cujo texto não pôde ser lido ficam fora do cache para nova tentativa
+            if cache is not None and alterado and None not in textos:
+                self._salvar_cache(cache, hash_pdf, paginas_analisadas, textos)
+            return paginas_analisadas
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def _analisar_em_janelas(self, pdf_path, doc, total_pages, hash_pdf):
+        """Gera as páginas analisadas em ordem, janela a janela, sem guardar o texto do documento inteiro.
+
+        Do cache só é aproveitado o arquivo completo na versão atual das regras;
+        as janelas analisadas são gravadas nele à medida que terminam.
+        """
+        cache = self._abrir_cache()
+        try:
+            if cache is not None:
+                paginas_analisadas = None
+                try:
+                    with self._medir('cache_leitura'):
+                        paginas_analisadas, _ = cache.carregar(hash_pdf, total_pages, com_textos=False)
+                except sqlite3.Error as e:
+                    self.log_message(f"⚠️ Erro ao ler o cache de páginas: {str(e)}")
+                if paginas_analisadas is not None:
+                    self.log_message(f"♻️ {total_pages} página(s) recuperada(s) do cache")
+                    self.undefined_count += sum(
+                        1 for p in paginas_analisadas if "INDEFINIDO" in p['nome'] or "INDEFINIDO" in p['valor'])
+                    yield from paginas_analisadas
+                    return
+
+            guardar_textos = cache is not None
+            self.log_message(f"Analisando {total_pages} páginas em janelas de {self.paginas_por_janela}")
+            for inicio, paginas_analisadas, textos in self._janelas(pdf_path, doc, total_pages, guardar_textos):
+                if self.ocr:
+                    with self._medir('ocr'):
+                        self._aplicar_ocr(pdf_path, paginas_analisadas, textos, inicio)
+                if guardar_textos and None not in textos:
+                    try:
+                        with self._medir('cache_gravacao'):
+                            cache.salvar_parte(hash_pdf, total_pages, paginas_analisadas, textos)
+                    except sqlite3.Error as e:
+                        self.log_message(f"⚠️ Erro ao gravar o cache de páginas: {str(e)}")
+                yield from paginas_analisadas
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def _janelas(self, pdf_path, doc, total_pages, guardar_textos):
+        """Gera ``(inicio, paginas analisadas, textos)`` de cada janela, em ordem.
+
+        Com vários processos, no máximo duas janelas por processo ficam
+        analisadas à frente da gravação, para a memória não crescer com o PDF.
+        """
+        intervalos = [(inicio, min(inicio + self.paginas_por_janela, total_pages))
+                      for inicio in range(0, total_pages, self.paginas_por_janela)]
+        if self.workers == 1 or len(intervalos) == 1:
+            for inicio, fim in intervalos:
+                textos = [] if guardar_textos else None
+                yield inicio, self._analisar_paginas(doc, inicio, fim, textos), textos
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        processos = min(self.workers, len(intervalos))
+        medir = self.medicoes is not None
+        restantes = iter(intervalos)
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            def enviar(quantidade):
+                for inicio, fim in itertools.islice(restantes, quantidade):
+                    futuro = pool.submit(_analisar_intervalo_isolado, pdf_path, inicio, fim, guardar_textos, medir,
+                                         self.posicional, self.arquivo_busca, self.campos_complementares)
+                    em_andamento.append((inicio, futuro))
+
+            em_andamento = deque()
+            enviar(processos * 2)
+            while em_andamento:
+                inicio, futuro = em_andamento.popleft()
+                resultado = futuro.result()
+                enviar(1)
+                for mensagem in resultado['mensagens']:
+                    self.log_message(mensagem)
+                self.undefined_count += resultado['indefinidos']
+                self._incorporar_medicoes(resultado)
+                yield inicio, resultado['paginas'], resultado['textos']
+
+    def _aplicar_ocr(self, pdf_path, paginas_analisadas, textos, inicio=0):
+        """Reanalisa as páginas sem texto com o texto do OCR; retorna se alguma mudou.
+
+        ``paginas_analisadas`` começa na página de índice ``inicio`` do PDF.
+        """
+        indices = [inicio + i for i, p in enumerate(paginas_analisadas) if p['layout'] == LAYOUT_SEM_TEXTO]
+        if not indices:
+            return False
+        if not ocr_disponivel():
+            self.log_message("⚠️ OCR indisponível: instale o Tesseract e o pacote pytesseract "
+                             "para ler páginas digitalizadas")
+            return False
+
+        self.log_message(f"🔎 OCR em {len(indices)} página(s) sem texto")
+        reconhecidos, do_cache = self._reconhecer(pdf_path, indices)
+        if do_cache:
+            self.log_message(f"♻️ {do_cache} página(s) recuperada(s) do cache de OCR")
+
+        alterado = False
+        for indice, texto in reconhecidos.items():
+            if not texto.strip():
+                continue
+            # A página já tinha sido contada como indefinida quando estava sem texto
+            self.undefined_count -= 1
+            paginas_analisadas[indice - inicio] = self._analisar_texto(indice + 1, texto)
+            if textos is not None:
+                textos[indice - inicio] = texto
+            alterado = True
+        return alterado
+
+    def _reconhecer(self, pdf_path, indices):
+        """Distribui o OCR das páginas entre processos; retorna ``(textos por índice, quantas do cache)``"""
+        from concurrent.futures import ProcessPoolExecutor
+
+        processos = min(self.ocr_workers, len(indices))
+        if processos == 1:
+            return reconhecer_paginas(pdf_path, indices, self.ocr_dpi, self.ocr_idioma,
+                                      self.arquivo_cache, self.log_message)
+
+        # Páginas intercaladas equilibram lotes com trechos mais e menos pesados
+        lotes = [indices[k::processos] for k in range(processos)]
+        reconhecidos = {}
+        do_cache = 0
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            resultados = pool.map(_reconhecer_isolado, [pdf_path] * processos, lotes,
+                                  [self.ocr_dpi] * processos, [self.ocr_idioma] * processos,
+                                  [self.arquivo_cache] * processos)
+            for resultado in resultados:
+                for mensagem in resultado['mensagens']:
+                    self.log_message(mensagem)
+                reconhecidos.update(resultado['textos'])
+                do_cache += resultado['do_cache']
+        return reconhecidos, do_cache
+
+    def _salvar_cache(self, cache, hash_pdf, paginas_analisadas, textos):
+        try:
+            with self._medir('cache_gravacao'):
+                cache.salvar(hash_pdf, paginas_analisadas, textos)
+        except sqlite3.Error as e:
+            self.log_message(f"⚠️ Erro ao gravar o cache de páginas: {str(e)}")
+
+    def zip_for(self, pdf_path):
+        """Retorna o caminho do ZIP com os comprovantes divididos de um PDF"""
+        output_dir = self.output_dir_for(pdf_path)
+        nome = os.path.splitext(os.path.basename(pdf_path))[0]
+        return os.path.join(os.path.dirname(output_dir), f"comprovantes_divididos_{nome}.zip")
+
+    def process_single_pdf(self, pdf_path, pasta_saida=None):
+        """Processa um único arquivo PDF com lógica de agrupamento consistente.
+
+        Retorna um registro por arquivo gerado, com páginas de origem,
+        beneficiário, valor, layout da primeira página, caminho de saída e ZIP
+        (``None`` sem ZIP). Cada comprovante é serializado uma única vez em
+        memória e os mesmos bytes vão para a pasta e/ou para o ZIP.
+        ``pasta_saida`` substitui a pasta dos arquivos divididos (o ZIP continua
+        no lugar de sempre).
+        """
+        import zipfile
+        import fitz  # PyMuPDF
+
+        pdf_path = corrigir_caminho(pdf_path)
+        if not pdf_path:
+            return []
+
+        doc = None
+        indice = None
+        busca = None
+        paginas_analisadas = None
+        manifesto = self._manifesto
+        if self.medicoes is not None:
+            self.medicoes.arquivo = pdf_path
+        try:
+            if not os.path.exists(pdf_path):
+                raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+
+            self.log_message(f"\nProcessando arquivo: {os.path.basename(pdf_path)}")
+
+            # Lido uma vez só: o mesmo SHA-256 serve ao cache de páginas e ao manifesto
+            hash_pdf = None
+            if self.arquivo_cache:
+                with self._medir('hash_arquivo'):
+                    hash_pdf = hash_arquivo(pdf_path)
+            self._hash_pdf = hash_pdf
+
+            gravadas = {}
+            if manifesto is not None:
+                gravadas = manifesto.saidas_gravadas(pdf_path, self._opcoes_manifesto(), hash_pdf)
+                if gravadas:
+                    self.log_message(f"⏭️ Retomando: {len(gravadas)} comprovante(s) já gravado(s) serão mantidos")
+                else:
+                    with self._medir('manifesto'):
+                        manifesto.iniciar(pdf_path, self._opcoes_manifesto(), hash_pdf)
+
+            output_dir = pasta_saida or self.output_dir_for(pdf_path)
+            if self.gravar_arquivos:
+                os.makedirs(output_dir, exist_ok=True)
+
+            with self._medir('abrir_pdf'):
+                doc = fitz.open(pdf_path)
+            total_pages = len(doc)
+            registros = []
+            indice = self._abrir_indice_duplicados()
+            busca = self._abrir_indice_busca()
+
+            if self.paginas_por_janela and total_pages > self.paginas_por_janela:
+                paginas_analisadas = self._analisar_em_janelas(pdf_path, doc, total_pages, hash_pdf)
+            else:
+                paginas_analisadas = self._analisar_documento(pdf_path, doc, total_pages, hash_pdf)
+
+            zip_name = None
+            if self.gerar_zip:
+                zip_name = self.zip_for(pdf_path)
+                os.makedirs(os.path.dirname(zip_name), exist_ok=True)
+                # PDFs já vêm comprimidos; armazenar sem compressão evita gastar CPU à toa
+                z = zipfile.ZipFile(zip_name, 'w', zipfile.ZIP_STORED)
+
+            paginas = paginas_analisadas
+            textos_busca = {}
+            if busca is not None:
+                # Guarda o texto só das páginas do comprovante em andamento
+                paginas = _separar_textos(paginas_analisadas, textos_busca)
+
+            # A gravação (pasta, ZIP e manifesto) corre em outra thread, enquanto este laço analisa e serializa
+            gravador = GravadorComprovantes(pdf_path, z if zip_name else None, manifesto)
+            try:
+                for inicio, fim, primeira in agrupar_paginas(paginas):
+                    texto_busca = None
+                    if busca is not None:
+                        texto_busca = self._texto_comprovante(doc, inicio, fim, textos_busca)
+                    nome = "FOLHA" if primeira['folha'] else primeira['nome']
+                    valor = primeira['valor']
+                    # Numerado pelos comprovantes mantidos: duplicados pulados não deixam buracos na sequência
+                    nome_saida = nome_arquivo_saida(nome, valor, len(registros) + 1)
+                    # Reservado só ao ser mantido: um duplicado pulado não ocupa nome no lote
+                    path_out = self._saida_livre(output_dir, nome_saida)
+                    registro = {
+                        'arquivo_origem': pdf_path,
+                        'pagina_inicial': inicio + 1,
+                        'pagina_final': fim,
+                        'beneficiario': nome,
+                        'valor': valor,
+                        'layout': primeira['layout'],
+                        'arquivo_saida': path_out,
+                        'arquivo_zip': zip_name,
+                        'data': primeira['data'],
+                        'documento': primeira['documento'],
+                        'autenticacao': primeira['autenticacao'],
+                        'duplicado_de': None,
+                    }
+                    anterior = gravadas.get(path_out)
+                    if (anterior is not None and anterior['pagina_inicial'] == inicio + 1
+                            and anterior['pagina_final'] == fim):
+                        # Gravado antes da interrupção: só entra no ZIP, que é sempre refeito
+                        self._reservar_saida(output_dir, nome_saida)
+                        if zip_name:
+                            with self._medir('fila_gravacao'):
+                                gravador.gravar(registro, caminho=path_out, nome_zip=nome_saida)
+                        registros.append(registro)
+                        if busca is not None:
+                            self._indexar(busca, registro, texto_busca)
+                        continue
+
+                    if indice is not None:
+                        registro['duplicado_de'] = self._duplicado_de(
+                            indice, chaves_comprovante(primeira, fim - inicio), path_out,
+                            path_out if self.gravar_arquivos else zip_name, pdf_path, inicio + 1)
+                        if registro['duplicado_de'] is not None and self.acao_duplicados == 'pular':
+                            continue
+
+                    self._reservar_saida(output_dir, nome_saida)
+                    # As páginas saem do mesmo documento já aberto para a extração de texto
+                    with self._medir('serializacao_pdf'):
+                        dados = self._serializar_paginas(fitz, doc, inicio, fim)
+                    # Espera só quando a fila está cheia, isto é, quando o disco ficou para trás
+                    with self._medir('fila_gravacao'):
+                        gravador.gravar(registro, dados, path_out if self.gravar_arquivos else None,
+                                        nome_saida if zip_name else None)
+                    registros.append(registro)
+                    if busca is not None:
+                        self._indexar(busca, registro, texto_busca)
+            finally:
+                try:
+                    with self._medir('fila_gravacao'):
+                        gravador.fechar()
+                finally:
+                    self._incorporar_gravacao(gravador)
+                    if zip_name:
+                        with self._medir('zip'):
+                            z.close()
+
+            if zip_name:
+                if registros:
+                    self.log_message(f"Arquivo ZIP criado: {zip_name}")
+                    self.bytes_gravados['zip'] += os.path.getsize(zip_name)
+                else:
+                    os.remove(zip_name)
+
+            destino = self.output_dir_for(pdf_path) if self.gravar_arquivos else zip_name
+            self.log_message(f"✅ Processo finalizado para {os.path.basename(pdf_path)}! Arquivos salvos em: {destino}")
+            self.log_message(f"Total de arquivos gerados: {len(registros)}")
+            if manifesto is not None:
+                with self._medir('manifesto'):
+                    manifesto.concluir(pdf_path, registros)
+            return registros
+
+        except Exception as e:
+            self.log_message(f"❌ Erro ao processar {os.path.basename(pdf_path)}: {str(e)}")
+            if manifesto is not None:
+                manifesto.falhar(pdf_path, str(e))
+            raise
+        finally:
+            if hasattr(paginas_analisadas, 'close'):
+                # Interrompido no meio: encerra a análise em janelas (e o pool dela) antes de fechar o PDF
+                paginas_analisadas.close()
+            if indice is not None:
+                indice.close()
+            if busca is not None:
+                with self._medir('indice_busca'):
+                    self._fechar_indice(busca)
+            if doc is not None:
+                try:
+                    doc.close()
+                except:
+                    pass
+            if self.medicoes is not None:
+                self.medicoes.arquivo = None
+
+    def _incorporar_gravacao(self, gravador):
+        """Soma os bytes e os tempos da thread de gravação aos do processador"""
+        self.bytes_gravados['arquivos'] += gravador.bytes_arquivos
+        if self.medicoes is not None:
+            for etapa, (segundos, quantidade) in gravador.tempos.items():
+                self.medicoes.registrar(etapa, segundos, quantidade)
+
+    def _serializar_paginas(self, fitz, doc, inicio, fim):
+        """Bytes de um PDF novo com as páginas ``inicio`` a ``fim - 1`` de ``doc``, otimizado conforme a opção"""
+        saida = fitz.open()
+        try:
+            saida.insert_pdf(doc, from_page=inicio, to_page=fim - 1)
+            if self._reduzir_fontes:
+                self._subconjunto_fontes(saida)
+            return saida.tobytes(**_OPCOES_GRAVACAO[self.otimizar_saida])
+        finally:
+            saida.close()
+
+    def _subconjunto_fontes(self, saida):
+        """Reduz as fontes embutidas aos caracteres usados; sem suporte mantém as fontes inteiras"""
+        if not hasattr(saida, 'subset_fonts'):
+            self._reduzir_fontes = False
+            self.log_message("⚠️ Esta versão do PyMuPDF não reduz fontes; as fontes serão mantidas inteiras")
+            return
+        try:
+            saida.subset_fonts()
+        except ImportError:
+            # Versões antigas do PyMuPDF dependem do pacote fontTools para isso
+            self._reduzir_fontes = False
+            self.log_message("⚠️ Para reduzir as fontes instale o pacote fontTools; elas serão mantidas inteiras")
+        except Exception as e:
+            self.log_message(f"⚠️ Não foi possível reduzir as fontes de um comprovante: {str(e)}")
+
+
+def _separar_textos(paginas_analisadas, textos):
+    """Repassa as páginas analisadas, tirando de cada uma o texto para ``textos`` (número -> texto)"""
+    for pagina in paginas_analisadas:
+        texto = pagina.pop('texto', None)
+        if texto is not None:
+            textos[pagina['numero']] = texto
+        yield pagina
+
+
+def _processar_arquivo_isolado(pdf_path, opcoes, pasta_saida=None, inicio_lote=None):
+    """Processa um PDF dentro de um processo do pool, devolvendo registros e mensagens"""
+    mensagens = []
+    processador = ProcessadorComprovantes(log=mensagens.append, **opcoes)
+    processador._inicio_lote = inicio_lote
+    try:
+        registros = processador.process_single_pdf(pdf_path, pasta_saida)
+        erro = None
+    except Exception as e:
+        registros = []
+        erro = str(e)
+    return {
+        'registros': registros,
+        'mensagens': mensagens,
+        'indefinidos': processador.undefined_count,
+        'erro': erro,
+        'medicoes': processador.medicoes.como_dict() if processador.medicoes is not None else None,
+        'bytes_gravados': processador.bytes_gravados,
+        'duplicados': processador.duplicados_count,
+        'hash': processador._hash_pdf,
+    }
+
+
+def _extrair_primeira_pagina_isolado(pdf_path, medir=False, posicional=False, arquivo_duplicados=None):
+    """Lê os campos da primeira página dentro de um processo do pool"""
+    mensagens = []
+    processador = ProcessadorComprovantes(log=mensagens.append, medir=medir, posicional=posicional,
+                                          arquivo_duplicados=arquivo_duplicados)
+    campos = processador._extrair_primeira_pagina(pdf_path)
+    return {
+        'campos': campos,
+        'mensagens': mensagens,
+        'indefinidos': processador.undefined_count,
+        'medicoes': processador.medicoes.como_dict() if medir else None,
+    }
+
+
+def _analisar_intervalo_isolado(pdf_path, inicio, fim, guardar_textos=False, medir=False, posicional=False,
+                                arquivo_busca=None, campos_complementares=False):
+    """Analisa um intervalo de páginas dentro de um processo do pool"""
+    import fitz  # PyMuPDF
+
+    mensagens = []
+    textos = [] if guardar_textos else None
+    processador = ProcessadorComprovantes(log=mensagens.append, medir=medir, posicional=posicional,
+                                          arquivo_busca=arquivo_busca, campos_complementares=campos_complementares)
+    if medir:
+        processador.medicoes.arquivo = pdf_path
+    doc = fitz.open(pdf_path)
+    try:
+        paginas = processador._analisar_paginas(doc, inicio, fim, textos)
+    finally:
+        doc.close()
+    return {
+        'paginas': paginas,
+        'textos': textos,
+        'mensagens': mensagens,
+        'indefinidos': processador.undefined_count,
+        'medicoes': processador.medicoes.como_dict() if medir else None,
+    }
+
+
+def _reconhecer_isolado(pdf_path, indices, dpi, idioma, arquivo_cache):
+    """Aplica o OCR em um lote de páginas dentro de um processo do pool"""
+    mensagens = []
+    textos, do_cache = reconhecer_paginas(pdf_path, indices, dpi, idioma, arquivo_cache, mensagens.append)
+    return {
+        'textos': textos,
+        'do_cache': do_cache,
+        'mensagens': mensagens,
+    }
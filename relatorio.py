@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Relatório dos comprovantes gerados, montado a partir dos registros da divisão.
+
+Cada registro devolvido por ``ProcessadorComprovantes.process_single_pdf`` vira
+uma linha, com arquivo e páginas de origem, layout, beneficiário, valor (como
+número), o arquivo gerado e, quando encontrados na primeira página, a data do
+pagamento, o CPF/CNPJ do beneficiário e o código de autenticação. As linhas
+são gravadas à medida que são montadas, sem carregar a tabela inteira na
+memória: o xlsx usa o modo ``write_only`` do openpyxl e o Parquet
+(``pyarrow``, opcional) é gravado em lotes. O CSV é o formato mais rápido e o
+único que aceita acrescentar linhas a um relatório já gravado.
+"""
+
+import csv
+import datetime
+import os
+
+from extratores import VALOR_INDEFINIDO
+
+ARQUIVO_RELATORIO = "relatorio_comprovantes"
+FORMATOS = ('xlsx', 'csv', 'parquet')
+FORMATO_PADRAO = 'xlsx'
+
+LINHAS_POR_LOTE_PARQUET = 10000
+
+COLUNAS = [
+    "Arquivo de Origem",
+    "Página Inicial",
+    "Página Final",
+    "Layout",
+    "Beneficiário Final",
+    "Valor Final",
+    "Arquivo Gerado",
+    "Data",
+    "CPF/CNPJ",
+    "Autenticação",
+]
+
+# Larguras das colunas no xlsx, na ordem de COLUNAS
+_LARGURAS_XLSX = [40, 14, 12, 14, 30, 14, 50, 12, 20, 26]
+
+
+def valor_numerico(valor):
+    """Converte o valor extraído (ex.: ``1250_00``) em número; None se indefinido"""
+    if not valor or valor == VALOR_INDEFINIDO:
+        return None
+    try:
+        return float(valor.replace('_', '.'))
+    except ValueError:
+        return None
+
+
+def data_relatorio(data):
+    """Converte a data extraída (``AAAA-MM-DD``) em ``datetime.date``; None se ausente"""
+    if not data:
+        return None
+    try:
+        return datetime.date.fromisoformat(data)
+    except ValueError:
+        return None
+
+
+def linhas_relatorio(registros):
+    """Gera uma linha (na ordem de ``COLUNAS``) por registro de comprovante"""
+    for registro in registros:
+        yield (
+            os.path.basename(registro['arquivo_origem']),
+            registro['pagina_inicial'],
+            registro['pagina_final'],
+            registro.get('layout'),
+            registro['beneficiario'],
+            valor_numerico(registro['valor']),
+            os.path.basename(registro['arquivo_saida']),
+            # Registros de manifestos anteriores a esses campos não os têm
+            data_relatorio(registro.get('data')),
+            registro.get('documento') or None,
+            registro.get('autenticacao') or None,
+        )
+
+
+def _gravar_csv(linhas, caminho, acrescentar=False):
+    if acrescentar and os.path.exists(caminho) and os.path.getsize(caminho) > 0:
+        with open(caminho, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(linhas)
+        return
+    # utf-8-sig para o Excel reconhecer os acentos ao abrir o arquivo
+    with open(caminho, 'w', newline='', encoding='utf-8-sig') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUNAS)
+        escritor.writerows(linhas)
+
+
+def _gravar_xlsx(linhas, caminho):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet("Comprovantes")
+    for indice, largura in enumerate(_LARGURAS_XLSX, start=1):
+        planilha.column_dimensions[get_column_letter(indice)].width = largura
+    planilha.freeze_panes = "A2"
+    planilha.append(COLUNAS)
+
+    formatos = ((COLUNAS.index("Valor Final"), '#,##0.00'), (COLUNAS.index("Data"), 'DD/MM/YYYY'))
+    for linha in linhas:
+        linha = list(linha)
+        for coluna, formato in formatos:
+            if linha[coluna] is not None:
+                celula = WriteOnlyCell(planilha, value=linha[coluna])
+                celula.number_format = formato
+                linha[coluna] = celula
+        planilha.append(linha)
+    livro.save(caminho)
+
+
+def _gravar_parquet(linhas, caminho):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Para gerar o relatório em Parquet instale o pacote pyarrow")
+
+    esquema = pa.schema([
+        (COLUNAS[0], pa.string()),
+        (COLUNAS[1], pa.int32()),
+        (COLUNAS[2], pa.int32()),
+        (COLUNAS[3], pa.string()),
+        (COLUNAS[4], pa.string()),
+        (COLUNAS[5], pa.float64()),
+        (COLUNAS[6], pa.string()),
+        (COLUNAS[7], pa.date32()),
+        (COLUNAS[8], pa.string()),
+        (COLUNAS[9], pa.string()),
+    ])
+
+    def tabela(lote):
+        colunas = [pa.array(coluna, type=campo.type) for coluna, campo in zip(zip(*lote), esquema)]
+        return pa.Table.from_arrays(colunas, schema=esquema)
+
+    with pq.ParquetWriter(caminho, esquema) as escritor:
+        lote = []
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= LINHAS_POR_LOTE_PARQUET:
+                escritor.write_table(tabela(lote))
+                lote = []
+        if lote:
+            escritor.write_table(tabela(lote))
+
+
+_GRAVADORES = {
+    'xlsx': _gravar_xlsx,
+    'csv': _gravar_csv,
+    'parquet': _gravar_parquet,
+}
+
+
+def gravar_relatorio(registros, caminho, formato=None, acrescentar=False):
+    """Grava o relatório dos registros no formato indicado (padrão: pela extensão de ``caminho``).
+
+    Com ``acrescentar=True`` (só em CSV) as linhas vão para o final de um
+    relatório existente.
+    """
+    formato = formato or os.path.splitext(caminho)[1].lstrip('.').lower() or FORMATO_PADRAO
+    if formato not in _GRAVADORES:
+        raise ValueError(f"Formato de relatório desconhecido: {formato} (use {', '.join(FORMATOS)})")
+    if acrescentar:
+        if formato != 'csv':
+            raise ValueError("Só o relatório em CSV pode receber linhas novas; os demais são regravados")
+        _gravar_csv(linhas_relatorio(registros), caminho, acrescentar=True)
+        return
+    _GRAVADORES[formato](linhas_relatorio(registros), caminho)
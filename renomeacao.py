@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Renomeação de arquivos em lote, com nomes livres calculados em memória.
+
+Cada pasta é listada uma única vez (``AlocadorNomes``) e os nomes seguintes de
+uma mesma série (``NOME_1``, ``NOME_2``...) continuam de onde a anterior
+parou, sem consultar o disco a cada tentativa. As renomeações do lote são
+aplicadas juntas por ``aplicar_renomeacoes``: cada uma é acrescentada ao
+arquivo de desfazer (JSON Lines) antes de acontecer, então os lotes podem
+ser revertidos depois com ``desfazer_renomeacoes``, do último para o
+primeiro. Se o lote for interrompido no meio, o que já foi renomeado é
+revertido na hora. Nenhuma renomeação sobrescreve um arquivo existente.
+"""
+
+import errno
+import json
+import os
+
+ARQUIVO_DESFAZER = "renomeacao_desfazer.jsonl"
+
+
+class AlocadorNomes:
+    """Nomes livres em uma pasta, a partir de uma única listagem."""
+
+    def __init__(self, pasta, nomes=None):
+        """``nomes`` é o conteúdo da pasta, quando quem chama já o listou"""
+        self.pasta = pasta
+        if nomes is None:
+            nomes = os.listdir(pasta or '.')
+        # Comparação sem diferenciar maiúsculas onde o sistema de arquivos não diferencia (Windows)
+        self._ocupados = {os.path.normcase(nome) for nome in nomes}
+        self._proximo = {}
+
+    def ocupado(self, nome):
+        return os.path.normcase(nome) in self._ocupados
+
+    def _livre(self, nome, separador):
+        base, ext = os.path.splitext(nome)
+        candidato = nome
+        contador = self._proximo.get(nome, 1)
+        while self.ocupado(candidato):
+            candidato = f"{base}{separador}{contador}{ext}"
+            contador += 1
+        return candidato, contador
+
+    def livre(self, nome, separador="_"):
+        """O nome que ``reservar`` devolveria agora, sem reservá-lo"""
+        return self._livre(nome, separador)[0]
+
+    def reservar(self, nome, separador="_"):
+        """Reserva ``nome`` ou, se já existe, o primeiro livre entre ``NOME_1``, ``NOME_2``...
+
+        Os nomes da pasta original continuam ocupados mesmo depois de
+        renomeados, então nenhuma reserva depende da ordem em que o lote é
+        aplicado.
+        """
+        candidato, self._proximo[nome] = self._livre(nome, separador)
+        self._ocupados.add(os.path.normcase(candidato))
+        return candidato
+
+
+class AlocadoresPorPasta(dict):
+    """Um ``AlocadorNomes`` por pasta, criado na primeira vez que a pasta aparece.
+
+    Com ``listar=False`` a pasta não é listada: cada alocador só evita os
+    nomes reservados por ele mesmo.
+    """
+
+    def __init__(self, listar=True):
+        super().__init__()
+        self.listar = listar
+
+    def __missing__(self, pasta):
+        alocador = self[pasta] = AlocadorNomes(pasta, None if self.listar else ())
+        return alocador
+
+
+def aplicar_renomeacoes(pares, arquivo_desfazer=None, log=print):
+    """Renomeia cada ``(origem, destino)`` e retorna ``{origem: destino}`` dos que deram certo.
+
+    Um erro em um arquivo (inclusive um destino que já existe) é registrado
+    e o lote continua. Qualquer outra interrupção (inclusive Ctrl+C) reverte
+    o que já tinha sido renomeado. Os pares vão para o final do
+    ``arquivo_desfazer``, sem apagar os lotes anteriores.
+    """
+    aplicados = {}
+    registro = None
+    if arquivo_desfazer and pares:
+        registro = open(arquivo_desfazer, 'a', encoding='utf-8')
+    try:
+        for origem, destino in pares:
+            if registro is not None:
+                # Registrado antes de renomear: uma queda no meio ainda deixa o par no arquivo
+                registro.write(json.dumps({'de': origem, 'para': destino}, ensure_ascii=False) + "\n")
+                registro.flush()
+            try:
+                renomear_sem_sobrescrever(origem, destino)
+            except OSError as e:
+                log(f"❌ Erro ao renomear {os.path.basename(origem)}: {str(e)}")
+                continue
+            aplicados[origem] = destino
+    except BaseException:
+        revertidos = _reverter(list(aplicados.items()), log)
+        log(f"↩️ Renomeação interrompida; {len(revertidos)} arquivo(s) voltaram ao nome original")
+        raise
+    finally:
+        if registro is not None:
+            registro.close()
+    return aplicados
+
+
+def renomear_sem_sobrescrever(origem, destino):
+    """Como ``os.rename``, mas falha com ``FileExistsError`` se ``destino`` já existe.
+
+    No Windows o próprio ``os.rename`` recusa; nos demais sistemas ele
+    substituiria o arquivo sem avisar. Mudar só maiúsculas/minúsculas do
+    mesmo arquivo continua permitido.
+    """
+    if (os.name != 'nt' and os.path.lexists(destino)
+            and not (os.path.exists(origem) and os.path.samefile(origem, destino))):
+        raise FileExistsError(errno.EEXIST, "o arquivo de destino já existe", destino)
+    os.rename(origem, destino)
+
+
+def _reverter(pares, log):
+    """Desfaz os pares ``(origem, destino)`` do último para o primeiro, sem sobrescrever nada.
+
+    Retorna ``{destino: origem}`` dos que voltaram ao nome original.
+    """
+    revertidos = {}
+    for origem, destino in reversed(pares):
+        if not os.path.exists(destino) or os.path.exists(origem):
+            continue
+        try:
+            renomear_sem_sobrescrever(destino, origem)
+            revertidos[destino] = origem
+        except OSError as e:
+            log(f"❌ Erro ao reverter {os.path.basename(destino)}: {str(e)}")
+    return revertidos
+
+
+def desfazer_renomeacoes(arquivo_desfazer, log=print):
+    """Devolve aos nomes originais os arquivos dos lotes registrados; retorna ``{nome atual: original}``.
+
+    Só os pares que ainda podem ser desfeitos continuam no arquivo de
+    desfazer; ele é apagado quando não sobra nenhum.
+    """
+    pares = []
+    with open(arquivo_desfazer, encoding='utf-8') as f:
+        for linha in f:
+            try:
+                par = json.loads(linha)
+            except ValueError:
+                # Linha cortada por uma interrupção durante a gravação
+                continue
+            pares.append((par['de'], par['para']))
+    revertidos = _reverter(pares, log)
+    log(f"↩️ {len(revertidos)} de {len(pares)} arquivo(s) voltaram ao nome original")
+
+    # Os que deram erro (sem permissão, arquivo aberto...) ficam para uma próxima tentativa
+    restantes = [(origem, destino) for origem, destino in pares
+                 if os.path.exists(destino) and not os.path.exists(origem)]
+    if restantes:
+        with open(arquivo_desfazer, 'w', encoding='utf-8') as f:
+            for origem, destino in restantes:
+                f.write(json.dumps({'de': origem, 'para': destino}, ensure_ascii=False) + "\n")
+    else:
+        os.remove(arquivo_desfazer)
+    return revertidos
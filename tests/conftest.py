@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Configuração comum dos testes: módulos da raiz do projeto e PDFs sintéticos."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def gerar_pdf(tmp_path):
+    """Gera um PDF com um comprovante por página e devolve o caminho"""
+    fitz = pytest.importorskip("fitz")
+
+    def gerar(nome="extrato.pdf", paginas=3, inicio=0):
+        caminho = tmp_path / nome
+        doc = fitz.open()
+        for n in range(inicio, inicio + paginas):
+            page = doc.new_page()
+            page.insert_text((72, 72), (
+                "COMPROVANTE DE PAGAMENTO\n"
+                f"FAVORECIDO: EMPRESA EXEMPLO {n} LTDA\n"
+                f"VALOR: R$ {1000 + n},00\n"
+            ), fontsize=11)
+        doc.save(str(caminho))
+        doc.close()
+        return str(caminho)
+
+    return gerar
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""Índice de duplicados compartilhado entre execuções e processos."""
+
+import time
+
+from duplicados import IndiceDuplicados
+
+
+def test_registro_do_lote_vale_antes_do_arquivo_existir(tmp_path):
+    caminho = str(tmp_path / "duplicados.db")
+    chaves = [b"c" + b"0" * 16]
+    inicio = time.time()
+    with IndiceDuplicados(caminho, desde=inicio) as outro_processo:
+        assert outro_processo.registrar(chaves, str(tmp_path / "a.pdf")) is None
+
+    # Outro processo do mesmo lote: o arquivo de a.pdf ainda está na fila de gravação
+    with IndiceDuplicados(caminho, desde=inicio) as indice:
+        assert indice.registrar(chaves, str(tmp_path / "b.pdf")) == str(tmp_path / "a.pdf")
+
+    # Num lote posterior, um registro cujo arquivo não existe é substituído
+    with IndiceDuplicados(caminho, desde=time.time() + 1) as indice:
+        assert indice.registrar(chaves, str(tmp_path / "c.pdf")) is None
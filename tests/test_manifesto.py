@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Retomada de lotes pelo manifesto de processamento."""
+
+import json
+import os
+
+from manifesto import ARQUIVO_MANIFESTO
+from processador import PASTA_SAIDA, ProcessadorComprovantes
+
+
+def _processador(tmp_path, mensagens=None, **opcoes):
+    opcoes.setdefault('gerar_zip', False)
+    return ProcessadorComprovantes(log=(mensagens.append if mensagens is not None else lambda m: None),
+                                   arquivo_manifesto=str(tmp_path / ARQUIVO_MANIFESTO), **opcoes)
+
+
+def _saidas(tmp_path):
+    pasta = tmp_path / PASTA_SAIDA
+    return {nome: os.stat(pasta / nome).st_mtime_ns for nome in os.listdir(pasta)}
+
+
+def _eventos(tmp_path):
+    with open(tmp_path / ARQUIVO_MANIFESTO, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_retomada_pula_pdf_concluido(tmp_path, gerar_pdf):
+    pdf = gerar_pdf(paginas=3)
+    registros = _processador(tmp_path).process_pdfs([pdf])
+    antes = _saidas(tmp_path)
+
+    mensagens = []
+    processador = _processador(tmp_path, mensagens, retomar=True)
+    retomados = processador.process_pdfs([pdf])
+
+    assert [r['arquivo_saida'] for r in retomados] == [r['arquivo_saida'] for r in registros]
+    assert _saidas(tmp_path) == antes
+    assert any("já concluído(s) no manifesto foram pulados" in m for m in mensagens)
+
+
+def test_retomada_de_pdf_interrompido_com_ultima_linha_cortada(tmp_path, gerar_pdf):
+    pdf = gerar_pdf(paginas=3)
+    registros = _processador(tmp_path).process_pdfs([pdf])
+
+    # Simula a interrupção: sem o evento de conclusão, sem a última saída e com uma linha pela metade
+    caminho = tmp_path / ARQUIVO_MANIFESTO
+    linhas = caminho.read_text(encoding='utf-8').splitlines(keepends=True)
+    assert json.loads(linhas[-1])['evento'] == 'concluido'
+    caminho.write_text("".join(linhas[:-2]) + linhas[-2][:20], encoding='utf-8')
+    perdida = registros[-1]['arquivo_saida']
+    os.remove(perdida)
+    mantidas = {r['arquivo_saida']: os.stat(r['arquivo_saida']).st_mtime_ns for r in registros[:-1]}
+
+    mensagens = []
+    retomados = _processador(tmp_path, mensagens, retomar=True).process_pdfs([pdf])
+
+    assert [r['arquivo_saida'] for r in retomados] == [r['arquivo_saida'] for r in registros]
+    assert os.path.exists(perdida)
+    assert {c: os.stat(c).st_mtime_ns for c in mantidas} == mantidas
+    assert any("Retomando: 2 comprovante(s)" in m for m in mensagens)
+    # A linha cortada fica isolada: só ela deixa de ser lida e a conclusão nova é registrada
+    eventos, cortadas = [], 0
+    for linha in caminho.read_text(encoding='utf-8').splitlines():
+        try:
+            eventos.append(json.loads(linha))
+        except ValueError:
+            cortadas += 1
+    assert cortadas == 1
+    assert eventos[-1]['evento'] == 'concluido'
+
+
+def test_mudanca_de_opcoes_reprocessa(tmp_path, gerar_pdf):
+    pdf = gerar_pdf(paginas=2)
+    _processador(tmp_path).process_pdfs([pdf])
+
+    processador = _processador(tmp_path, retomar=True, gerar_zip=True)
+    with processador.manifesto_aberto():
+        assert processador.ja_concluido(pdf) is None
+    registros = processador.process_pdfs([pdf])
+
+    assert registros and all(r['arquivo_zip'] and os.path.exists(r['arquivo_zip']) for r in registros)
+    assert [e['evento'] for e in _eventos(tmp_path)].count('inicio') == 2
+
+
+def test_retomada_depois_de_remover_a_numeracao(tmp_path, gerar_pdf):
+    pdf = gerar_pdf(paginas=3)
+    processador = _processador(tmp_path)
+    registros = processador.process_pdfs([pdf])
+    processador.remove_numbering_from_filenames(str(tmp_path / PASTA_SAIDA), registros)
+    antes = _saidas(tmp_path)
+    assert not any(nome[:3].isdigit() for nome in antes)
+
+    processador = _processador(tmp_path, retomar=True)
+    retomados = processador.process_pdfs([pdf])
+    processador.remove_numbering_from_filenames(str(tmp_path / PASTA_SAIDA), retomados)
+
+    assert _saidas(tmp_path) == antes
+    assert [r['arquivo_saida'] for r in retomados] == [r['arquivo_saida'] for r in registros]
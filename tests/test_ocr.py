@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Chave do cache de OCR, calculada sem renderizar a página."""
+
+import pytest
+
+import ocr
+from cache_paginas import CachePaginas
+
+fitz = pytest.importorskip("fitz")
+
+
+def _pagina_digitalizada(caminho, cinza=200, objetos_antes=0):
+    """PDF com uma página só de imagem; ``objetos_antes`` muda a numeração dos objetos"""
+    doc = fitz.open()
+    for _ in range(objetos_antes):
+        doc.new_page()
+    page = doc.new_page()
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 200, 100), False)
+    pix.set_rect(pix.irect, (cinza,))
+    page.insert_image(page.rect, pixmap=pix)
+    for _ in range(objetos_antes):
+        doc.delete_page(0)
+    doc.save(str(caminho))
+    doc.close()
+    return str(caminho)
+
+
+def _chave(caminho, dpi=300, idioma="por"):
+    with fitz.open(caminho) as doc:
+        return ocr.chave_pagina(doc, 0, dpi, idioma)
+
+
+def test_chave_depende_do_conteudo_e_nao_dos_numeros_dos_objetos(tmp_path):
+    original = _chave(_pagina_digitalizada(tmp_path / "a.pdf"))
+
+    assert _chave(_pagina_digitalizada(tmp_path / "b.pdf", objetos_antes=3)) == original
+    assert _chave(_pagina_digitalizada(tmp_path / "c.pdf", cinza=10)) != original
+    assert _chave(str(tmp_path / "a.pdf"), dpi=150) != original
+    assert _chave(str(tmp_path / "a.pdf"), idioma="eng") != original
+
+
+def test_pagina_no_cache_nao_e_renderizada(tmp_path, monkeypatch):
+    pdf = _pagina_digitalizada(tmp_path / "a.pdf")
+    arquivo_cache = str(tmp_path / "cache.db")
+    with CachePaginas(arquivo_cache) as cache:
+        cache.salvar_ocr(_chave(pdf), "COMPROVANTE RECONHECIDO")
+
+    def renderizar(*args):
+        raise AssertionError("página do cache não deve ser renderizada")
+
+    monkeypatch.setattr(ocr, 'renderizar_pagina', renderizar)
+    textos, do_cache = ocr.reconhecer_paginas(pdf, [0], arquivo_cache=arquivo_cache, log=lambda m: None)
+
+    assert textos == {0: "COMPROVANTE RECONHECIDO"}
+    assert do_cache == 1
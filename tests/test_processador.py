@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Divisão de vários PDFs na mesma pasta de saída."""
+
+import os
+import shutil
+
+import pytest
+
+from processador import PASTA_SAIDA, ProcessadorComprovantes
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_entradas_na_mesma_pasta_nao_sobrescrevem_saidas(tmp_path, gerar_pdf, workers):
+    primeiro = gerar_pdf("a.pdf", paginas=2)
+    segundo = str(tmp_path / "b.pdf")
+    shutil.copy(primeiro, segundo)
+
+    processador = ProcessadorComprovantes(log=lambda m: None, gerar_zip=False, workers=workers)
+    registros = processador.process_pdfs([primeiro, segundo])
+
+    saidas = [os.path.basename(r['arquivo_saida']) for r in registros]
+    assert saidas == [
+        "001_EMPRESA EXEMPLO 0 LTDA_1000_00.pdf",
+        "002_EMPRESA EXEMPLO 1 LTDA_1001_00.pdf",
+        "001_EMPRESA EXEMPLO 0 LTDA_1000_00_1.pdf",
+        "002_EMPRESA EXEMPLO 1 LTDA_1001_00_1.pdf",
+    ]
+    assert sorted(os.listdir(tmp_path / PASTA_SAIDA)) == sorted(saidas)
+    assert not processador.erros
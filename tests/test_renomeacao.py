@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Renomeação em lote: reserva de nomes, reversão e arquivo de desfazer."""
+
+import os
+
+import pytest
+
+import renomeacao
+from renomeacao import AlocadorNomes, aplicar_renomeacoes, desfazer_renomeacoes, renomear_sem_sobrescrever
+
+
+def _criar(pasta, *nomes):
+    caminhos = []
+    for nome in nomes:
+        caminho = pasta / nome
+        caminho.write_text(nome, encoding='utf-8')
+        caminhos.append(str(caminho))
+    return caminhos
+
+
+def _conteudo(pasta):
+    return {nome: (pasta / nome).read_text(encoding='utf-8') for nome in os.listdir(pasta)}
+
+
+def test_alocador_continua_a_serie_de_sufixos(tmp_path):
+    _criar(tmp_path, "NOME.pdf", "NOME_1.pdf", "NOME_3.pdf", "OUTRO.pdf")
+    alocador = AlocadorNomes(str(tmp_path))
+
+    assert alocador.reservar("NOME.pdf") == "NOME_2.pdf"
+    assert alocador.reservar("NOME.pdf") == "NOME_4.pdf"
+    assert alocador.reservar("NOME.pdf") == "NOME_5.pdf"
+    assert alocador.reservar("NOVO.pdf") == "NOVO.pdf"
+    assert alocador.reservar("NOVO.pdf", separador=" ") == "NOVO 1.pdf"
+
+
+def test_destino_existente_nao_e_sobrescrito(tmp_path):
+    origem, destino = _criar(tmp_path, "a.pdf", "b.pdf")
+    mensagens = []
+
+    aplicados = aplicar_renomeacoes([(origem, destino)], log=mensagens.append)
+
+    assert aplicados == {}
+    assert _conteudo(tmp_path) == {"a.pdf": "a.pdf", "b.pdf": "b.pdf"}
+    assert any("Erro ao renomear a.pdf" in m for m in mensagens)
+    with pytest.raises(FileExistsError):
+        renomear_sem_sobrescrever(origem, destino)
+
+
+def test_interrupcao_reverte_o_que_ja_foi_renomeado(tmp_path, monkeypatch):
+    origens = _criar(tmp_path, "a.pdf", "b.pdf", "c.pdf")
+    pares = [(origem, origem.replace(".pdf", "_novo.pdf")) for origem in origens]
+    chamadas = []
+
+    def renomear(origem, destino):
+        chamadas.append(origem)
+        if len(chamadas) == 3:
+            raise KeyboardInterrupt
+        renomear_sem_sobrescrever(origem, destino)
+
+    monkeypatch.setattr(renomeacao, 'renomear_sem_sobrescrever', renomear)
+    with pytest.raises(KeyboardInterrupt):
+        aplicar_renomeacoes(pares, log=lambda m: None)
+
+    assert _conteudo(tmp_path) == {"a.pdf": "a.pdf", "b.pdf": "b.pdf", "c.pdf": "c.pdf"}
+
+
+def test_desfazer_lotes_encadeados_do_ultimo_para_o_primeiro(tmp_path):
+    pasta = tmp_path / "pdfs"
+    pasta.mkdir()
+    a, b = _criar(pasta, "a.pdf", "b.pdf")
+    x = str(pasta / "x.pdf")
+    arquivo_desfazer = str(tmp_path / renomeacao.ARQUIVO_DESFAZER)
+
+    # O segundo lote ocupa o nome que o primeiro liberou
+    assert aplicar_renomeacoes([(a, x)], arquivo_desfazer, log=lambda m: None) == {a: x}
+    assert aplicar_renomeacoes([(b, a)], arquivo_desfazer, log=lambda m: None) == {b: a}
+    assert _conteudo(pasta) == {"a.pdf": "b.pdf", "x.pdf": "a.pdf"}
+
+    revertidos = desfazer_renomeacoes(arquivo_desfazer, log=lambda m: None)
+
+    assert revertidos == {a: b, x: a}
+    assert _conteudo(pasta) == {"a.pdf": "a.pdf", "b.pdf": "b.pdf"}
+    assert not os.path.exists(arquivo_desfazer)
+